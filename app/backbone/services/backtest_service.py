@@ -1,4 +1,5 @@
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from typing import List
 import yaml
 from app.backbone.database.db_service import DbService
@@ -16,20 +17,86 @@ from pandas import Timestamp
 from app.backbone.entities.trade import Trade
 from app.backbone.services.operation_result import OperationResult
 from app.backbone.services.bot_service import BotService
-from app.backbone.services.utils import _performance_from_df_to_obj
+from app.backbone.services.utils import _performance_from_df_to_obj, get_trade_df_from_db
 from app.backbone.utils.get_data import get_data
+from app.backbone.utils.bar_store import attach_bars, publish_bars, store_key
+from app.backbone.utils.spread_store import has_bar_spreads, load_bar_spreads, relative_spreads
 from app.backbone.utils.general_purpose import load_function
-from app.backbone.utils.wfo_utils import run_strategy
+from app.backbone.utils.backtest_result import BacktestResult
+from app.backbone.utils.plot_cache import PlotCache
+from app.backbone.utils.wfo_utils import get_scaled_symbol_metadata, run_strategy
 import pandas as pd
 from sqlalchemy.orm import joinedload
 from sqlalchemy import func, desc
 from sqlalchemy.orm import aliased
 
 
+# Cantidad de procesos para correr la grilla tickers x timeframes y tamaño de
+# las tandas en las que se guardan los resultados
+BACKTEST_MAX_WORKERS = int(os.environ.get('BACKTEST_MAX_WORKERS', os.cpu_count() or 1))
+DB_BATCH_SIZE = 8
+
+# Modo compacto del bar store: velas float32 ya escaladas. Ahorra la copia escalada y la mitad
+# de las velas mapeadas (con 1M de velas H1 y TripleSMA el pico de RSS del worker baja de ~480
+# a ~420 MB: los indicadores y la equity de backtesting.py siguen en float64). Es aproximado,
+# ver utils.compact_accuracy: conviene compararlo con float64 antes de usarlo con una estrategia
+BAR_STORE_COMPACT = os.environ.get('BAR_STORE_COMPACT', '0') == '1'
+
+
+def _plot_file_name(bot_performance: BotPerformance):
+    str_date_from = str(bot_performance.DateFrom).replace('-','')
+    str_date_to = str(bot_performance.DateTo).replace('-','')
+    return f'{bot_performance.Bot.Name}_{str_date_from}_{str_date_to}.html'
+
+
+def _publish_job_bars(job: dict):
+    ''' Baja la data del job y la publica en el bar store. Se llama una vez por ticker/timeframe
+    en el proceso principal, antes de armar el pool: los workers solo adjuntan los archivos '''
+    prices = get_data(job['ticker'], job['timeframe'], job['date_from'], job['date_to'])
+
+    compact = job.get('compact', BAR_STORE_COMPACT)
+    minimum_fraction = get_scaled_symbol_metadata(job['ticker'])[4] if compact else 1.0
+    key = store_key(job['date_from'], job['date_to'], compact)
+    publish_bars(prices, job['ticker'], job['timeframe'], compact=compact, minimum_fraction=minimum_fraction, key=key)
+
+    return key
+
+
+def _run_backtest_job(job: dict):
+    ''' Corre un ticker/timeframe en un proceso del pool sobre las velas ya publicadas '''
+    strategy_func = load_function(job['strategy_path'])
+
+    # Vista mapeada del bar store: los procesos que corren el mismo simbolo comparten las paginas
+    prices = attach_bars(job['ticker'], job['timeframe'], key=job['store_key'])
+
+    # Si se bajaron los spreads por vela se cobran esos en vez de la comision fija
+    spreads = None
+    if has_bar_spreads(job['ticker'], job['timeframe']):
+        bar_spreads, point = load_bar_spreads(job['ticker'], job['timeframe'])
+        spreads = relative_spreads(prices, bar_spreads, point, commission=job['commission'])
+    else:
+        print(f"{job['ticker']} {job['timeframe']}: no hay spreads por vela, se cobra la comision fija")
+
+    performance, trade_performance, stats = run_strategy(
+        strategy=strategy_func,
+        ticker=job['ticker'],
+        risk=job['risk'],
+        commission=job['commission'],
+        prices=prices,
+        initial_cash=job['initial_cash'],
+        margin=job['margin'],
+        spreads=spreads,
+    )
+
+    # stats tiene la instancia de la estrategia, al proceso principal solo vuelven los DataFrames
+    return performance, trade_performance, stats._trades
+
+
 class BacktestService:
     def __init__(self):
         self.db_service = DbService()
         self.bot_service = BotService()
+        self.plot_cache = PlotCache()
     
     def run_backtest(
         self,
@@ -42,18 +109,18 @@ class BacktestService:
         method: str,
         metatrader_name: str,
         risk: float,
+        max_workers: int = None,
+        batch_size: int = DB_BATCH_SIZE,
     ):
         
         strategy_path = 'app.backbone.strategies.' + strategy.Name
-        
-        strategy_func = load_function(strategy_path)
         strategy_name = strategy.Name.split(".")[1]
         
         with open("./configs/leverages.yml", "r") as file_name:
             leverages = yaml.safe_load(file_name)
         
-        symbols = {}
-        stats_per_symbol = {}
+        jobs = []
+        bots = {}
         
         for ticker in tickers:
             leverage = leverages[ticker.Name]
@@ -100,72 +167,188 @@ class BacktestService:
                         Risk = risk
                     )
 
-                try:
-                    prices = get_data(ticker.Name, timeframe.MetaTraderNumber, date_from, date_to)
-                    
-                    prices.index = pd.to_datetime(prices.index)
+                # Al proceso solo le llegan datos planos, las entidades se quedan en este
+                bots[bot_name] = (bot, result_bot.item is None)
+                jobs.append({
+                    'bot_name': bot_name,
+                    'strategy_path': strategy_path,
+                    'ticker': ticker.Name,
+                    'timeframe': timeframe.MetaTraderNumber,
+                    'date_from': date_from,
+                    'date_to': date_to,
+                    'risk': risk,
+                    'commission': ticker.Commission,
+                    'initial_cash': initial_cash,
+                    'margin': margin,
+                })
 
-                    if ticker not in symbols.keys():
-                        symbols[ticker] = {}
-                    
-                    symbols[ticker][timeframe.Name] = prices
+        errors = []
+        pending = []
 
-                    print(f'{ticker.Name}_{timeframe.Name}_{risk}')
-                    
-                    if ticker not in stats_per_symbol.keys():
-                        stats_per_symbol[ticker] = {}
+        # Cada ticker/timeframe se baja y publica una sola vez, aca: los workers arrancan
+        # adjuntando el mmap y no tienen su propia copia de las velas
+        published_jobs = []
+        for job in jobs:
+            try:
+                job['store_key'] = _publish_job_bars(job)
+            except Exception as e:
+                errors.append(f"{job['bot_name']}: {e}")
+                continue
 
-                    str_date_from = str(date_from.date()).replace('-','')
-                    str_date_to = str(date_to.date()).replace('-','')
-                    
-                    performance, trade_performance, stats = run_strategy(
-                        strategy=strategy_func,
-                        ticker=ticker.Name,
-                        risk=risk,
-                        commission=ticker.Commission,
-                        prices=prices,
-                        initial_cash=initial_cash,
-                        margin=margin,
-                        plot_path=f'./app/templates/static/backtest_plots',
-                        file_name=f'{bot_name}_{str_date_from}_{str_date_to}.html'
-                    )
+            published_jobs.append(job)
 
-                    stats_per_symbol[ticker][ticker.Name] = stats                 
-
-                    bot_performance_for_db = _performance_from_df_to_obj(
-                        performance, 
-                        date_from, 
-                        date_to, 
-                        risk, 
-                        method, 
-                        bot,
-                        initial_cash,
-                        metatrader_name
-                    )
-                    
-                    trade_performance_for_db = [BotTradePerformance(**row) for _, row in trade_performance.iterrows()].pop()
-                    trade_performance_for_db.BotPerformance = bot_performance_for_db # Clave foranea con BotPerformance
-                    
-                    with self.db_service.get_database() as db: # se crea todo de un saque para que haya un unico commit
-                        
-                        if not result_bot.item:
-                            self.db_service.create(db, bot)
-                            
-                        self.db_service.create(db, bot_performance_for_db)
-                        self.db_service.create(db, trade_performance_for_db)
-                        
-                        trade_history = [Trade(**row) for _, row in stats._trades.iterrows()]
-                        for trade in trade_history:
-                            trade.BotPerformance = bot_performance_for_db
-                            self.db_service.create(db, trade)
-                            
-                    
+        def write_pending():
+            errors.extend(self._save_results(pending, date_from, date_to, risk, method, initial_cash, metatrader_name))
+            pending.clear()
+
+        max_workers = max(1, min(max_workers or BACKTEST_MAX_WORKERS, len(published_jobs) or 1))
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(_run_backtest_job, job): job['bot_name'] for job in published_jobs}
+
+            for future in as_completed(futures):
+                bot_name = futures[future]
+                
+                try:
+                    performance, trade_performance, trades = future.result()
                 except Exception as e:
-                    print(f'Hubo un error en {ticker.Name}_{timeframe.Name}_{risk}')
+                    errors.append(f'{bot_name}: {e}')
+                    continue
+
+                print(bot_name)
+                bot, is_new = bots[bot_name]
+                pending.append((bot, is_new, performance, trade_performance, trades))
+                
+                if len(pending) >= batch_size:
+                    write_pending()
+
+        if pending:
+            write_pending()
+
+        if errors:
+            return OperationResult(
+                ok=False, 
+                message=f'Fallaron {len(errors)} de {len(jobs)} backtests: ' + '; '.join(errors), 
+                item=errors
+            )
                     
         return OperationResult(ok=True, message=None, item=None)
     
     
+    def _save_results(self, results, date_from, date_to, risk, method, initial_cash, metatrader_name) -> list:
+        ''' Guarda los resultados en un unico commit. Si la tanda falla se reintenta cada bot
+        en su propia transaccion, asi un registro roto no se lleva a los demas. Devuelve los errores '''
+        args = (date_from, date_to, risk, method, initial_cash, metatrader_name)
+
+        try:
+            with self.db_service.get_database() as db:
+                for result in results:
+                    self._write_result(db, *result, *args)
+            return []
+
+        except Exception:
+            errors = []
+            for result in results:
+                try:
+                    with self.db_service.get_database() as db:
+                        self._write_result(db, *result, *args)
+                except Exception as e:
+                    errors.append(f'{result[0].Name}: {e}')
+
+            return errors
+
+    def _write_result(self, db, bot, is_new, performance, trade_performance, trades, date_from, date_to, risk, method, initial_cash, metatrader_name):
+        bot_performance_for_db = _performance_from_df_to_obj(
+            performance, 
+            date_from, 
+            date_to, 
+            risk, 
+            method, 
+            bot,
+            initial_cash,
+            metatrader_name
+        )
+        
+        trade_performance_for_db = [BotTradePerformance(**row) for _, row in trade_performance.iterrows()].pop()
+        trade_performance_for_db.BotPerformance = bot_performance_for_db # Clave foranea con BotPerformance
+
+        if is_new:
+            self.db_service.create(db, bot)
+            
+        self.db_service.create(db, bot_performance_for_db)
+        self.db_service.create(db, trade_performance_for_db)
+        
+        trade_history = [Trade(**row) for _, row in trades.iterrows()]
+        for trade in trade_history:
+            trade.BotPerformance = bot_performance_for_db
+        self.db_service.create_all(db, trade_history)
+
+    def get_backtest_plot(self, bot_id, date_from, date_to) -> OperationResult:
+        ''' Path al grafico de bt.py del backtest, generado a partir de los trades guardados '''
+        result_performance = self.get_performances_by_bot_dates(bot_id=bot_id, date_from=date_from, date_to=date_to)
+        
+        if not result_performance.ok:
+            return result_performance
+        
+        bot_performance = result_performance.item
+        if bot_performance is None:
+            return OperationResult(ok=False, message='No existe el backtest', item=None)
+        
+        try:
+            path = self.plot_cache.get(
+                _plot_file_name(bot_performance),
+                lambda filename: self._backtest_result(bot_performance).plot(filename=filename)
+            )
+            
+            return OperationResult(ok=True, message=None, item=path)
+        
+        except Exception as e:
+            return OperationResult(ok=False, message=str(e), item=None)
+
+    def _backtest_result(self, bot_performance: BotPerformance) -> BacktestResult:
+        bot = bot_performance.Bot
+        strategy_func = load_function('app.backbone.strategies.' + bot.Strategy.Name)
+        
+        prices = get_data(
+            bot.Ticker.Name, 
+            bot.Timeframe.MetaTraderNumber, 
+            Timestamp(bot_performance.DateFrom, tz='UTC'), 
+            Timestamp(bot_performance.DateTo, tz='UTC')
+        )
+
+        (
+            scaled_pip_value,
+            scaled_minimum_lot,
+            scaled_maximum_lot,
+            scaled_contract_volume,
+            minimum_fraction,
+            trade_tick_value_loss,
+            volume_step,
+        ) = get_scaled_symbol_metadata(bot.Ticker.Name)
+
+        scaled_prices = prices.copy()
+        scaled_prices.loc[:, ["Open", "High", "Low", "Close"]] = (
+            scaled_prices.loc[:, ["Open", "High", "Low", "Close"]].copy() * minimum_fraction
+        )
+
+        trades = get_trade_df_from_db(bot_performance.TradeHistory, bot_performance.Id)
+
+        return BacktestResult.from_trades(
+            trades=trades,
+            prices=scaled_prices,
+            initial_cash=bot_performance.InitialCash,
+            strategy=strategy_func,
+            params={
+                'pip_value': scaled_pip_value,
+                'minimum_lot': scaled_minimum_lot,
+                'maximum_lot': scaled_maximum_lot,
+                'contract_volume': scaled_contract_volume,
+                'trade_tick_value_loss': trade_tick_value_loss,
+                'volume_step': volume_step,
+                'risk': bot.Risk,
+            }
+        )
+
     def get_performances_by_strategy_ticker(self, strategy_id, ticker_id) -> OperationResult:
         with self.db_service.get_database() as db:
             try:
@@ -268,6 +451,8 @@ class BacktestService:
 
                 if os.path.exists(os.path.join(plot_path, 'correlation_plots', file_name)):
                     os.remove(os.path.join(plot_path, 'correlation_plots', file_name))
+
+                self.plot_cache.remove(_plot_file_name(bot_performance))
                     
                 # Eliminar registros en RandomTest y su relación con RandomTestPerformanceId
                 random_tests = self.db_service.get_many_by_filter(db, RandomTest, BotPerformanceId=bot_performance_id)
@@ -1,4 +1,6 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import numpy as np
 from sklearn.linear_model import LinearRegression
 import yaml
@@ -10,12 +12,13 @@ from app.backbone.entities.metric_wharehouse import MetricWharehouse
 from app.backbone.entities.montecarlo_test import MontecarloTest
 from app.backbone.entities.random_test import RandomTest
 from app.backbone.entities.trade import Trade
-from app.backbone.services.backtest_service import BacktestService
+from app.backbone.services.backtest_service import BACKTEST_MAX_WORKERS, BacktestService
 from app.backbone.services.operation_result import OperationResult
 from app.backbone.services.utils import _performance_from_df_to_obj, get_trade_df_from_db
 from app.backbone.utils.get_data import get_data
 from app.backbone.utils.general_purpose import load_function
-from app.backbone.utils.montecarlo_utils import max_drawdown, monte_carlo_simulation_v2
+from app.backbone.utils.metrics import stability_ratio
+from app.backbone.utils.montecarlo_utils import max_drawdown, monte_carlo_simulation_v2, spawn_rngs
 from app.backbone.utils.wfo_utils import run_strategy
 import pandas as pd
 import plotly.express as px
@@ -23,13 +26,19 @@ import plotly.graph_objects as go
 
 
 
+def _run_random_iteration(rng, params, **kwargs):
+    ''' Una iteracion del random test con su propio generador '''
+    performance, trade_performance, _ = run_strategy(opt_params={**params, 'rng': rng}, **kwargs)
+    return performance, trade_performance
+
+
 class TestService:
     
     def __init__(self):
         self.db_service = DbService()
         self.backtest_service = BacktestService()
         
-    def run_montecarlo_test(self, bot_performance_id, n_simulations, threshold_ruin) -> OperationResult:
+    def run_montecarlo_test(self, bot_performance_id, n_simulations, threshold_ruin, seed=None) -> OperationResult:
         result = self.backtest_service.get_bot_performance_by_id(bot_performance_id=bot_performance_id)
         
         if not result.ok:
@@ -47,6 +56,8 @@ class TestService:
                 threshold_ruin=threshold_ruin,
                 return_raw_curves=False,
                 percentiles=[0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95],
+                rng=seed,
+                max_workers=BACKTEST_MAX_WORKERS,
             )
 
             mc = mc.round(3).reset_index().rename(
@@ -144,9 +155,7 @@ class TestService:
             ret_dd = (ret / dd).round(3)
             custom_metric = ((ret / (1 + dd)) * np.log(1 + filtered_trades.shape[0])).round(3)
             
-            x = np.arange(filtered_trades.shape[0]).reshape(-1, 1)
-            reg = LinearRegression().fit(x, filtered_trades['Equity'])
-            stability_ratio = round(reg.score(x, filtered_trades['Equity']), 3)
+            equity_stability_ratio = round(stability_ratio(filtered_trades['Equity']), 3)
             new_winrate = round(
                 (filtered_trades[filtered_trades['PnL']>0]['Id'].size / filtered_trades['Id'].size) * 100, 3
             )
@@ -155,7 +164,7 @@ class TestService:
                 'DateFrom': performance.DateFrom,
                 'DateTo': performance.DateTo,
                 'BotId': None,
-                'StabilityRatio': stability_ratio,
+                'StabilityRatio': equity_stability_ratio,
                 'Trades': filtered_trades['Id'].size,
                 'Return': ret,
                 'Drawdown': dd,
@@ -263,7 +272,7 @@ class TestService:
         with open(os.path.join(plot_path, file_name), 'w') as f:
             f.write(json_content)
             
-    def run_random_test(self, bot_performance_id, n_iterations) -> OperationResult:
+    def run_random_test(self, bot_performance_id, n_iterations, seed=None, max_workers=None) -> OperationResult:
         result = self.backtest_service.get_bot_performance_by_id(bot_performance_id=bot_performance_id)
         if not result.ok:
             return result
@@ -317,23 +326,31 @@ class TestService:
                 'std_trade_duration': std_trade_duration,
             }
             
-            mean_performance = pd.DataFrame()
-            mean_trade_performance = pd.DataFrame()
-            
-            for _ in range(0, n_iterations):
-                performance, trade_performance, stats = run_strategy(
-                    strategy=strategy_func,
-                    ticker=ticker.Name,
-                    risk=bot_performance.Bot.Risk,
-                    commission=ticker.Commission,
-                    prices=prices,
-                    initial_cash=bot_performance.InitialCash,
-                    margin=1 / leverage, 
-                    opt_params=params
-                )
+            run_iteration = partial(
+                _run_random_iteration,
+                params=params,
+                strategy=strategy_func,
+                ticker=ticker.Name,
+                risk=bot_performance.Bot.Risk,
+                commission=ticker.Commission,
+                prices=prices,
+                initial_cash=bot_performance.InitialCash,
+                margin=1 / leverage,
+            )
+
+            # Cada iteracion tiene su generador derivado de seed: el promedio es el mismo
+            # corriendo en serie o repartido entre procesos (map mantiene el orden)
+            rngs = spawn_rngs(seed, n_iterations)
+            max_workers = max(1, min(max_workers or BACKTEST_MAX_WORKERS, n_iterations))
+
+            if max_workers > 1:
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    results = list(executor.map(run_iteration, rngs, chunksize=-(-n_iterations // max_workers)))
+            else:
+                results = [run_iteration(rng) for rng in rngs]
 
-                mean_performance = pd.concat([mean_performance, performance])
-                mean_trade_performance = pd.concat([mean_trade_performance, trade_performance])
+            mean_performance = pd.concat([performance for performance, _ in results])
+            mean_trade_performance = pd.concat([trade_performance for _, trade_performance in results])
                 
             mean_performance = mean_performance.mean().round(3).to_frame().T
             mean_trade_performance = mean_trade_performance.mean().round(3).to_frame().T
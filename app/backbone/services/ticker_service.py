@@ -7,7 +7,7 @@ from backbone.database.db_service import DbService
 from backbone.services.operation_result import OperationResult
 from backbone.entities.ticker import Ticker
 from backbone.entities.category import Category
-import MetaTrader5 as mt5
+from app.backbone.utils.metatrader import mt5
 
 class TickerService:
     def __init__(self):
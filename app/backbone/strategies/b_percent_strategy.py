@@ -1,14 +1,14 @@
-from backtesting import Strategy
+from app.backbone.strategies.base_strategy import BaseStrategy
 import talib as ta
 from backbone.trader_bot import TraderBot
 import numpy as np
-import MetaTrader5 as mt5
+from app.backbone.utils.metatrader import mt5
 import numpy as np
 from backbone.utils.general_purpose import calculate_units_size, diff_pips
 
 np.seterr(divide='ignore')
 
-class BPercent(Strategy):
+class BPercent(BaseStrategy):
     pip_value = None
     minimum_lot = None
     maximum_lot = None
@@ -40,13 +40,33 @@ class BPercent(Strategy):
         
         self.atr = self.I(ta.ATR, self.data.High, self.data.Low, self.data.Close)
         
-    def next(self):
+    @classmethod
+    def signals(cls, data, params):
+        ''' Mismas reglas que next pero sobre toda la serie, para el motor vectorizado '''
+        close = data['Close']
+        sma = ta.SMA(close, timeperiod=params.sma_period)
+        upper_band, middle_band, lower_band = ta.BBANDS(
+            close,
+            timeperiod=params.bbands_timeperiod,
+            nbdevup=params.bband_std,
+            nbdevdn=params.bband_std
+        )
+        atr = ta.ATR(data['High'], data['Low'], close)
+
+        b_percent = (close - lower_band) / (upper_band - lower_band)
+
+        return {
+            'indicators': [sma, np.array([upper_band, middle_band, lower_band]), atr],
+            'long_entry': (b_percent <= 1 - params.b_open_threshold) & (close > sma),
+            'short_entry': (b_percent >= params.b_open_threshold) & (close < sma),
+            'long_exit': b_percent >= params.b_close_threshold,
+            'short_exit': b_percent <= 1 - params.b_close_threshold,
+            'sl_distance': params.atr_multiplier * atr,
+        }
         
-        actual_date = self.data.index[-1]
+    def next(self):
         
-        if self.opt_params and actual_date in self.opt_params.keys():
-            self.b_open_threshold = self.opt_params[actual_date]['b_open_threshold']
-            self.b_close_threshold = self.opt_params[actual_date]['b_open_threshold']
+        self.apply_opt_params()
         
         price = self.data.Close[-1]
         b_percent = (price - self.lower_band[-1]) / (self.upper_band[-1] - self.lower_band[-1])
@@ -0,0 +1,126 @@
+import functools
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+from backtesting import Strategy
+from app.backbone.utils.indicator_cache import INDICATOR_CACHE_ENABLED, indicator_cache
+
+
+def compile_opt_params(opt_params, index: pd.Index):
+    ''' Pasa el historial de parametros de walk_forward ({fecha: {param: valor}}) a
+    posiciones de vela donde cambian los parametros y los parametros de cada cambio.
+
+    Cada fecha se ubica en la primera vela igual o posterior; las fechas que quedan
+    despues de la ultima vela no se aplican.
+    '''
+    if not opt_params:
+        return np.empty(0, dtype=np.int64), []
+
+    # Las fechas pueden venir como texto (YAML, base de datos)
+    opt_params = {pd.Timestamp(key): value for key, value in opt_params.items()}
+    dates = sorted(opt_params.keys())
+
+    change_dates = pd.DatetimeIndex(dates)
+    if change_dates.tz is None and index.tz is not None:
+        change_dates = change_dates.tz_localize(index.tz)
+    elif change_dates.tz is not None and index.tz is None:
+        change_dates = change_dates.tz_localize(None)
+
+    bars = index.searchsorted(change_dates)
+
+    in_range = bars < len(index)
+    values = [opt_params[date] for date, keep in zip(dates, in_range) if keep]
+
+    return bars[in_range].astype(np.int64), values
+
+
+def _is_compact(value) -> bool:
+    return isinstance(value, (np.ndarray, pd.Series)) and value.dtype == np.float32
+
+
+def _float64_inputs(func):
+    ''' talib solo acepta float64: las velas float32 del modo compacto se le pasan convertidas.
+    La copia dura lo que la llamada al indicador; lo que devuelve talib es float64 en los dos modos '''
+    @functools.wraps(func)
+    def float64_func(*args, **kwargs):
+        args = [np.asarray(arg, dtype=np.float64) if _is_compact(arg) else arg for arg in args]
+        kwargs = {k: np.asarray(v, dtype=np.float64) if _is_compact(v) else v for k, v in kwargs.items()}
+        return func(*args, **kwargs)
+
+    return float64_func
+
+
+def _is_schedule_date(key, value) -> bool:
+    ''' True si la clave de opt_params es una fecha del historial de walk_forward, False si
+    es el nombre de un parametro '''
+    if isinstance(key, (pd.Timestamp, datetime, date)):
+        return True
+
+    if not isinstance(key, str):
+        raise Exception(f'Clave de opt_params de tipo no soportado: {key!r} ({type(key).__name__})')
+
+    # Un nombre de parametro lleva un valor; una fecha del historial, el dict de parametros
+    if not isinstance(value, dict):
+        return False
+
+    try:
+        pd.Timestamp(key)
+    except ValueError:
+        raise Exception(f'Clave de opt_params con un dict de parametros que no es una fecha: {key!r}')
+
+    return True
+
+
+def _is_schedule(opt_params) -> bool:
+    if not opt_params:
+        return False
+
+    is_date = [_is_schedule_date(key, value) for key, value in opt_params.items()]
+    if any(is_date) and not all(is_date):
+        raise Exception('opt_params mezcla fechas del historial de walk_forward con parametros fijos')
+
+    return all(is_date)
+
+
+class BaseStrategy(Strategy):
+    ''' Strategy de backtesting.py cuyos self.I pasan por el cache de indicadores y que
+    aplica los opt_params de walk_forward por posicion de vela.
+
+    opt_params puede ser el historial de walk_forward ({fecha: {param: valor}}), que se
+    aplica con apply_opt_params al principio de next, o un dict de parametros fijos
+    ({param: valor}) que se aplica antes de init.
+    '''
+    opt_params = None
+
+    def __init__(self, broker, data, params):
+        super().__init__(broker, data, params)
+
+        if _is_schedule(self.opt_params):
+            self._param_bars, self._param_values = compile_opt_params(self.opt_params, data.index)
+        else:
+            self._param_bars, self._param_values = np.empty(0, dtype=np.int64), []
+            for k, v in (self.opt_params or {}).items():
+                setattr(self, k, v)
+
+        self._next_param_change = 0
+
+    def I(self, func, *args, **kwargs):
+        if any(_is_compact(arg) for arg in (*args, *kwargs.values())):
+            func = _float64_inputs(func)
+
+        if INDICATOR_CACHE_ENABLED:
+            func = indicator_cache.wrap(func)
+
+        return super().I(func, *args, **kwargs)
+
+    def apply_opt_params(self):
+        ''' Aplica los parametros que empiezan a regir en la vela actual (o antes, si se salteo alguna) '''
+        if self._next_param_change >= len(self._param_bars):
+            return
+
+        bar = len(self.data) - 1
+        while self._next_param_change < len(self._param_bars) and self._param_bars[self._next_param_change] <= bar:
+            for k, v in self._param_values[self._next_param_change].items():
+                setattr(self, k, v)
+
+            self._next_param_change += 1
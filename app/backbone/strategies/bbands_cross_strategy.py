@@ -1,16 +1,16 @@
 import talib as ta
 from backbone.trader_bot import TraderBot
-from backtesting import Strategy
+from app.backbone.strategies.base_strategy import BaseStrategy
 from backtesting.lib import crossover
 import numpy as np
-import MetaTrader5 as mt5
+from app.backbone.utils.metatrader import mt5
 import numpy as np
 
-from backbone.utils.general_purpose import calculate_units_size, diff_pips
+from backbone.utils.general_purpose import calculate_units_size, crossover_signal, diff_pips
 
 np.seterr(divide='ignore')
 
-class BbandsCross(Strategy):
+class BbandsCross(BaseStrategy):
     pip_value = None
     minimum_lot = None
     maximum_lot = None
@@ -43,7 +43,30 @@ class BbandsCross(Strategy):
             nbdevdn=self.bband_std
         )
 
+    @classmethod
+    def signals(cls, data, params):
+        ''' Mismas reglas que next pero sobre toda la serie, para el motor vectorizado '''
+        close = data['Close']
+        sma = ta.SMA(close, timeperiod=params.sma_period)
+        atr = ta.ATR(data['High'], data['Low'], close)
+        upper_band, middle_band, lower_band = ta.BBANDS(
+            close,
+            timeperiod=params.bbands_timeperiod,
+            nbdevup=params.bband_std,
+            nbdevdn=params.bband_std
+        )
+
+        return {
+            'indicators': [sma, atr, np.array([upper_band, middle_band, lower_band])],
+            'long_entry': crossover_signal(close, lower_band) & (close > sma),
+            'short_entry': crossover_signal(upper_band, close) & (close < sma),
+            'long_exit': crossover_signal(close, middle_band),
+            'short_exit': crossover_signal(middle_band, close),
+            'sl_distance': params.atr_multiplier * atr,
+        }
+
     def next(self):
+        self.apply_opt_params()
         
         if self.position:
             if self.position.is_long:
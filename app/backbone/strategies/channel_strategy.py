@@ -1,15 +1,15 @@
 import talib as ta
 from backbone.trader_bot import TraderBot
-from backtesting import Strategy
+from app.backbone.strategies.base_strategy import BaseStrategy
 from backtesting.lib import crossover
 import numpy as np
-import MetaTrader5 as mt5
+from app.backbone.utils.metatrader import mt5
 import numpy as np
 
-from backbone.utils.general_purpose import calculate_units_size, diff_pips
+from backbone.utils.general_purpose import calculate_units_size, crossover_signal, diff_pips
 
 
-class Channel(Strategy):
+class Channel(BaseStrategy):
     pip_value = None
     minimum_lot = None
     maximum_lot = None
@@ -26,15 +26,30 @@ class Channel(Strategy):
         self.sma_200 = self.I(ta.SMA, self.data.Close, timeperiod=200)
         self.atr = self.I(ta.ATR, self.data.High, self.data.Low, self.data.Close)
         
-    def next(self):
-        actual_date = self.data.index[-1]
+    @classmethod
+    def signals(cls, data, params):
+        ''' Mismas reglas que next pero sobre toda la serie, para el motor vectorizado '''
+        close = data['Close']
+        sma_200 = ta.SMA(close, timeperiod=200)
+        atr = ta.ATR(data['High'], data['Low'], close)
+        sma_upper_channel = ta.SMA(data['High'], timeperiod=params.sma_period)
+        sma_lower_channel = ta.SMA(data['Low'], timeperiod=params.sma_period)
+
+        return {
+            'indicators': [sma_200, atr],
+            'long_entry': (close > sma_200) & crossover_signal(close, sma_upper_channel),
+            'short_entry': (close < sma_200) & crossover_signal(sma_lower_channel, close),
+            'long_exit': crossover_signal(sma_lower_channel, close),
+            'short_exit': crossover_signal(close, sma_upper_channel),
+            'sl_distance': params.atr_multiplier * atr,
+        }
         
-        if self.opt_params and actual_date in self.opt_params.keys():
-            for k, v in self.opt_params[actual_date].items():
-                setattr(self, k, v)
+    def next(self):
+        self.apply_opt_params()
             
-        self.sma_upper_channel = ta.SMA(self.data.High, timeperiod=self.sma_period)
-        self.sma_lower_channel = ta.SMA(self.data.Low, timeperiod=self.sma_period)
+        # talib pide float64 (en modo compacto las velas son float32)
+        self.sma_upper_channel = ta.SMA(np.asarray(self.data.High, dtype=np.float64), timeperiod=self.sma_period)
+        self.sma_lower_channel = ta.SMA(np.asarray(self.data.Low, dtype=np.float64), timeperiod=self.sma_period)
         
         if self.position:
             if self.position.is_long:
@@ -100,14 +115,11 @@ class Channel(Strategy):
                 
                 
     def next_live(self, trader:TraderBot):
-        actual_date = self.data.index[-1]
         actual_close = self.data.Close[-1]
         
         open_positions = trader.get_open_positions()
         
-        if self.opt_params and actual_date in self.opt_params.keys():
-            for k, v in self.opt_params[actual_date].items():
-                setattr(self, k, v)
+        self.apply_opt_params()
             
         self.sma_upper_channel = ta.SMA(self.data.High, timeperiod=self.sma_period)
         self.sma_lower_channel = ta.SMA(self.data.Low, timeperiod=self.sma_period)
@@ -1,14 +1,15 @@
 import talib as ta
 from backbone.trader_bot import TraderBot
-from backtesting import Strategy
+from app.backbone.strategies.base_strategy import BaseStrategy
 import numpy as np
-import MetaTrader5 as mt5
+from app.backbone.utils.metatrader import mt5
+from app.backbone.utils.calendar_features import calendar_features
 from backbone.utils.general_purpose import diff_pips, calculate_units_size
 
 
 np.seterr(divide='ignore')
 
-class DayPerWeek(Strategy):
+class DayPerWeek(BaseStrategy):
     pip_value = None
     minimum_lot = None
     maximum_lot = None
@@ -33,14 +34,12 @@ class DayPerWeek(Strategy):
             ta.RSI, self.data.Close, 2
         )
         
-    def next(self):
-        actual_date = self.data.index[-1]
+        self.calendar = calendar_features(self.data.index)
         
-        if self.opt_params and actual_date in self.opt_params.keys():
-            for k, v in self.opt_params[actual_date].items():
-                setattr(self, k, v)
+    def next(self):
+        self.apply_opt_params()
         
-        today = self.data.index[-1]
+        bar = len(self.data) - 1
         if self.position:
             if self.position.is_long:
                 if self.rsi > self.rsi_upper_threshold:
@@ -50,7 +49,7 @@ class DayPerWeek(Strategy):
             price = self.data.Close[-1]
             
             # es el dia de compra, el precio esta por encima de la sma
-            if today.day_of_week == self.day_to_buy and self.data.Close[-1] > self.sma[-1]:
+            if self.calendar['DayOfWeek'][bar] == self.day_to_buy and self.data.Close[-1] > self.sma[-1]:
                 sl_price = price - self.atr_multiplier * self.atr[-1]
                 
                 pip_distance = diff_pips(
@@ -1,8 +1,8 @@
-from backtesting import Strategy
+from app.backbone.strategies.base_strategy import BaseStrategy
 from backtesting.lib import crossover
 import talib as ta
 import numpy as np
-import MetaTrader5 as mt5
+from app.backbone.utils.metatrader import mt5
 from backbone.trader_bot import TraderBot
 from backbone.utils.general_purpose import calculate_units_size, diff_pips
 import pandas_ta
@@ -18,7 +18,7 @@ def super_trend_indicator(high, low, close, lenght=7, multiplier=3):
     
     return sti[f'SUPERTd_{lenght}_{multiplier}.0']
 
-class DemaSuperTrend2(Strategy):
+class DemaSuperTrend2(BaseStrategy):
     pip_value = None
     minimum_lot = None
     maximum_lot = None
@@ -43,11 +43,7 @@ class DemaSuperTrend2(Strategy):
         self.supertrend_signal_112 = self.I(super_trend_indicator,self.data.High, self.data.Low, self.data.Close, lenght=11, multiplier=2)
         
     def next(self):
-        actual_date = self.data.index[-1]
-        
-        if self.opt_params and actual_date in self.opt_params.keys():
-            for k, v in self.opt_params[actual_date].items():
-                setattr(self, k, v)
+        self.apply_opt_params()
         
         actual_super_trend = getattr(self, self.super_trend_to_use)
         
@@ -119,8 +115,6 @@ class DemaSuperTrend2(Strategy):
     
     def next_live(self, trader: TraderBot):
 
-        actual_date = self.data.index[-1]
-        
         actual_super_trend = getattr(self, self.super_trend_to_use)
         
         st_buy_signal = actual_super_trend[-1] == 1 and actual_super_trend[-2] == -1
@@ -2,15 +2,17 @@ from datetime import datetime, timedelta
 import pytz
 import talib as ta
 from backbone.trader_bot import TraderBot
-from backtesting import Strategy, Backtest
+from backtesting import Backtest
+from app.backbone.strategies.base_strategy import BaseStrategy
 import numpy as np
-import MetaTrader5 as mt5
+from app.backbone.utils.metatrader import mt5
+from app.backbone.utils.calendar_features import calendar_features, SECONDS_PER_DAY
 import numpy as np
 
 np.seterr(divide='ignore')
 
 
-class EndOfMonth(Strategy):
+class EndOfMonth(BaseStrategy):
     risk=None
     n=10
     day_to_buy = 25
@@ -24,13 +26,15 @@ class EndOfMonth(Strategy):
             ta.RSI, self.data.Close, 2
         )
         
+        self.calendar = calendar_features(self.data.index)
+        
     def next(self):
-        today = self.data.index[-1]
+        bar = len(self.data) - 1
+        time = self.calendar['Time']
 
         if self.position:
             first_trade = self.trades[0]
-            time_in_position = (today - first_trade.entry_time)
-            time_in_position = time_in_position.days
+            time_in_position = (time[bar] - time[first_trade.entry_bar]) // SECONDS_PER_DAY
 
             if self.position.is_long:
                 if self.rsi_2 > 90:
@@ -40,7 +44,8 @@ class EndOfMonth(Strategy):
             today_bearish = self.data.Close[-1] < self.data.Open[-1]
             yesterday_bearish = self.data.Close[-2] < self.data.Open[-2
                                                                  ]
-            if today.day >= 25 and today.day <= 31 and today_bearish and yesterday_bearish:
+            day_of_month = self.calendar['DayOfMonth'][bar]
+            if day_of_month >= 25 and day_of_month <= 31 and today_bearish and yesterday_bearish:
                 
                 capital_to_risk = self.equity * self.risk / 100
                 units = int(capital_to_risk / self.data.Close[-1])
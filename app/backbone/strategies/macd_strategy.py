@@ -2,13 +2,14 @@ from datetime import datetime, timedelta
 import pytz
 import talib as ta
 from backbone.trader_bot import TraderBot
-from backtesting import Strategy, Backtest
+from backtesting import Backtest
+from app.backbone.strategies.base_strategy import BaseStrategy
 from backtesting.lib import crossover
 import numpy as np
-import MetaTrader5 as mt5
+from app.backbone.utils.metatrader import mt5
 import numpy as np
 
-from backbone.utils.general_purpose import calculate_units_size, diff_pips
+from backbone.utils.general_purpose import calculate_units_size, crossover_signal, diff_pips
 
 np.seterr(divide='ignore')
 
@@ -16,7 +17,7 @@ np.seterr(divide='ignore')
 def  optim_func(series):
     return (series['Return [%]'] /  (1 + (-1*series['Max. Drawdown [%]']))) * np.log(1 + series['# Trades'])
 
-class Macd(Strategy):
+class Macd(BaseStrategy):
     pip_value = None
     minimum_lot = None
     maximum_lot = None
@@ -54,7 +55,34 @@ class Macd(Strategy):
         
         self.rsi = self.I(ta.RSI, self.data.Close, timeperiod=self.rsi_period)
 
+    @classmethod
+    def signals(cls, data, params):
+        ''' Mismas reglas que next pero sobre toda la serie, para el motor vectorizado '''
+        close = data['Close']
+        sma = ta.SMA(close, timeperiod=params.sma_period)
+        macd, macdsignal, macdhist = ta.MACD(
+            close,
+            fastperiod=params.macd_fast_period,
+            slowperiod=params.macd_slow_period,
+            signalperiod=params.macd_signal_period
+        )
+        atr = ta.ATR(data['High'], data['Low'], close)
+        rsi = ta.RSI(close, timeperiod=params.rsi_period)
+
+        cum_rsi = rsi + np.r_[np.nan, rsi[:-1]]
+
+        return {
+            'indicators': [sma, np.array([macd, macdsignal, macdhist]), atr, rsi],
+            'long_entry': crossover_signal(macdsignal, macd) & (cum_rsi <= 100 - params.cum_rsi_open_threshold) & (close > sma),
+            'short_entry': crossover_signal(macd, macdsignal) & (cum_rsi >= params.cum_rsi_open_threshold) & (close < sma),
+            'long_exit': cum_rsi > params.cum_rsi_close_threshold,
+            'short_exit': cum_rsi < 100 - params.cum_rsi_close_threshold,
+            'sl_distance': params.atr_multiplier * atr,
+        }
+
     def next(self):
+        self.apply_opt_params()
+        
         cum_rsi = self.rsi[-1] + self.rsi[-2]
         price = self.data.Close[-1]
     
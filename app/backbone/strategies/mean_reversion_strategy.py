@@ -1,13 +1,13 @@
-from backtesting import Strategy
+from app.backbone.strategies.base_strategy import BaseStrategy
 import talib as ta
 import numpy as np
-import MetaTrader5 as mt5
+from app.backbone.utils.metatrader import mt5
 from backbone.trader_bot import TraderBot
 from backbone.utils.general_purpose import calculate_units_size, diff_pips
 
 np.seterr(divide='ignore')
 
-class MeanReversion(Strategy):
+class MeanReversion(BaseStrategy):
     pip_value = None
     minimum_lot = None
     maximum_lot = None
@@ -30,11 +30,7 @@ class MeanReversion(Strategy):
         
     def next(self):
         
-        actual_date = self.data.index[-1]
-        
-        if self.opt_params and actual_date in self.opt_params.keys():
-            for k, v in self.opt_params[actual_date].items():
-                setattr(self, k, v)
+        self.apply_opt_params()
 
         # Precio actual y valor de la SMA
         price = self.data.Close[-1]
@@ -1,16 +1,16 @@
 import talib as ta
 from backbone.trader_bot import TraderBot
-from backtesting import Strategy
+from app.backbone.strategies.base_strategy import BaseStrategy
 from backtesting.lib import crossover
 import numpy as np
-import MetaTrader5 as mt5
+from app.backbone.utils.metatrader import mt5
 import numpy as np
 import pandas as pd
 
 from backbone.utils.general_purpose import calculate_units_size, diff_pips
 
 
-class RandomTrader(Strategy):
+class RandomTrader(BaseStrategy):
     pip_value = None
     minimum_lot = None
     maximum_lot = None
@@ -31,12 +31,12 @@ class RandomTrader(Strategy):
     
     atr_multiplier = 1.5
 
+    # Semilla (int, SeedSequence o Generator). Sin semilla cada corrida es distinta
+    rng = None
+
     def init(self):
         self.atr = self.I(ta.ATR, self.data.High, self.data.Low, self.data.Close)
-        
-        if self.opt_params:
-            for k, v in self.opt_params.items():
-                setattr(self, k, v)
+        self._rng = np.random.default_rng(self.rng)
         
         
     def next(self):
@@ -53,9 +53,9 @@ class RandomTrader(Strategy):
             long = None
             short = None
 
-            if np.random.rand() < self.prob_trade:
+            if self._rng.random() < self.prob_trade:
                 trade = True
-                if np.random.rand() < self.prob_long:
+                if self._rng.random() < self.prob_long:
                     long = True
                 else:
                     short = True
@@ -87,7 +87,7 @@ class RandomTrader(Strategy):
                     sl=sl_price
                 )
                 
-                self.max_pos_hold = np.round(np.random.normal(self.avg_position_hold, self.std_position_hold, 1)[0])
+                self.max_pos_hold = np.round(self._rng.normal(self.avg_position_hold, self.std_position_hold))
                 
             if trade and short:        
                 sl_price = price + self.atr_multiplier * self.atr[-1]
@@ -114,7 +114,7 @@ class RandomTrader(Strategy):
                     sl=sl_price
                 )
                 
-                self.max_pos_hold = np.round(np.random.normal(self.avg_position_hold, self.std_position_hold, 1)[0])
+                self.max_pos_hold = np.round(self._rng.normal(self.avg_position_hold, self.std_position_hold))
                 
                 
     
\ No newline at end of file
@@ -1,9 +1,9 @@
 import talib as ta
 from backbone.trader_bot import TraderBot
-from backtesting import Strategy
+from app.backbone.strategies.base_strategy import BaseStrategy
 from backtesting.lib import crossover
 import numpy as np
-import MetaTrader5 as mt5
+from app.backbone.utils.metatrader import mt5
 import numpy as np
 import pandas as pd
 
@@ -18,7 +18,7 @@ def ibs_indicator(high, low, close):
     return ibs
     
 
-class ShortIBS(Strategy):
+class ShortIBS(BaseStrategy):
     pip_value = None
     minimum_lot = None
     maximum_lot = None
@@ -39,13 +39,9 @@ class ShortIBS(Strategy):
         
     
     def next(self):
-        actual_date = self.data.index[-1]
-        
         actual_ibs = self.ibs[-1]
         
-        if self.opt_params and actual_date in self.opt_params.keys():
-            for k, v in self.opt_params[actual_date].items():
-                setattr(self, k, v)
+        self.apply_opt_params()
             
         if self.position:
             if self.position.is_short:
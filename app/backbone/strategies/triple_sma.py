@@ -1,16 +1,16 @@
 import talib as ta
 from backbone.trader_bot import TraderBot
-from backtesting import Strategy
+from app.backbone.strategies.base_strategy import BaseStrategy
 from backtesting.lib import crossover
 import numpy as np
-import MetaTrader5 as mt5
+from app.backbone.utils.metatrader import mt5
 import numpy as np
 import pandas as pd
 
 from backbone.utils.general_purpose import calculate_units_size, diff_pips
 
 
-class TripleSMA(Strategy):
+class TripleSMA(BaseStrategy):
     pip_value = None
     minimum_lot = None
     maximum_lot = None
@@ -30,14 +30,33 @@ class TripleSMA(Strategy):
         
         self.sma_200 = self.I(ta.SMA, self.data.Close, timeperiod=200)
         
+    @classmethod
+    def signals(cls, data, params):
+        ''' Mismas reglas que next pero sobre toda la serie, para el motor vectorizado '''
+        close = data['Close']
+        atr = ta.ATR(data['High'], data['Low'], close)
+        sma_12 = ta.SMA(close, timeperiod=12)
+        sma_8 = ta.SMA(close, timeperiod=8)
+        sma_5 = ta.SMA(close, timeperiod=5)
+        sma_200 = ta.SMA(close, timeperiod=200)
+
+        up_trend = (sma_5 > sma_8) & (sma_8 > sma_12)
+        down_trend = (sma_5 < sma_8) & (sma_8 < sma_12)
+        past_up_trend = np.r_[False, up_trend[:-1]]
+        past_down_trend = np.r_[False, down_trend[:-1]]
+
+        return {
+            'indicators': [atr, sma_12, sma_8, sma_5, sma_200],
+            'long_entry': up_trend & ~past_up_trend & (close > sma_200),
+            'short_entry': down_trend & ~past_down_trend & (close < sma_200),
+            'long_exit': ~up_trend,
+            'short_exit': ~down_trend,
+            'sl_distance': params.atr_multiplier * atr,
+        }
         
     def next(self):
         
-        actual_date = self.data.index[-1]
-        
-        if self.opt_params and actual_date in self.opt_params.keys():
-            for k, v in self.opt_params[actual_date].items():
-                setattr(self, k, v)
+        self.apply_opt_params()
 
         price = self.data.Close[-1]
         actual_up_trend = self.sma_5[-1] > self.sma_8[-1] > self.sma_12[-1]
@@ -1,8 +1,8 @@
-from backtesting import Strategy
+from app.backbone.strategies.base_strategy import BaseStrategy
 from backtesting.lib import crossover
 import talib as ta
 import numpy as np
-import MetaTrader5 as mt5
+from app.backbone.utils.metatrader import mt5
 from backbone.trader_bot import TraderBot
 from backbone.utils.general_purpose import calculate_units_size, diff_pips
 import pandas_ta
@@ -18,7 +18,7 @@ def super_trend_indicator(high, low, close, lenght=7, multiplier=3):
     
     return sti[f'SUPERTd_{lenght}_{multiplier}.0']
 
-class TripleSuperTrend(Strategy):
+class TripleSuperTrend(BaseStrategy):
     pip_value = None
     minimum_lot = None
     maximum_lot = None
@@ -39,6 +39,7 @@ class TripleSuperTrend(Strategy):
         self.supertrend_signal_112 = self.I(super_trend_indicator, self.data.High, self.data.Low, self.data.Close, lenght=11, multiplier=2)
         
     def next(self):
+        self.apply_opt_params()
         
         st_buy_signal = self.supertrend_signal_123[-1] == 1 and self.supertrend_signal_101[-1] == 1 and self.supertrend_signal_112[-1] == 1
         st_sell_signal = self.supertrend_signal_123[-1] == -1 and self.supertrend_signal_101[-1] == -1 and self.supertrend_signal_112[-1] == -1
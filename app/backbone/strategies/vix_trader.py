@@ -3,9 +3,11 @@ import pandas as pd
 import pytz
 import talib as ta
 import yfinance as yf
-import MetaTrader5 as mt5
+from app.backbone.utils.metatrader import mt5
+from app.backbone.utils.calendar_features import calendar_features, SECONDS_PER_DAY
 from backbone.trader_bot import TraderBot
-from backtesting import Backtest, Strategy
+from backtesting import Backtest
+from app.backbone.strategies.base_strategy import BaseStrategy
 import numpy as np
 import numpy as np
 
@@ -28,7 +30,7 @@ def ll_hh_indicator(close, window=None):
 
     return is_lower_low, is_higher_high
 
-class VixRsi(Strategy):
+class VixRsi(BaseStrategy):
     vix_percentage_above_sma = 0.05
     ll_hh_window = 5
     rsi_threshold = 50
@@ -46,15 +48,15 @@ class VixRsi(Strategy):
         self.lower_low, self.higher_high = self.I(ll_hh_indicator, self.data.Close, window=self.ll_hh_window)
         self.atr = self.I(ta.ATR, self.data.High, self.data.Low, self.data.Close)
         
+        self.calendar = calendar_features(self.data.index)
 
     def next(self):
         actual_close = self.data.Close[-1]
 
         if self.position:
             first_trade = self.trades[0]
-            today = self.data.index[-1].tz_convert('UTC')
-            time_in_position = (today - first_trade.entry_time.tz_convert('UTC'))
-            time_in_position = time_in_position.days
+            time = self.calendar['Time']
+            time_in_position = (time[len(self.data) - 1] - time[first_trade.entry_bar]) // SECONDS_PER_DAY
 
             if self.position.is_long:
                 if self.higher_high:
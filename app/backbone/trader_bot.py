@@ -1,11 +1,12 @@
 import pandas as pd
-import MetaTrader5 as mt5
+from app.backbone.utils.metatrader import mt5
 import telebot
 from datetime import datetime
 from backtesting import Backtest
 import yaml
 import logging
 from backbone.utils.wfo_utils import get_scaled_symbol_metadata, optimization_function
+from app.backbone.utils.rolling_bar_buffer import RollingBarBuffer
 
 logger = logging.getLogger("TraderBot")
 
@@ -133,28 +134,29 @@ class TraderBot:
 
         self.opt_params["maximize"] = optimization_function
         
+        # Velas escaladas que se mantienen entre corridas, solo se piden las nuevas
+        self.bar_buffer = RollingBarBuffer(
+            ticker=self.ticker,
+            timeframe=time_frames[self.timeframe],
+            capacity=self.wfo_params["look_back_bars"] + self.wfo_params["warmup_bars"],
+            scale=self.minimum_fraction,
+        )
+        
         logger.info(f'{self.metatrader_name}: Inicializacion completada :)')
         
     def get_data(self, n_bars=None):
-        rates = self.mt5.copy_rates_from_pos(
-            self.ticker, time_frames[self.timeframe], 1, n_bars
-        )
+        ''' Devuelve las ultimas n_bars velas cerradas, ya escaladas con minimum_fraction y en UTC '''
+        self.bar_buffer.update(self.mt5)
 
-        historical_prices = pd.DataFrame(rates)
-        historical_prices["time"] = pd.to_datetime(historical_prices["time"], unit="s")
+        if len(self.bar_buffer) < self.bar_buffer.capacity:
+            logger.warning(
+                f'{self.metatrader_name}: el broker devolvio {len(self.bar_buffer)} velas de '
+                f'{self.bar_buffer.capacity} (look_back_bars + warmup_bars)'
+            )
 
-        historical_prices = historical_prices.rename(
-            columns={
-                "time": "Date",
-                "open": "Open",
-                "high": "High",
-                "low": "Low",
-                "close": "Close",
-                "tick_volume": "Volume",
-            }
-        ).set_index("Date")
+        historical_prices = self.bar_buffer.frame()
 
-        return historical_prices
+        return historical_prices.iloc[-n_bars:] if n_bars else historical_prices
 
     def get_open_positions(self):
         logger.info(f'{self.metatrader_name}: Obteniendo posiciones abiertas')
@@ -311,14 +313,7 @@ class TraderBot:
             n_bars=look_back_bars + warmup_bars,
         )
 
-        logger.info(f'{self.metatrader_name}: Datos obtenidos correctamente: {df.head(5)}')
-        df.loc[:, ["Open", "High", "Low", "Close"]] = (
-            df.loc[:, ["Open", "High", "Low", "Close"]] * self.minimum_fraction
-        )
-        
         logger.info(f'{self.metatrader_name}: Datos escalados con minimum_fraction {self.minimum_fraction}: {df.head(5)}')
-        
-        df.index = df.index.tz_localize("UTC").tz_convert("UTC")
 
         logger.info(f'{self.metatrader_name}: Obteniendo comisiones y apalancamiento para la simulacion')
         
@@ -0,0 +1,158 @@
+import os
+import pickle
+import threading
+import numpy as np
+import pandas as pd
+from backtesting._plotting import plot
+from backtesting._stats import compute_stats
+from backtesting.backtesting import _Broker, _Data
+
+# Bokeh guarda el documento en un estado global, no se pueden generar dos graficos a la vez
+_plot_lock = threading.Lock()
+
+
+class BacktestResult:
+    ''' Stats, equity y trades de una corrida que se pueden graficar despues sin volver a simular.
+
+    Se arma con los stats que devuelve run_strategy. Si los stats todavia tienen la
+    instancia de la estrategia se usan sus indicadores; si no (por ejemplo despues de
+    load) se recalculan corriendo solo el init de la estrategia sobre los precios.
+    '''
+
+    def __init__(self, stats: pd.Series, strategy=None, prices: pd.DataFrame = None, params: dict = None):
+        self.stats = stats
+
+        strategy_instance = stats.get('_strategy')
+        self._strategy_instance = strategy_instance if hasattr(strategy_instance, '_indicators') else None
+
+        if self._strategy_instance is not None:
+            strategy = strategy or type(self._strategy_instance)
+            prices = prices if prices is not None else self._strategy_instance._data.df
+            params = params if params is not None else dict(self._strategy_instance._params)
+
+        self.strategy = strategy
+        self.prices = prices
+        self.params = params or {}
+
+    @classmethod
+    def from_trades(cls, trades: pd.DataFrame, prices: pd.DataFrame, initial_cash: float, strategy=None, params: dict = None):
+        ''' Rearma el resultado a partir de los trades guardados (por ejemplo en la base) y los precios de la corrida.
+
+        La equity por vela se reconstruye con el PnL realizado mas el flotante de los trades abiertos al Close.
+        '''
+        close = prices['Close'].to_numpy(dtype=np.float64)
+        n = len(close)
+
+        trades = trades.sort_values('ExitBar').reset_index(drop=True)
+        entry_bars = trades['EntryBar'].to_numpy(dtype=np.int64)
+        exit_bars = trades['ExitBar'].to_numpy(dtype=np.int64)
+        sizes = trades['Size'].to_numpy(dtype=np.float64)
+        entry_prices = trades['EntryPrice'].to_numpy(dtype=np.float64)
+
+        equity = initial_cash + np.cumsum(np.bincount(exit_bars, weights=trades['PnL'].to_numpy(dtype=np.float64), minlength=n))[:n]
+        for entry_bar, exit_bar, size, entry_price in zip(entry_bars, exit_bars, sizes, entry_prices):
+            equity[entry_bar:exit_bar] += size * (close[entry_bar:exit_bar] - entry_price)
+
+        trades = pd.DataFrame({
+            'Size': trades['Size'].to_numpy(dtype=np.int64),
+            'EntryBar': entry_bars,
+            'ExitBar': exit_bars,
+            'EntryPrice': entry_prices,
+            'ExitPrice': trades['ExitPrice'].to_numpy(dtype=np.float64),
+            'PnL': trades['PnL'].to_numpy(dtype=np.float64),
+            'ReturnPct': trades['ReturnPct'].to_numpy(dtype=np.float64),
+            'EntryTime': prices.index[entry_bars],
+            'ExitTime': prices.index[exit_bars],
+        })
+        trades['Duration'] = trades['ExitTime'] - trades['EntryTime']
+
+        stats = compute_stats(
+            trades=trades,
+            equity=equity,
+            ohlc_data=prices,
+            strategy_instance=None,
+            risk_free_rate=0.0,
+        )
+
+        return cls(stats=stats, strategy=strategy, prices=prices, params=params)
+
+    @property
+    def equity_curve(self) -> pd.DataFrame:
+        return self.stats._equity_curve
+
+    @property
+    def trades(self) -> pd.DataFrame:
+        return self.stats._trades
+
+    def _indicators(self):
+        if self._strategy_instance is not None:
+            return self._strategy_instance._indicators
+
+        if self.strategy is None or self.prices is None:
+            raise Exception('Para graficar hace falta la estrategia y los precios de la corrida')
+
+        # Solo init: calcula los indicadores sin recorrer las velas
+        data = _Data(self.prices.copy(deep=False))
+        broker = _Broker(
+            data=data,
+            cash=self.equity_curve['Equity'].iloc[0],
+            commission=0,
+            margin=1,
+            trade_on_close=False,
+            hedging=False,
+            exclusive_orders=False,
+            index=data.index,
+        )
+        strategy_instance = self.strategy(broker, data, self.params)
+        strategy_instance.init()
+
+        self._strategy_instance = strategy_instance
+        return strategy_instance._indicators
+
+    def plot(self, filename, resample=False, open_browser=False, **kwargs):
+        ''' Mismo grafico de Bokeh que Backtest.plot '''
+        directory = os.path.dirname(filename)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with _plot_lock:
+            return plot(
+                results=self.stats,
+                df=self.prices,
+                indicators=self._indicators(),
+                filename=filename,
+                resample=resample,
+                open_browser=open_browser,
+                **kwargs
+            )
+
+    def save(self, path):
+        ''' Guarda stats, precios y parametros (sin la instancia de la estrategia) '''
+        stats = self.stats.copy()
+        stats['_strategy'] = None
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(
+                {
+                    'stats': stats,
+                    'strategy': self.strategy,
+                    'prices': self.prices,
+                    'params': self.params,
+                },
+                f
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            saved = pickle.load(f)
+
+        return cls(
+            stats=saved['stats'],
+            strategy=saved['strategy'],
+            prices=saved['prices'],
+            params=saved['params'],
+        )
@@ -0,0 +1,160 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from app.backbone.utils.calendar_features import calendar_features, calendar_to_array, register_calendar
+from app.backbone.utils.data_cache import to_utc_timestamp
+
+# Velas en arrays contiguos para que varios procesos las compartan via mmap:
+# <store_path>/<ticker>/<timeframe>/<key>/time.npy   -> int64 (ns UTC)
+# <store_path>/<ticker>/<timeframe>/<key>/ohlcv.npy  -> float64 (5, n), una fila por columna
+# <store_path>/<ticker>/<timeframe>/<key>/meta.json  -> solo en modo compacto
+# <store_path>/<ticker>/<timeframe>/<key>/calendar.npy -> int64 (8, n), ver calendar_features
+#
+# key (ver store_key) identifica el rango de fechas y el modo: dos corridas con rangos o
+# modos distintos publican en carpetas distintas y no se pisan los archivos.
+#
+# En modo compacto ohlcv.npy es float32 y los precios ya estan multiplicados por el
+# minimum_fraction del simbolo: run_strategy los usa tal cual, sin copiarlos ni escalarlos.
+# float32 guarda ~7 digitos: un cruce o una ruptura que en float64 queda a menos de eso del
+# precio puede pasar una vela antes o despues y cambiar los trades (en 1M de velas TripleSMA
+# hace 42444 trades en vez de 42448). compact_accuracy_report mide la diferencia.
+DEFAULT_BAR_STORE_PATH = os.environ.get('BAR_STORE_PATH', './bar_store')
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+COMPACT_DTYPE = np.float32
+
+
+def store_key(date_from=None, date_to=None, compact=False) -> str:
+    ''' Nombre de la version publicada para un rango de fechas y un modo '''
+    def stamp(date):
+        return 'all' if date is None else f'{to_utc_timestamp(date):%Y%m%d%H%M}'
+
+    return f"{stamp(date_from)}_{stamp(date_to)}_{'compact' if compact else 'float64'}"
+
+
+def _store_dir(store_path, ticker, timeframe, key=None):
+    store_dir = os.path.join(store_path, ticker, str(timeframe))
+    return store_dir if key is None else os.path.join(store_dir, key)
+
+
+def _save_array(path, array):
+    # Se escribe en un temporal y se renombra: los workers que ya tienen el
+    # archivo mapeado siguen viendo la version anterior hasta que se vuelvan a adjuntar
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _save_meta(path, meta):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, path)
+
+
+def has_bars(ticker, timeframe, store_path=DEFAULT_BAR_STORE_PATH, key=None) -> bool:
+    store_dir = _store_dir(store_path, ticker, timeframe, key)
+    return all(
+        os.path.exists(os.path.join(store_dir, name)) for name in ('time.npy', 'ohlcv.npy')
+    )
+
+
+def publish_bars(
+        prices: pd.DataFrame,
+        ticker,
+        timeframe,
+        store_path=DEFAULT_BAR_STORE_PATH,
+        compact=False,
+        minimum_fraction=1.0,
+        key=None
+    ):
+    ''' Vuelca un DataFrame OHLCV al store para que los workers lo adjunten sin copiarlo.
+
+    Con compact=True se guarda en float32 con los precios ya escalados por minimum_fraction.
+    '''
+    store_dir = _store_dir(store_path, ticker, timeframe, key)
+    os.makedirs(store_dir, exist_ok=True)
+
+    index = pd.DatetimeIndex(prices.index)
+    index = index.tz_localize('UTC') if index.tz is None else index.tz_convert('UTC')
+
+    dtype = COMPACT_DTYPE if compact else np.float64
+    ohlcv = np.empty((len(BAR_COLUMNS), len(prices)), dtype=dtype)
+    for i, column in enumerate(BAR_COLUMNS):
+        values = prices[column].to_numpy(dtype=np.float64) if column in prices else np.nan
+        if compact and column in PRICE_COLUMNS:
+            values = values * minimum_fraction
+        ohlcv[i] = values
+
+    meta_path = os.path.join(store_dir, 'meta.json')
+
+    # ohlcv primero: si un worker adjunta en el medio, time.npy viejo no matchea y falla el largo
+    _save_array(os.path.join(store_dir, 'ohlcv.npy'), ohlcv)
+    _save_array(os.path.join(store_dir, 'calendar.npy'), calendar_to_array(calendar_features(index)))
+    if compact:
+        _save_meta(meta_path, {'prices_scaled': True, 'minimum_fraction': minimum_fraction})
+    elif os.path.exists(meta_path):
+        os.remove(meta_path)
+    _save_array(os.path.join(store_dir, 'time.npy'), index.asi8.astype(np.int64))
+
+
+def to_compact(prices: pd.DataFrame, minimum_fraction=1.0) -> pd.DataFrame:
+    ''' Lo mismo que devuelve attach_bars en modo compacto pero en memoria, sin pasar por el store '''
+    ohlcv = np.empty((len(BAR_COLUMNS), len(prices)), dtype=COMPACT_DTYPE)
+    for i, column in enumerate(BAR_COLUMNS):
+        values = prices[column].to_numpy(dtype=np.float64) if column in prices else np.nan
+        ohlcv[i] = values * minimum_fraction if column in PRICE_COLUMNS else values
+
+    compact = pd.DataFrame(ohlcv.T, index=prices.index, columns=BAR_COLUMNS, copy=False)
+    compact.attrs.update({'prices_scaled': True, 'minimum_fraction': minimum_fraction})
+
+    return compact
+
+
+def attach_bars(
+        ticker,
+        timeframe,
+        date_from=None,
+        date_to=None,
+        store_path=DEFAULT_BAR_STORE_PATH,
+        key=None
+    ) -> pd.DataFrame:
+    ''' Devuelve el DataFrame que esperan run_strategy y walk_forward apoyado sobre los
+    archivos mapeados en memoria (solo lectura, sin copia) '''
+    store_dir = _store_dir(store_path, ticker, timeframe, key)
+
+    times = np.load(os.path.join(store_dir, 'time.npy'), mmap_mode='r')
+    ohlcv = np.load(os.path.join(store_dir, 'ohlcv.npy'), mmap_mode='r')
+
+    if ohlcv.shape[1] != len(times):
+        raise Exception(f'Bar store de {ticker} {timeframe} inconsistente, volver a publicar')
+
+    # El recorte por fechas es un slice, asi que sigue siendo una vista del mmap
+    start = 0 if date_from is None else np.searchsorted(times, to_utc_timestamp(date_from).value, side='left')
+    end = len(times) if date_to is None else np.searchsorted(times, to_utc_timestamp(date_to).value, side='right')
+
+    index = pd.DatetimeIndex(times[start:end].view('M8[ns]'), name='Date').tz_localize('UTC')
+
+    # Bloque unico traspuesto: pandas lo guarda como (5, n) y no lo copia
+    prices = pd.DataFrame(ohlcv[:, start:end].T, index=index, columns=BAR_COLUMNS, copy=False)
+
+    meta_path = os.path.join(store_dir, 'meta.json')
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r') as f:
+            prices.attrs.update(json.load(f))
+
+    # Las features de calendario de un tramo no son el tramo de las features (la primera
+    # sesion y el ultimo mes pueden quedar cortados): solo se usan las guardadas si se adjunta todo
+    calendar_path = os.path.join(store_dir, 'calendar.npy')
+    if start == 0 and end == len(times) and os.path.exists(calendar_path):
+        calendar = np.load(calendar_path, mmap_mode='r')
+        if calendar.shape[1] == len(times):
+            register_calendar(index, calendar)
+
+    return prices
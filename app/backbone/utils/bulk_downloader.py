@@ -0,0 +1,233 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from app.backbone.utils.metatrader import mt5
+import pandas as pd
+from app.backbone.utils.data_cache import DEFAULT_CACHE_PATH, load_bars, to_utc_timestamp
+from app.backbone.utils.data_catalog import DataCatalog
+from app.backbone.utils.get_data import _get_data_from_metatrader, get_data
+from app.backbone.utils.resample import can_resample, compare_with_broker
+from app.backbone.utils.spread_store import (
+    DEFAULT_SPREAD_STORE_PATH,
+    has_bar_spreads,
+    resample_bar_spreads,
+    store_bar_spreads,
+)
+
+DOWNLOAD_MANIFEST_FILE = 'download_manifest.json'
+
+
+def split_in_chunks(date_from, date_to, chunk_days):
+    ''' Parte [date_from, date_to] en tramos de chunk_days dias '''
+    date_from = to_utc_timestamp(date_from)
+    date_to = to_utc_timestamp(date_to)
+
+    chunks = []
+    chunk_from = date_from
+    while chunk_from < date_to:
+        chunk_to = min(chunk_from + pd.Timedelta(days=chunk_days), date_to)
+        chunks.append((chunk_from, chunk_to))
+        chunk_from = chunk_to
+
+    return chunks
+
+
+def get_commission(ticker):
+    ''' Spread relativo al precio medio, como lo espera commissions.yml '''
+    symbol_info = mt5.symbol_info_tick(ticker)
+
+    avg_price = (symbol_info.bid + symbol_info.ask) / 2
+    spread = symbol_info.ask - symbol_info.bid
+
+    return round(spread / avg_price, 5)
+
+
+def _download_ticker(ticker, intervals, date_from, date_to, chunk_days, cache_path):
+    ''' Baja las velas y la comision del ticker. Usa el modulo MetaTrader5, que no es
+    thread safe: se llama solo desde el hilo principal '''
+    # Cada tramo que se baja queda en el cache con su cobertura, asi que si el
+    # proceso se corta la proxima corrida solo pide lo que falta
+    for interval in intervals:
+        for chunk_from, chunk_to in split_in_chunks(date_from, date_to, chunk_days):
+            get_data(ticker, interval, chunk_from, chunk_to, cache_path=cache_path)
+
+    return get_commission(ticker), mt5.symbol_info(ticker).point
+
+
+def check_resample(ticker, base_interval, intervals, date_from, date_to, cache_path=DEFAULT_CACHE_PATH):
+    ''' Compara, para cada interval derivado, las velas armadas desde base_interval con las
+    que devuelve el broker en [date_from, date_to]. Devuelve el resultado de compare_with_broker
+    por interval '''
+    comparisons = {}
+    for interval in intervals:
+        if interval == base_interval or not can_resample(base_interval, interval):
+            continue
+
+        broker_bars = _get_data_from_metatrader(ticker, interval, date_from, date_to)
+        if broker_bars.empty:
+            continue
+
+        resampled = get_data(
+            ticker,
+            interval,
+            broker_bars.index[0],
+            broker_bars.index[-1],
+            cache_path=cache_path,
+            base_timeframe=base_interval,
+        )
+        comparisons[interval] = compare_with_broker(resampled, broker_bars)
+
+    return comparisons
+
+
+def _write_ticker(catalog, ticker, download_intervals, intervals, base_interval, date_from, date_to, cache_path, point, spread_store_path):
+    ''' Pasa las velas del cache al catalogo y guarda los spreads (sin llamar al broker) '''
+    for interval in download_intervals:
+        prices = load_bars(cache_path, ticker, interval, date_from, date_to)
+        if prices.empty:
+            continue
+
+        catalog.add(ticker, interval, prices)
+        store_bar_spreads(ticker, interval, prices, point=point, store_path=spread_store_path)
+
+    if base_interval and catalog.has(ticker, base_interval):
+        for interval in intervals:
+            if interval != base_interval:
+                catalog.add_derived(ticker, interval, base_interval)
+
+                # Sin esto los derivados no tendrian spreads y se cobraria la comision fija
+                if has_bar_spreads(ticker, base_interval, store_path=spread_store_path):
+                    resample_bar_spreads(ticker, interval, base_interval, store_path=spread_store_path)
+
+
+def _load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _save_manifest(path, manifest):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def download_universe(
+        tickers,
+        intervals,
+        date_from,
+        date_to,
+        out_path,
+        max_workers=4,
+        chunk_days=365,
+        cache_path=DEFAULT_CACHE_PATH,
+        base_interval=None,
+        check_days=30,
+        spread_store_path=DEFAULT_SPREAD_STORE_PATH,
+    ):
+    ''' Baja el historico de todos los tickers/intervals y lo deja en
+    <out_path>/catalog. Devuelve el diccionario de comisiones por ticker.
+
+    Si se pasa base_interval solo se baja esa serie y el resto de los intervals
+    se registran en el catalogo como derivados (se resamplean al leerlos).
+    En ese caso se comparan los ultimos check_days dias de cada derivado contra las velas
+    del broker y se avisa si no coinciden (check_days=0 no compara).
+    max_workers son los hilos que escriben el catalogo; al broker se le pide en serie.
+    '''
+
+    manifest_path = os.path.join(out_path, DOWNLOAD_MANIFEST_FILE)
+    manifest = _load_manifest(manifest_path)
+    catalog = DataCatalog(os.path.join(out_path, 'catalog'))
+
+    job = {
+        'date_from': to_utc_timestamp(date_from).isoformat(),
+        'date_to': to_utc_timestamp(date_to).isoformat(),
+        'intervals': list(intervals),
+        'base_interval': base_interval,
+    }
+
+    download_intervals = [base_interval] if base_interval else intervals
+
+    pending_tickers = [
+        ticker for ticker in tickers
+        if {k: v for k, v in manifest.get(ticker, {}).items() if k != 'commission'} != job
+    ]
+
+    print(f'{len(tickers) - len(pending_tickers)} tickers ya descargados, faltan {len(pending_tickers)}')
+
+    def finish(future):
+        # El manifest se escribe solo desde este hilo
+        ticker, commission = futures.pop(future)
+        try:
+            future.result()
+
+            manifest[ticker] = {**job, 'commission': commission}
+            _save_manifest(manifest_path, manifest)
+
+            print(f'{ticker} descargado')
+
+        except Exception as e:
+            print(f'hubo un problema con {ticker}: {e}')
+
+    # Las llamadas al broker van en serie desde este hilo (MetaTrader5 no es thread safe);
+    # en paralelo solo se escriben el catalogo y los spreads de lo que ya se bajo
+    futures = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for ticker in pending_tickers:
+            try:
+                commission, point = _download_ticker(
+                    ticker,
+                    download_intervals,
+                    date_from,
+                    date_to,
+                    chunk_days,
+                    cache_path,
+                )
+
+                if base_interval and check_days:
+                    check_from = max(
+                        to_utc_timestamp(date_from),
+                        to_utc_timestamp(date_to) - pd.Timedelta(days=check_days),
+                    )
+                    comparisons = check_resample(ticker, base_interval, intervals, check_from, date_to, cache_path)
+
+                    for interval, comparison in comparisons.items():
+                        if comparison['mismatched_bars'] or comparison['only_resampled'] or comparison['only_broker']:
+                            print(
+                                f'{ticker} {interval}: las velas armadas desde {base_interval} no coinciden con las del broker '
+                                f'({comparison["mismatched_bars"]} distintas, {comparison["only_resampled"]} de mas, '
+                                f'{comparison["only_broker"]} de menos)'
+                            )
+            except Exception as e:
+                print(f'hubo un problema con {ticker}: {e}')
+                continue
+
+            future = executor.submit(
+                _write_ticker,
+                catalog,
+                ticker,
+                download_intervals,
+                intervals,
+                base_interval,
+                date_from,
+                date_to,
+                cache_path,
+                point,
+                spread_store_path,
+            )
+            futures[future] = (ticker, commission)
+
+            for done in [f for f in futures if f.done()]:
+                finish(done)
+
+        for done in as_completed(list(futures)):
+            finish(done)
+
+    return {
+        ticker: manifest[ticker]['commission']
+        for ticker in tickers
+        if ticker in manifest
+    }
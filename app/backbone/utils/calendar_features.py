@@ -0,0 +1,105 @@
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from app.backbone.utils.indicator_cache import _hash_array
+
+SECONDS_PER_DAY = 24 * 3600
+CALENDAR_CACHE_SIZE = 32
+
+# Se calcula una vez por dataset y se reutiliza en todas las corridas del proceso
+# (optimize y walk_forward corren la misma data muchas veces). Para la data del bar store
+# el calendario se guarda al publicar (calendar.npy, al lado de las velas) y los workers
+# lo registran al adjuntar, sin recalcularlo
+_calendar_cache = OrderedDict()
+
+CALENDAR_COLUMNS = [
+    'Time',
+    'DayOfMonth',
+    'DayOfWeek',
+    'Month',
+    'DaysToMonthEnd',
+    'IsLastSessionOfMonth',
+    'SessionId',
+    'BarsSinceSessionOpen',
+]
+
+
+def _index_key(index: pd.DatetimeIndex):
+    # Se hashean todos los timestamps: dos indices con el mismo largo y extremos pueden
+    # tener huecos (fines de semana, feriados) en lugares distintos
+    return (_hash_array(index.asi8), str(index.tz))
+
+
+def build_calendar(index: pd.DatetimeIndex) -> dict:
+    ''' Features de calendario como arrays de enteros, uno por vela.
+
+    Se calculan sobre la hora del propio indice (UTC / hora del server de MT5).
+    La sesion es el dia calendario de la vela.
+    '''
+    index = pd.DatetimeIndex(index)
+    local_index = index.tz_localize(None) if index.tz is not None else index
+
+    time = local_index.values.astype('datetime64[s]').astype(np.int64)
+    session_id = time // SECONDS_PER_DAY
+
+    months = local_index.values.astype('datetime64[M]')
+    month_id = months.astype(np.int64)
+    day_of_month = (local_index.values.astype('datetime64[D]') - months.astype('datetime64[D]')).astype(np.int64) + 1
+    days_in_month = ((months + 1).astype('datetime64[D]') - months.astype('datetime64[D]')).astype(np.int64)
+
+    # Primera vela de cada sesion y de cada mes (la data viene ordenada)
+    session_starts = np.r_[True, session_id[1:] != session_id[:-1]] if len(time) else np.empty(0, dtype=bool)
+    session_start_positions = np.maximum.accumulate(np.where(session_starts, np.arange(len(time)), 0))
+
+    month_ends = np.r_[month_id[1:] != month_id[:-1], True] if len(time) else np.empty(0, dtype=bool)
+    last_session_of_month = session_id[np.flatnonzero(month_ends)]
+    month_position = np.cumsum(np.r_[0, month_id[1:] != month_id[:-1]]) if len(time) else np.empty(0, dtype=np.int64)
+
+    return {
+        'Time': time,
+        'DayOfMonth': day_of_month,
+        'DayOfWeek': ((session_id + 3) % 7).astype(np.int64),  # 0 = lunes, igual que pandas
+        'Month': (month_id % 12 + 1).astype(np.int64),
+        'DaysToMonthEnd': days_in_month - day_of_month,
+        'IsLastSessionOfMonth': (session_id == last_session_of_month[month_position]).astype(np.int64),
+        'SessionId': session_id,
+        'BarsSinceSessionOpen': np.arange(len(time)) - session_start_positions,
+    }
+
+
+def _cache_calendar(key, calendar):
+    _calendar_cache[key] = calendar
+    if len(_calendar_cache) > CALENDAR_CACHE_SIZE:
+        _calendar_cache.popitem(last=False)
+
+
+def calendar_features(index: pd.DatetimeIndex) -> dict:
+    ''' build_calendar cacheado por dataset '''
+    key = _index_key(index)
+    calendar = _calendar_cache.get(key)
+
+    if calendar is None:
+        calendar = build_calendar(index)
+        _cache_calendar(key, calendar)
+    else:
+        _calendar_cache.move_to_end(key)
+
+    return calendar
+
+
+def calendar_to_array(calendar: dict) -> np.ndarray:
+    ''' Las features en un solo array (columnas x velas) para guardarlo en disco '''
+    return np.vstack([calendar[name] for name in CALENDAR_COLUMNS]).astype(np.int64)
+
+
+def register_calendar(index: pd.DatetimeIndex, calendar: np.ndarray):
+    ''' Deja en el cache el calendario guardado de index (filas en el orden de CALENDAR_COLUMNS) '''
+    _cache_calendar(_index_key(index), dict(zip(CALENDAR_COLUMNS, calendar)))
+
+
+def add_calendar_features(prices: pd.DataFrame) -> pd.DataFrame:
+    ''' Agrega las features como columnas (quedan disponibles en self.data de la estrategia) '''
+    prices = prices.copy()
+    for name, values in calendar_features(prices.index).items():
+        prices[name] = values
+    return prices
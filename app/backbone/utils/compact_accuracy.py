@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from app.backbone.utils.bar_store import to_compact
+from app.backbone.utils.wfo_utils import get_scaled_symbol_metadata, run_strategy
+
+# Compara una misma corrida con las velas en float64 y en el modo compacto del bar
+# store (float32 ya escaladas) para ver cuanto cambian las metricas por la precision.
+
+
+def compact_accuracy_report(
+    strategy,
+    ticker,
+    prices: pd.DataFrame,
+    initial_cash: float,
+    commission: float,
+    margin: float,
+    risk=None,
+    opt_params=None,
+):
+    ''' Devuelve (report, summary): por metrica el valor en float64, en float32 y la
+    diferencia absoluta y relativa; y si coinciden los trades y la maxima diferencia de equity '''
+    minimum_fraction = get_scaled_symbol_metadata(ticker)[4]
+    compact = to_compact(prices, minimum_fraction)
+
+    results = {}
+    for name, data in (('float64', prices), ('float32', compact)):
+        results[name] = run_strategy(
+            strategy,
+            ticker,
+            data,
+            initial_cash,
+            commission,
+            margin,
+            risk=risk,
+            opt_params=opt_params,
+        )
+
+    df_stats_64, trade_performance_64, stats_64 = results['float64']
+    df_stats_32, trade_performance_32, stats_32 = results['float32']
+
+    metrics_64 = pd.concat([df_stats_64.iloc[0], trade_performance_64.iloc[0]])
+    metrics_32 = pd.concat([df_stats_32.iloc[0], trade_performance_32.iloc[0]])
+    numeric = [
+        k for k, v in metrics_64.items()
+        if isinstance(v, (int, float, np.number)) and not isinstance(v, bool)
+    ]
+
+    report = pd.DataFrame({
+        'float64': metrics_64[numeric].astype(float),
+        'float32': metrics_32[numeric].astype(float),
+    })
+    report['abs_diff'] = (report['float32'] - report['float64']).abs()
+    report['rel_diff'] = report['abs_diff'] / report['float64'].abs().replace(0, np.nan)
+
+    trades_64, trades_32 = stats_64._trades, stats_32._trades
+    same_trades = (
+        len(trades_64) == len(trades_32)
+        and trades_64['EntryBar'].to_numpy().tolist() == trades_32['EntryBar'].to_numpy().tolist()
+        and trades_64['ExitBar'].to_numpy().tolist() == trades_32['ExitBar'].to_numpy().tolist()
+    )
+
+    equity_64 = stats_64._equity_curve['Equity'].to_numpy()
+    equity_32 = stats_32._equity_curve['Equity'].to_numpy()
+
+    summary = {
+        'trades_float64': len(trades_64),
+        'trades_float32': len(trades_32),
+        'same_trades': same_trades,
+        'max_equity_diff': float(np.max(np.abs(equity_32 - equity_64))) if len(equity_64) == len(equity_32) else np.nan,
+        'max_rel_diff': float(report['rel_diff'].max()) if len(report) else 0.0,
+    }
+
+    return report, summary
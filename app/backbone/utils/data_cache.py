@@ -0,0 +1,147 @@
+import json
+import os
+import pandas as pd
+
+# Cache local de velas: <cache_path>/<ticker>/<timeframe>/<year>.parquet
+DEFAULT_CACHE_PATH = './data_cache'
+COVERAGE_FILE = '_coverage.json'
+
+
+def to_utc_timestamp(date) -> pd.Timestamp:
+    date = pd.Timestamp(date)
+    if date.tz is None:
+        return date.tz_localize('UTC')
+    return date.tz_convert('UTC')
+
+
+def _partition_dir(cache_path, ticker, timeframe):
+    return os.path.join(cache_path, ticker, str(timeframe))
+
+
+def _atomic_write(path, write_func):
+    ''' escribe en un archivo temporal y lo renombra para no dejar particiones a medio escribir '''
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        write_func(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _merge_intervals(intervals):
+    ''' Ordena los rangos y junta los que se pisan o se tocan '''
+    merged = []
+    for date_from, date_to in sorted(intervals):
+        if merged and date_from <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], date_to))
+        else:
+            merged.append((date_from, date_to))
+
+    return merged
+
+
+def get_coverage(cache_path, ticker, timeframe):
+    ''' Devuelve los rangos [(date_from, date_to), ...] que ya fueron pedidos al broker, o None '''
+    path = os.path.join(_partition_dir(cache_path, ticker, timeframe), COVERAGE_FILE)
+    if not os.path.exists(path):
+        return None
+
+    with open(path, 'r') as f:
+        coverage = json.load(f)
+
+    # Formato viejo: un solo rango
+    if 'intervals' not in coverage:
+        return [(pd.Timestamp(coverage['date_from']), pd.Timestamp(coverage['date_to']))]
+
+    return [(pd.Timestamp(date_from), pd.Timestamp(date_to)) for date_from, date_to in coverage['intervals']]
+
+
+def add_coverage(cache_path, ticker, timeframe, date_from, date_to):
+    ''' Marca [date_from, date_to] como pedido al broker. Se guarda una lista de rangos: un
+    pedido que no toca lo cubierto no marca como cubierto el hueco que queda en el medio '''
+    partition_dir = _partition_dir(cache_path, ticker, timeframe)
+    os.makedirs(partition_dir, exist_ok=True)
+
+    intervals = get_coverage(cache_path, ticker, timeframe) or []
+    intervals = _merge_intervals(intervals + [(to_utc_timestamp(date_from), to_utc_timestamp(date_to))])
+
+    content = json.dumps({
+        'intervals': [
+            [to_utc_timestamp(covered_from).isoformat(), to_utc_timestamp(covered_to).isoformat()]
+            for covered_from, covered_to in intervals
+        ],
+    })
+
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+
+    _atomic_write(os.path.join(partition_dir, COVERAGE_FILE), write)
+
+    return intervals
+
+
+def missing_ranges(coverage, date_from, date_to):
+    ''' Rangos que faltan en el cache para cubrir [date_from, date_to]: cabeza, cola y huecos entre rangos cubiertos '''
+    date_from = to_utc_timestamp(date_from)
+    date_to = to_utc_timestamp(date_to)
+
+    ranges = []
+    cursor = date_from
+
+    for covered_from, covered_to in coverage or []:
+        covered_from = to_utc_timestamp(covered_from)
+        covered_to = to_utc_timestamp(covered_to)
+
+        if covered_to < cursor:
+            continue
+        if covered_from > date_to:
+            break
+
+        if covered_from > cursor:
+            ranges.append((cursor, covered_from))
+        cursor = max(cursor, covered_to)
+
+    if cursor < date_to:
+        ranges.append((cursor, date_to))
+
+    return ranges
+
+
+def load_bars(cache_path, ticker, timeframe, date_from, date_to) -> pd.DataFrame:
+    ''' Lee solo las particiones anuales que tocan el rango pedido '''
+    date_from = to_utc_timestamp(date_from)
+    date_to = to_utc_timestamp(date_to)
+    partition_dir = _partition_dir(cache_path, ticker, timeframe)
+
+    frames = []
+    for year in range(date_from.year, date_to.year + 1):
+        path = os.path.join(partition_dir, f'{year}.parquet')
+        if os.path.exists(path):
+            frames.append(pd.read_parquet(path))
+
+    if not frames:
+        return pd.DataFrame()
+
+    prices = pd.concat(frames).sort_index()
+    return prices.loc[date_from:date_to]
+
+
+def store_bars(cache_path, ticker, timeframe, prices: pd.DataFrame):
+    ''' Mergea las velas nuevas con las particiones existentes (gana la vela mas reciente) '''
+    if prices.empty:
+        return
+
+    partition_dir = _partition_dir(cache_path, ticker, timeframe)
+    os.makedirs(partition_dir, exist_ok=True)
+
+    for year, year_prices in prices.groupby(prices.index.year):
+        path = os.path.join(partition_dir, f'{year}.parquet')
+
+        if os.path.exists(path):
+            year_prices = pd.concat([pd.read_parquet(path), year_prices])
+
+        year_prices = year_prices[~year_prices.index.duplicated(keep='last')].sort_index()
+
+        _atomic_write(path, lambda tmp_path: year_prices.to_parquet(tmp_path))
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import threading
+import os
+import re
+import pandas as pd
+from app.backbone.utils.data_cache import to_utc_timestamp
+from app.backbone.utils.resample import bar_open_times, can_resample, resample_bars, timeframe_seconds
+
+MANIFEST_FILE = 'manifest.json'
+ROW_GROUP_SIZE = 10_000
+
+# Nombre de los csv que deja el get_data del pipeline: <ticker>_<interval>_<from>_<to>.csv
+CSV_FILE_PATTERN = re.compile(r'^(?P<ticker>.+?)_(?P<interval>[^_]+)_(?P<date_from>.+)_(?P<date_to>[^_]+)\.csv$')
+
+
+def _parse_interval(interval):
+    return int(interval) if str(interval).isdigit() else interval
+
+
+def _csv_range(match):
+    ''' (from, to) del nombre del csv; NaT si no se puede leer la fecha '''
+    dates = []
+    for group in ('date_from', 'date_to'):
+        try:
+            dates.append(pd.Timestamp(match.group(group)))
+        except ValueError:
+            dates.append(pd.NaT)
+    return tuple(dates)
+
+
+def _file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class DataCatalog:
+    ''' Indice de datasets ticker/interval guardados en parquet.
+
+    El manifest guarda filas, limites temporales y hash de cada dataset, y las
+    lecturas por rango de fechas solo bajan los row groups que lo tocan.
+    '''
+
+    def __init__(self, catalog_path):
+        self.catalog_path = catalog_path
+        self.manifest_path = os.path.join(catalog_path, MANIFEST_FILE)
+        os.makedirs(catalog_path, exist_ok=True)
+
+        self.manifest = {}
+        self._lock = threading.Lock()  # add/add_derived se pueden llamar desde varios hilos
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r') as f:
+                self.manifest = json.load(f)
+
+    @staticmethod
+    def _key(ticker, interval):
+        return f'{ticker}_{interval}'
+
+    def _save_manifest(self):
+        tmp_path = f'{self.manifest_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def entries(self):
+        return list(self.manifest.values())
+
+    def get_entry(self, ticker, interval):
+        return self.manifest.get(self._key(ticker, interval))
+
+    def has(self, ticker, interval) -> bool:
+        return self._key(ticker, interval) in self.manifest
+
+    def add(self, ticker, interval, prices: pd.DataFrame, source=None):
+        ''' Guarda las velas ordenadas por fecha para que las estadisticas de cada
+        row group sirvan para filtrar '''
+        prices = prices.sort_index()
+        prices.index = pd.DatetimeIndex(prices.index, name='Date')
+        if prices.index.tz is None:
+            prices.index = prices.index.tz_localize('UTC')
+
+        file_name = f'{self._key(ticker, interval)}.parquet'
+        path = os.path.join(self.catalog_path, file_name)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            prices.to_parquet(tmp_path, row_group_size=ROW_GROUP_SIZE)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        entry = {
+            'ticker': ticker,
+            'interval': interval,
+            'file': file_name,
+            'rows': len(prices),
+            'start': prices.index[0].isoformat() if len(prices) else None,
+            'end': prices.index[-1].isoformat() if len(prices) else None,
+            'sha256': _file_sha256(path),
+        }
+
+        if source:
+            entry['source'] = source
+
+        with self._lock:
+            self.manifest[self._key(ticker, interval)] = entry
+            self._save_manifest()
+
+        return entry
+
+    def add_derived(self, ticker, interval, base_interval):
+        ''' Registra un interval que no se guarda sino que se arma desde base_interval al leerlo '''
+        base_entry = self.get_entry(ticker, base_interval)
+        if base_entry is None:
+            raise KeyError(f'No hay datos de {ticker} {base_interval} en el catalogo')
+
+        if not can_resample(base_interval, interval):
+            raise Exception(f'No se puede armar el interval {interval} a partir de {base_interval}')
+
+        prices = resample_bars(self.read(ticker, base_interval), interval)
+
+        entry = {
+            'ticker': ticker,
+            'interval': interval,
+            'base_interval': base_interval,
+            'rows': len(prices),
+            'start': prices.index[0].isoformat() if len(prices) else None,
+            'end': prices.index[-1].isoformat() if len(prices) else None,
+            'sha256': base_entry['sha256'],
+        }
+
+        with self._lock:
+            self.manifest[self._key(ticker, interval)] = entry
+            self._save_manifest()
+
+        return entry
+
+    def sync_csv_dir(self, csv_path):
+        ''' Pasa a parquet los csv nuevos o modificados del directorio. Si hay varios csv del
+        mismo ticker/interval se usa el del rango mas nuevo (mayor fecha final y despues mayor
+        fecha inicial) '''
+        if not os.path.exists(csv_path):
+            return
+
+        candidates = {}
+        for file_name in sorted(os.listdir(csv_path)):
+            match = CSV_FILE_PATTERN.match(file_name)
+            if not match:
+                continue
+
+            ticker = match.group('ticker')
+            interval = _parse_interval(match.group('interval'))
+            date_from, date_to = _csv_range(match)
+
+            # Los nombres sin fecha legible quedan ultimos; el nombre desempata
+            order = (
+                pd.notna(date_to), date_to if pd.notna(date_to) else pd.Timestamp.min,
+                pd.notna(date_from), date_from if pd.notna(date_from) else pd.Timestamp.min,
+                file_name,
+            )
+            candidates.setdefault((ticker, interval), []).append((order, file_name))
+
+        for (ticker, interval), files in candidates.items():
+            files.sort()
+            file_name = files[-1][1]
+
+            if len(files) > 1:
+                skipped = ', '.join(name for _, name in files[:-1])
+                print(f'{ticker} {interval}: se usa {file_name} (se ignoran {skipped})')
+
+            csv_file = os.path.join(csv_path, file_name)
+            stat = os.stat(csv_file)
+
+            source = {'path': csv_file, 'size': stat.st_size, 'mtime': stat.st_mtime}
+            entry = self.get_entry(ticker, interval)
+            if entry and entry.get('source') == source:
+                continue
+
+            prices = pd.read_csv(csv_file)
+            prices['Date'] = pd.to_datetime(prices['Date'])
+            prices = prices.set_index('Date')
+
+            self.add(ticker, interval, prices, source=source)
+
+    def read(self, ticker, interval, date_from=None, date_to=None, columns=None) -> pd.DataFrame:
+        entry = self.get_entry(ticker, interval)
+        if entry is None:
+            raise KeyError(f'No hay datos de {ticker} {interval} en el catalogo')
+
+        if 'base_interval' in entry:
+            return self._read_derived(entry, date_from, date_to, columns)
+
+        filters = []
+        if date_from is not None:
+            filters.append(('Date', '>=', to_utc_timestamp(date_from)))
+        if date_to is not None:
+            filters.append(('Date', '<=', to_utc_timestamp(date_to)))
+
+        return pd.read_parquet(
+            os.path.join(self.catalog_path, entry['file']),
+            columns=columns,
+            filters=filters or None,
+        )
+
+    def _read_derived(self, entry, date_from, date_to, columns):
+        # Se leen las velas base desde la apertura de la vela que contiene date_from
+        # hasta el cierre de la que contiene date_to, y se recorta despues de resamplear
+        interval = entry['interval']
+        base_from = None
+        base_to = None
+
+        if date_from is not None:
+            date_from = to_utc_timestamp(date_from)
+            base_from = pd.Timestamp(bar_open_times([date_from.tz_localize(None).value], interval)[0], tz='UTC')
+
+        if date_to is not None:
+            date_to = to_utc_timestamp(date_to)
+            base_to = date_to + pd.Timedelta(seconds=timeframe_seconds(interval) or 31 * 24 * 3600)
+
+        base_prices = self.read(entry['ticker'], entry['base_interval'], date_from=base_from, date_to=base_to)
+        prices = resample_bars(base_prices, interval).loc[date_from:date_to]
+
+        return prices[columns] if columns else prices
@@ -1,6 +1,7 @@
 from importlib import import_module
 import itertools
 import logging
+import numpy as np
 
 logger = logging.getLogger("general_purpose")
 
@@ -92,6 +93,17 @@ def diff_pips(price1, price2, pip_value, absolute=True):
     
     return pips
 
+
+def crossover_signal(series1, series2):
+    ''' Version vectorizada de backtesting.lib.crossover: True en la vela en que series1 cruza por encima de series2 '''
+    series1 = np.asarray(series1, dtype=np.float64)
+    series2 = np.asarray(series2, dtype=np.float64)
+
+    signal = np.zeros(len(series1), dtype=bool)
+    signal[1:] = (series1[:-1] < series2[:-1]) & (series1[1:] > series2[1:])
+    return signal
+
+
 def transformar_a_uno(numero):
     # Inicializar contador de decimales
     decimales = 0
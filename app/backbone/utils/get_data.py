@@ -1,20 +1,86 @@
 import pandas as pd
-import pandas_ta as pandas_ta
-import MetaTrader5 as mt5
-import MetaTrader5 as mt5
+from app.backbone.utils.metatrader import METATRADER_BACKEND, mt5
 import pandas as pd
 
 import random
+from app.backbone.utils.data_cache import (
+    DEFAULT_CACHE_PATH,
+    add_coverage,
+    get_coverage,
+    load_bars,
+    missing_ranges,
+    store_bars,
+    to_utc_timestamp,
+)
+from app.backbone.utils.resample import can_resample, resample_bars, timeframe_seconds
 random.seed(42)
 
 def get_data(
-        ticker, 
-        timeframe, 
-        date_from, 
-        date_to, 
-        save_in=None
+        ticker,
+        timeframe,
+        date_from,
+        date_to,
+        save_in=None,
+        cache_path=DEFAULT_CACHE_PATH,
+        base_timeframe=None,
     ):
 
+    # Se arma el timeframe a partir de las velas base para bajar y guardar una sola serie
+    if base_timeframe and base_timeframe != timeframe:
+        return _get_resampled_data(ticker, timeframe, base_timeframe, date_from, date_to, cache_path)
+
+    # Sin cache se va directo al broker
+    if not cache_path:
+        return _get_data_from_metatrader(ticker, timeframe, date_from, date_to)
+
+    coverage = get_coverage(cache_path, ticker, timeframe)
+    ranges_to_fetch = missing_ranges(coverage, date_from, date_to)
+
+    # Offline el cache es la unica fuente: no se guarda nada ni se marca cobertura, se
+    # devuelve lo que haya y se avisa de los rangos que no estan
+    if METATRADER_BACKEND == 'offline':
+        for range_from, range_to in ranges_to_fetch:
+            print(f'{ticker} {timeframe}: no hay velas en el cache local de {range_from} a {range_to}')
+
+        return load_bars(cache_path, ticker, timeframe, date_from, date_to)
+
+    # Solo se le piden al broker los rangos que faltan (cabeza, cola y huecos)
+    for range_from, range_to in ranges_to_fetch:
+        prices_df = _get_data_from_metatrader(ticker, timeframe, range_from, range_to)
+        store_bars(cache_path, ticker, timeframe, prices_df)
+
+        # La ultima vela puede estar incompleta si el rango llega al presente,
+        # por eso solo se marca como cubierto hasta la ultima vela recibida
+        if range_to > pd.Timestamp.now(tz='UTC'):
+            range_to = prices_df.index[-1] if not prices_df.empty else range_from
+
+        add_coverage(cache_path, ticker, timeframe, range_from, range_to)
+
+    return load_bars(cache_path, ticker, timeframe, date_from, date_to)
+
+
+def _get_resampled_data(ticker, timeframe, base_timeframe, date_from, date_to, cache_path):
+    if not can_resample(base_timeframe, timeframe):
+        raise Exception(f'No se puede armar el timeframe {timeframe} a partir de {base_timeframe}')
+
+    date_from = to_utc_timestamp(date_from)
+    date_to = to_utc_timestamp(date_to)
+
+    # La ultima vela que abre antes de date_to se completa con velas base posteriores
+    period = timeframe_seconds(timeframe) or 31 * 24 * 3600
+    base_prices = get_data(
+        ticker,
+        base_timeframe,
+        date_from,
+        date_to + pd.Timedelta(seconds=period),
+        cache_path=cache_path
+    )
+
+    return resample_bars(base_prices, timeframe).loc[date_from:date_to]
+
+
+def _get_data_from_metatrader(ticker, timeframe, date_from, date_to):
+
     print("MetaTrader5 package author: ", mt5.__author__)
     print("MetaTrader5 package version: ", mt5.__version__)
 
@@ -24,7 +90,15 @@ def get_data(
 
     print(ticker)
     # Obtener las tasas históricas
-    rates = mt5.copy_rates_range(ticker, timeframe, date_from, date_to)
+    rates = mt5.copy_rates_range(
+        ticker,
+        timeframe,
+        to_utc_timestamp(date_from).to_pydatetime(),
+        to_utc_timestamp(date_to).to_pydatetime()
+    )
+
+    if rates is None:
+        raise Exception("copy_rates_range() failed, error code =", mt5.last_error())
 
     # Crear DataFrame con las tasas
     prices_df = pd.DataFrame(rates)
@@ -44,4 +118,4 @@ def get_data(
 
     prices_df.index = prices_df.index.tz_localize('UTC').tz_convert('UTC')
 
-    return prices_df
\ No newline at end of file
+    return prices_df
@@ -0,0 +1,244 @@
+import functools
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Cache de indicadores por (huella de la data, funcion, parametros). Evita recalcular
+# ta.SMA(Close, 200), ATR, supertrends, etc. en cada corrida de optimize y en cada
+# ventana de walk_forward. Tiene un nivel en memoria (LRU por tamaño) y uno opcional
+# en disco que comparten los procesos. Viene apagado: se prende con INDICATOR_CACHE_ENABLED=1.
+INDICATOR_CACHE_ENABLED = os.environ.get('INDICATOR_CACHE_ENABLED', '0') == '1'
+INDICATOR_CACHE_MAX_BYTES = int(os.environ.get('INDICATOR_CACHE_MB', 256)) * 1024 * 1024
+INDICATOR_CACHE_PATH = os.environ.get('INDICATOR_CACHE_PATH')  # sin path no se usa el disco
+
+
+class _Uncacheable(Exception):
+    pass
+
+
+# Huella por array dueño de la memoria: optimize crea vistas nuevas de las mismas
+# columnas en cada corrida, asi el hash de cada columna se calcula una sola vez.
+# Solo para dueños de solo lectura (por ejemplo el mmap del bar store): un array que se
+# puede escribir puede cambiar sin cambiar de direccion (RollingBarBuffer reusa el suyo)
+# y se hashea en cada llamada
+_fingerprints = {}
+_fingerprints_lock = threading.Lock()
+
+
+def _owner(array: np.ndarray) -> np.ndarray:
+    while isinstance(array.base, np.ndarray):
+        array = array.base
+    return array
+
+
+def _hash_array(array: np.ndarray) -> str:
+    array = np.ascontiguousarray(array)
+    digest = hashlib.blake2b(array.view(np.uint8).ravel() if array.size else b'', digest_size=16)
+    digest.update(f'{array.dtype.str}{array.shape}'.encode())
+    return digest.hexdigest()
+
+
+def array_fingerprint(array: np.ndarray) -> str:
+    owner = _owner(array)
+    if owner.flags.writeable:
+        return _hash_array(array)
+
+    key = (
+        array.__array_interface__['data'][0] - owner.__array_interface__['data'][0],
+        array.shape,
+        array.strides,
+        array.dtype.str,
+    )
+
+    with _fingerprints_lock:
+        entry = _fingerprints.get(id(owner))
+        if entry is not None and entry[0]() is not owner:
+            entry = None
+
+        if entry is None:
+            try:
+                owner_ref = weakref.ref(owner, lambda _, owner_id=id(owner): _fingerprints.pop(owner_id, None))
+            except TypeError:
+                return _hash_array(array)
+
+            entry = (owner_ref, {})
+            _fingerprints[id(owner)] = entry
+
+        fingerprint = entry[1].get(key)
+
+    if fingerprint is None:
+        fingerprint = _hash_array(array)
+        with _fingerprints_lock:
+            entry[1][key] = fingerprint
+
+    return fingerprint
+
+
+def _argument_fingerprint(value) -> str:
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        return 'pd:' + array_fingerprint(value.to_numpy()) + _hash_array(value.index.asi8 if isinstance(value.index, pd.DatetimeIndex) else np.asarray(value.index))
+    if isinstance(value, np.ndarray):
+        return 'np:' + array_fingerprint(value)
+    if value is None or isinstance(value, (bool, int, float, str, np.number)):
+        return repr(value)
+    if isinstance(value, (tuple, list)):
+        return '[' + ','.join(_argument_fingerprint(v) for v in value) + ']'
+    raise _Uncacheable(type(value).__name__)
+
+
+def _function_fingerprint(func) -> str:
+    qualname = getattr(func, '__qualname__', None)
+    if qualname is None or '<lambda>' in qualname or '<locals>' in qualname:
+        raise _Uncacheable(repr(func))
+
+    # Para funciones de python se incluye el bytecode, si cambia el codigo no se usa lo viejo
+    code = getattr(func, '__code__', None)
+    code_hash = hashlib.blake2b(code.co_code + repr(code.co_consts).encode(), digest_size=8).hexdigest() if code else ''
+
+    return f'{getattr(func, "__module__", "")}.{qualname}:{code_hash}'
+
+
+def _normalize(value):
+    ''' Deja el resultado como lo transforma Strategy.I (DataFrame -> columnas en filas) '''
+    if isinstance(value, pd.DataFrame):
+        return value.values.T
+    if isinstance(value, pd.Series):
+        return value.to_numpy()
+    if isinstance(value, tuple):
+        return tuple(_normalize(v) for v in value)
+    return value
+
+
+def _read_only(value):
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, tuple):
+        for v in value:
+            _read_only(v)
+    return value
+
+
+def _nbytes(value) -> int:
+    if isinstance(value, tuple):
+        return sum(_nbytes(v) for v in value)
+    return getattr(value, 'nbytes', 0)
+
+
+class IndicatorCache:
+
+    def __init__(self, max_bytes=INDICATOR_CACHE_MAX_BYTES, cache_path=INDICATOR_CACHE_PATH):
+        self.max_bytes = max_bytes
+        self.cache_path = cache_path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def key(self, func, args, kwargs) -> str:
+        parts = [_function_fingerprint(func)]
+        parts.extend(_argument_fingerprint(arg) for arg in args)
+        parts.extend(f'{name}={_argument_fingerprint(value)}' for name, value in sorted(kwargs.items()))
+        return hashlib.blake2b('|'.join(parts).encode(), digest_size=20).hexdigest()
+
+    def _get_memory(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def _put_memory(self, key, value):
+        size = _nbytes(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                return
+
+            self._entries[key] = value
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= _nbytes(evicted)
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_path, key[:2], f'{key}.npz')
+
+    def _get_disk(self, key):
+        if not self.cache_path:
+            return None
+
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+
+        with np.load(path) as stored:
+            values = tuple(stored[f'arr_{i}'] for i in range(int(stored['count'])))
+            return values if bool(stored['is_tuple']) else values[0]
+
+    def _put_disk(self, key, value):
+        if not self.cache_path:
+            return
+
+        values = value if isinstance(value, tuple) else (value,)
+        if not all(isinstance(v, np.ndarray) and v.dtype != object for v in values):
+            return
+
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz'
+        np.savez(
+            tmp_path,
+            count=len(values),
+            is_tuple=isinstance(value, tuple),
+            **{f'arr_{i}': v for i, v in enumerate(values)}
+        )
+        os.replace(tmp_path, path)
+
+    def call(self, func, *args, **kwargs):
+        ''' func(*args, **kwargs) pasando por el cache (si los argumentos no se pueden huellar se llama directo) '''
+        try:
+            key = self.key(func, args, kwargs)
+        except _Uncacheable:
+            return func(*args, **kwargs)
+
+        value = self._get_memory(key)
+        if value is None:
+            value = self._get_disk(key)
+            if value is not None:
+                self._put_memory(key, _read_only(value))
+
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = _read_only(_normalize(func(*args, **kwargs)))
+        self._put_memory(key, value)
+        self._put_disk(key, value)
+
+        return value
+
+    def wrap(self, func):
+        @functools.wraps(func)
+        def cached_func(*args, **kwargs):
+            return self.call(func, *args, **kwargs)
+
+        return cached_func
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+
+indicator_cache = IndicatorCache()
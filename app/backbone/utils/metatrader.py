@@ -0,0 +1,203 @@
+import json
+import os
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from app.backbone.utils.data_cache import DEFAULT_CACHE_PATH, get_coverage, load_bars, to_utc_timestamp
+
+# Backend de MetaTrader a usar: 'mt5' (terminal real, solo Windows) u 'offline'
+# (velas del cache local + snapshot de metadata de simbolos)
+METATRADER_BACKEND = os.environ.get('METATRADER_BACKEND', 'mt5')
+METATRADER_CACHE_PATH = os.environ.get('METATRADER_CACHE_PATH', DEFAULT_CACHE_PATH)
+METATRADER_SYMBOLS_SNAPSHOT = os.environ.get('METATRADER_SYMBOLS_SNAPSHOT', './configs/symbols_snapshot.json')
+
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('tick_volume', '<u8'),
+    ('spread', '<i4'),
+    ('real_volume', '<u8'),
+])
+
+
+class _Record(SimpleNamespace):
+    ''' Imita los namedtuple que devuelve MetaTrader5 '''
+    def _asdict(self):
+        return dict(self.__dict__)
+
+
+class OfflineMetaTrader:
+    ''' Implementa la parte de lectura de la api de MetaTrader5 sin terminal.
+
+    Las velas salen del cache de get_data y symbol_info/symbol_info_tick de un
+    snapshot generado con save_symbols_snapshot desde una maquina con MT5.
+    '''
+
+    __author__ = 'offline'
+    __version__ = 'offline'
+
+    TIMEFRAME_M1 = 1
+    TIMEFRAME_M2 = 2
+    TIMEFRAME_M3 = 3
+    TIMEFRAME_M4 = 4
+    TIMEFRAME_M5 = 5
+    TIMEFRAME_M6 = 6
+    TIMEFRAME_M10 = 10
+    TIMEFRAME_M12 = 12
+    TIMEFRAME_M15 = 15
+    TIMEFRAME_M20 = 20
+    TIMEFRAME_M30 = 30
+    TIMEFRAME_H1 = 16385
+    TIMEFRAME_H2 = 16386
+    TIMEFRAME_H3 = 16387
+    TIMEFRAME_H4 = 16388
+    TIMEFRAME_H6 = 16390
+    TIMEFRAME_H8 = 16392
+    TIMEFRAME_H12 = 16396
+    TIMEFRAME_D1 = 16408
+    TIMEFRAME_W1 = 32769
+    TIMEFRAME_MN1 = 49153
+
+    ORDER_TYPE_BUY = 0
+    ORDER_TYPE_SELL = 1
+    ORDER_TYPE_BUY_LIMIT = 2
+    ORDER_TYPE_SELL_LIMIT = 3
+    ORDER_TYPE_BUY_STOP = 4
+    ORDER_TYPE_SELL_STOP = 5
+
+    ORDER_FILLING_FOK = 0
+    ORDER_FILLING_IOC = 1
+    ORDER_TIME_GTC = 0
+
+    TRADE_ACTION_DEAL = 1
+    TRADE_ACTION_PENDING = 5
+    TRADE_RETCODE_DONE = 10009
+
+    RES_S_OK = 1
+    RES_E_NOT_FOUND = -4
+
+    def __init__(self, cache_path=METATRADER_CACHE_PATH, symbols_snapshot_path=METATRADER_SYMBOLS_SNAPSHOT):
+        self.cache_path = cache_path
+        self.symbols_snapshot_path = symbols_snapshot_path
+        self._symbols = None
+        self._last_error = (self.RES_S_OK, 'Success')
+
+    def _load_symbols(self):
+        if self._symbols is None:
+            self._symbols = {}
+            if os.path.exists(self.symbols_snapshot_path):
+                with open(self.symbols_snapshot_path, 'r') as f:
+                    self._symbols = json.load(f)
+
+        return self._symbols
+
+    def _not_found(self, message):
+        self._last_error = (self.RES_E_NOT_FOUND, message)
+        return None
+
+    def _to_rates(self, prices: pd.DataFrame):
+        rates = np.zeros(len(prices), dtype=RATES_DTYPE)
+        if prices.empty:
+            return rates
+
+        rates['time'] = prices.index.tz_convert('UTC').tz_localize(None).asi8 // 1_000_000_000
+        rates['open'] = prices['Open'].to_numpy()
+        rates['high'] = prices['High'].to_numpy()
+        rates['low'] = prices['Low'].to_numpy()
+        rates['close'] = prices['Close'].to_numpy()
+
+        for column, field in (('Volume', 'tick_volume'), ('spread', 'spread'), ('real_volume', 'real_volume')):
+            if column in prices:
+                rates[field] = prices[column].to_numpy()
+
+        return rates
+
+    def initialize(self, *args, **kwargs):
+        return True
+
+    def shutdown(self):
+        return True
+
+    def last_error(self):
+        return self._last_error
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        if get_coverage(self.cache_path, symbol, timeframe) is None:
+            return self._not_found(f'{symbol} {timeframe} no esta en el cache local')
+
+        prices = load_bars(self.cache_path, symbol, timeframe, to_utc_timestamp(date_from), to_utc_timestamp(date_to))
+        return self._to_rates(prices)
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        ''' Igual que en MT5 la posicion 0 es la vela mas reciente (del cache) '''
+        coverage = get_coverage(self.cache_path, symbol, timeframe)
+        if coverage is None:
+            return self._not_found(f'{symbol} {timeframe} no esta en el cache local')
+
+        prices = load_bars(self.cache_path, symbol, timeframe, coverage[0][0], coverage[-1][1])
+        end = len(prices) - start_pos
+        return self._to_rates(prices.iloc[max(end - count, 0):max(end, 0)])
+
+    def symbols_get(self, group=None):
+        return tuple(
+            _Record(**symbol['info']) for symbol in self._load_symbols().values()
+        )
+
+    def symbol_info(self, symbol):
+        snapshot = self._load_symbols().get(symbol)
+        if snapshot is None:
+            return self._not_found(f'{symbol} no esta en el snapshot de simbolos')
+
+        return _Record(**snapshot['info'])
+
+    def symbol_info_tick(self, symbol):
+        snapshot = self._load_symbols().get(symbol)
+        if snapshot is None or not snapshot.get('tick'):
+            return self._not_found(f'{symbol} no tiene tick en el snapshot de simbolos')
+
+        return _Record(**snapshot['tick'])
+
+    def symbol_select(self, symbol, enable=True):
+        return symbol in self._load_symbols()
+
+    def positions_get(self, *args, **kwargs):
+        return ()
+
+    def login(self, *args, **kwargs):
+        raise Exception('MetaTrader offline: no se puede operar una cuenta real')
+
+    def account_info(self):
+        raise Exception('MetaTrader offline: no se puede operar una cuenta real')
+
+    def order_send(self, request):
+        raise Exception('MetaTrader offline: no se pueden enviar ordenes')
+
+
+def save_symbols_snapshot(metatrader, tickers, path=METATRADER_SYMBOLS_SNAPSHOT):
+    ''' Guarda symbol_info y symbol_info_tick de los tickers para usarlos offline '''
+    snapshot = {}
+    for ticker in tickers:
+        info = metatrader.symbol_info(ticker)
+        if info is None:
+            continue
+
+        tick = metatrader.symbol_info_tick(ticker)
+        snapshot[ticker] = {
+            'info': info._asdict(),
+            'tick': tick._asdict() if tick is not None else None,
+        }
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(snapshot, f, indent=2)
+
+    return snapshot
+
+
+if METATRADER_BACKEND == 'offline':
+    mt5 = OfflineMetaTrader()
+else:
+    import MetaTrader5 as mt5
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+NANOSECONDS_PER_DAY = 24 * 3600 * 1_000_000_000
+
+# Grupos de trades: posicion (long/short) x resultado (ganador/perdedor)
+LONG_WIN, LONG_LOSE, SHORT_WIN, SHORT_LOSE = 0, 1, 2, 3
+
+
+def stability_ratio(values) -> float:
+    ''' R² de la regresion lineal de la serie contra su posicion (igual a LinearRegression().score) '''
+    y = np.asarray(values, dtype=np.float64)
+    n = len(y)
+    if n < 2:
+        return np.nan
+
+    x = np.arange(n, dtype=np.float64) - (n - 1) / 2
+    y = y - y.mean()
+
+    ss_tot = np.dot(y, y)
+    if ss_tot == 0:
+        return 1.0  # serie constante: la recta la ajusta perfecto
+
+    sxy = np.dot(x, y)
+    sxx = n * (n * n - 1) / 12
+    return sxy * sxy / (sxx * ss_tot)
+
+
+def windowed_stability_ratio(values, window: int) -> float:
+    ''' stability_ratio recorriendo la serie de a window valores (para series mapeadas en
+    disco que no entran en memoria): una pasada para la media y otra para las sumas '''
+    n = len(values)
+    if n < 2:
+        return np.nan
+
+    total = 0.0
+    for start in range(0, n, window):
+        total += np.sum(values[start:start + window], dtype=np.float64)
+    mean = total / n
+
+    ss_tot = 0.0
+    sxy = 0.0
+    for start in range(0, n, window):
+        y = np.asarray(values[start:start + window], dtype=np.float64) - mean
+        x = np.arange(start, start + len(y), dtype=np.float64) - (n - 1) / 2
+        ss_tot += np.dot(y, y)
+        sxy += np.dot(x, y)
+
+    if ss_tot == 0:
+        return 1.0
+
+    sxx = n * (n * n - 1) / 12
+    return sxy * sxy / (sxx * ss_tot)
+
+
+def grouped_moments(values: np.ndarray, codes: np.ndarray, n_groups: int):
+    ''' Cantidad, media y desvio (ddof=1, como pandas) de values por grupo en dos pasadas de bincount '''
+    counts = np.bincount(codes, minlength=n_groups).astype(np.float64)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.bincount(codes, weights=values, minlength=n_groups) / counts
+        squares = np.bincount(codes, weights=(values - means[codes]) ** 2, minlength=n_groups)
+        stds = np.sqrt(squares / (counts - 1))
+
+    means[counts == 0] = np.nan
+    stds[counts < 2] = np.nan
+
+    return counts, means, stds
+
+
+def trade_metrics(pnl, returns, sizes, durations) -> dict:
+    ''' Metricas de trade_performance de run_strategy en una sola pasada sobre arrays '''
+    pnl = np.asarray(pnl, dtype=np.float64)
+    returns = np.asarray(returns, dtype=np.float64)
+    durations = np.asarray(durations, dtype=np.float64)
+
+    is_short = np.asarray(sizes) < 0
+    is_losing = pnl < 0
+
+    _, result_means, result_stds = grouped_moments(returns, is_losing.astype(np.intp), 2)
+    counts, means, stds = grouped_moments(returns, is_short * 2 + is_losing, 4)
+
+    long_trades = counts[LONG_WIN] + counts[LONG_LOSE]
+    short_trades = counts[SHORT_WIN] + counts[SHORT_LOSE]
+
+    return {
+        "MeanWinningReturnPct": result_means[0] * 100,
+        "StdWinningReturnPct": result_stds[0] * 100,
+        "MeanLosingReturnPct": result_means[1] * 100,
+        "StdLosingReturnPct": result_stds[1] * 100,
+        "MeanTradeDuration": durations.mean() if len(durations) else np.nan,
+        "StdTradeDuration": durations.std(ddof=1) if len(durations) > 1 else np.nan,
+        "LongWinrate": counts[LONG_WIN] / long_trades if long_trades > 0 else 0,
+        "WinLongMeanReturnPct": means[LONG_WIN] * 100,
+        "WinLongStdReturnPct": stds[LONG_WIN] * 100,
+        "LoseLongMeanReturnPct": means[LONG_LOSE] * 100,
+        "LoseLongStdReturnPct": stds[LONG_LOSE] * 100,
+        "ShortWinrate": counts[SHORT_WIN] / short_trades if short_trades > 0 else 0,
+        "WinShortMeanReturnPct": means[SHORT_WIN] * 100,
+        "WinShortStdReturnPct": stds[SHORT_WIN] * 100,
+        "LoseShortMeanReturnPct": means[SHORT_LOSE] * 100,
+        "LoseShortStdReturnPct": stds[SHORT_LOSE] * 100,
+    }
+
+
+def trades_with_equity(trades: pd.DataFrame, equity: np.ndarray, initial_cash: float) -> pd.DataFrame:
+    ''' Trades redondeados con la equity al cierre, ReturnPct sobre esa equity y duracion en dias '''
+    trades = trades.round(3)
+
+    exit_bars = trades['ExitBar'].to_numpy(dtype=np.int64)
+    trade_equity = np.asarray(equity, dtype=np.float64)[exit_bars]
+    pnl = trades['PnL'].to_numpy(dtype=np.float64)
+
+    previous_equity = np.empty_like(trade_equity)
+    previous_equity[:1] = initial_cash
+    previous_equity[1:] = trade_equity[:-1]
+
+    durations = pd.to_timedelta(trades['Duration']).to_numpy().astype('m8[ns]').astype(np.int64)
+
+    trades['Equity'] = trade_equity
+    trades['ReturnPct'] = pnl / previous_equity
+    trades['Duration'] = durations // NANOSECONDS_PER_DAY
+
+    return trades.reset_index(drop=True)
@@ -1,3 +1,5 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import numpy as np
 import pandas as pd
 
@@ -110,6 +112,65 @@ def montecarlo_statistics_simulation(
     
     return combined_stats
 
+def spawn_rngs(seed, n):
+    ''' n generadores independientes derivados de una semilla maestra (None, int, SeedSequence
+    o Generator). Cada iteracion usa el suyo, asi el resultado no depende de en que proceso corra '''
+    if isinstance(seed, np.random.Generator):
+        return seed.spawn(n)
+
+    seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return [np.random.default_rng(child) for child in seed_seq.spawn(n)]
+
+
+def _simulate_trades_equity(rng, n_steps, initial_equity, threshold_ruin, probs):
+    ''' Una simulacion de monte_carlo_simulation_v2: (max drawdown %, retorno final %, si llego a la ruina) '''
+    (
+        prob_trade,
+        prob_long,
+        prob_long_winner,
+        prob_short_winner,
+        long_win_mean, long_win_std,
+        long_loss_mean, long_loss_std,
+        short_win_mean, short_win_std,
+        short_loss_mean, short_loss_std,
+    ) = probs
+
+    equity = [initial_equity]  # Curva de equity inicial
+
+    for _ in range(n_steps):
+        # Decidir si se realiza un trade
+        if rng.random() < prob_trade:
+            # Decidir si es long o short
+            if rng.random() < prob_long:
+                # Decidir si el long es ganador o perdedor
+                if rng.random() < prob_long_winner:
+                    trade = rng.normal(long_win_mean, long_win_std)
+                else:
+                    trade = rng.normal(long_loss_mean, long_loss_std)
+            else:
+                # Decidir si el short es ganador o perdedor
+                if rng.random() < prob_short_winner:
+                    trade = rng.normal(short_win_mean, short_win_std)
+                else:
+                    trade = rng.normal(short_loss_mean, short_loss_std)
+        else:
+            trade = 0  # No se realiza trade
+
+        # Actualizar la curva de equity
+        equity.append(equity[-1] +  equity[-1] * trade)
+
+    # Calcular drawdown
+    peak = np.maximum.accumulate(equity)
+    dd = (equity - peak) / peak * 100 # Drawdown en porcentaje
+
+    # Calcular retorno final
+    ret = ((equity[-1] - initial_equity) / initial_equity) * 100  # Retorno en porcentaje
+
+    ruined = bool(np.any(np.array(equity) <= initial_equity * threshold_ruin))
+
+    return dd.min(), ret, ruined
+
+
 def monte_carlo_simulation_v2(
     equity_curve,
     trade_history,
@@ -117,7 +178,9 @@ def monte_carlo_simulation_v2(
     initial_equity,
     threshold_ruin,
     return_raw_curves,
-    percentiles=[0.1, 0.25, 0.5, 0.75, 0.9]
+    percentiles=[0.1, 0.25, 0.5, 0.75, 0.9],
+    rng=None,
+    max_workers=1,
 ):
     """
     Simulación de Monte Carlo para un sistema de trading con distribución basada en probabilidades de trades.
@@ -127,6 +190,8 @@ def monte_carlo_simulation_v2(
         equity_start (float): Valor inicial del equity.
         num_simulations (int): Número de simulaciones a realizar.
         threshold (float): Umbral para calcular el riesgo de ruina.
+        rng (int, SeedSequence o Generator): semilla maestra; cada simulación usa un generador derivado de ella.
+        max_workers (int): procesos para repartir las simulaciones. El resultado es el mismo que en serie.
 
     Returns:
         dict: Resultados estadísticos de las simulaciones, incluyendo drawdowns y retornos.
@@ -153,51 +218,37 @@ def monte_carlo_simulation_v2(
     short_win_mean, short_win_std = short_winning_trades['ReturnPct'].mean(), short_winning_trades['ReturnPct'].std()
     short_loss_mean, short_loss_std = short_losing_trades['ReturnPct'].mean(), short_losing_trades['ReturnPct'].std()
 
-    # Inicializar resultados
-    equity_curves = []
-    drawdowns = []
-    returns = []
-
-    ruin_count = 0
-    for _ in range(n_simulations):
-        equity = [initial_equity]  # Curva de equity inicial
-
-        for _ in range(len(equity_curve)):
-            # Decidir si se realiza un trade
-            if np.random.rand() < prob_trade:
-                # Decidir si es long o short
-                if np.random.rand() < prob_long:
-                    # Decidir si el long es ganador o perdedor
-                    if np.random.rand() < prob_long_winner:
-                        trade = np.random.normal(long_win_mean, long_win_std)
-                    else:
-                        trade = np.random.normal(long_loss_mean, long_loss_std)
-                else:
-                    # Decidir si el short es ganador o perdedor
-                    if np.random.rand() < prob_short_winner:
-                        trade = np.random.normal(short_win_mean, short_win_std)
-                    else:
-                        trade = np.random.normal(short_loss_mean, short_loss_std)
-            else:
-                trade = 0  # No se realiza trade
+    probs = (
+        prob_trade,
+        prob_long,
+        prob_long_winner,
+        prob_short_winner,
+        long_win_mean, long_win_std,
+        long_loss_mean, long_loss_std,
+        short_win_mean, short_win_std,
+        short_loss_mean, short_loss_std,
+    )
 
-            # Actualizar la curva de equity
-            equity.append(equity[-1] +  equity[-1] * trade)
+    simulate = partial(
+        _simulate_trades_equity,
+        n_steps=len(equity_curve),
+        initial_equity=initial_equity,
+        threshold_ruin=threshold_ruin,
+        probs=probs,
+    )
 
-        # Calcular drawdown
-        peak = np.maximum.accumulate(equity)
-        dd = (equity - peak) / peak * 100 # Drawdown en porcentaje
+    rngs = spawn_rngs(rng, n_simulations)
 
-        # Calcular retorno final
-        ret = ((equity[-1] - initial_equity) / initial_equity) * 100  # Retorno en porcentaje
-        
-        if np.any(np.array(equity) <= initial_equity * threshold_ruin):
-            ruin_count += 1
+    if max_workers > 1 and n_simulations > 1:
+        max_workers = min(max_workers, n_simulations)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(simulate, rngs, chunksize=-(-n_simulations // max_workers)))
+    else:
+        results = [simulate(sim_rng) for sim_rng in rngs]
 
-        # Guardar resultados
-        equity_curves.append(equity)
-        drawdowns.append(dd.min())  # Máximo drawdown
-        returns.append(ret)
+    drawdowns = [result[0] for result in results]
+    returns = [result[1] for result in results]
+    ruin_count = sum(result[2] for result in results)
 
     df_drawdowns = pd.DataFrame({"Drawdown (%)": drawdowns})
     df_final_returns_pct = pd.DataFrame({"Final Return (%)": returns})
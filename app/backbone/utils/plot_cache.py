@@ -0,0 +1,88 @@
+import os
+import shutil
+import threading
+
+# Graficos de bt.py que se generan al pedirlos y se guardan en disco hasta un tamaño maximo.
+# Cuando se pasa del limite se borran los que hace mas tiempo que no se abren.
+DEFAULT_PLOT_CACHE_PATH = './app/templates/static/backtest_plots'
+DEFAULT_PLOT_CACHE_MAX_BYTES = int(os.environ.get('BACKTEST_PLOT_CACHE_MB', 500)) * 1024 * 1024
+
+
+class PlotCache:
+    ''' Cache LRU en disco de graficos html.
+
+    Los requests que piden el mismo grafico mientras se esta generando esperan a
+    ese render en vez de hacer el suyo. El ultimo acceso se marca con el mtime del archivo.
+    '''
+
+    def __init__(self, cache_path=DEFAULT_PLOT_CACHE_PATH, max_bytes=DEFAULT_PLOT_CACHE_MAX_BYTES):
+        self.cache_path = cache_path
+        self.max_bytes = max_bytes
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def path(self, key):
+        return os.path.join(self.cache_path, key)
+
+    def _key_lock(self, key):
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, key, render):
+        ''' Devuelve el path del grafico; si no esta en cache lo genera con render(filename) '''
+        path = self.path(key)
+
+        if os.path.exists(path):
+            os.utime(path)
+            return path
+
+        with self._key_lock(key):
+            # Otro request pudo haberlo generado mientras se esperaba el lock
+            if os.path.exists(path):
+                os.utime(path)
+                return path
+
+            os.makedirs(self.cache_path, exist_ok=True)
+            tmp_dir = os.path.join(self.cache_path, f'.tmp_{os.getpid()}_{threading.get_ident()}')
+            os.makedirs(tmp_dir, exist_ok=True)
+
+            try:
+                tmp_path = os.path.join(tmp_dir, key)
+                render(tmp_path)
+                os.replace(tmp_path, path)
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+            with self._locks_lock:
+                self._locks.pop(key, None)
+
+        self._evict(keep=path)
+
+        return path
+
+    def remove(self, key):
+        path = self.path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _evict(self, keep=None):
+        files = []
+        for entry in os.scandir(self.cache_path):
+            if entry.is_file() and entry.name.endswith('.html'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+
+            if keep and os.path.abspath(path) == os.path.abspath(keep):
+                continue
+
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
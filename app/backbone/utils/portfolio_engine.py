@@ -0,0 +1,287 @@
+import heapq
+from math import copysign
+import numpy as np
+import pandas as pd
+import yaml
+from backtesting._stats import compute_stats
+from backbone.utils.general_purpose import calculate_units_size, diff_pips
+from app.backbone.utils.vectorized_engine import (
+    _first_at_or_after,
+    _first_stop_hit,
+    _start_bar,
+    _strategy_params,
+    supports_vectorized,
+)
+from app.backbone.utils.wfo_utils import get_scaled_symbol_metadata
+
+# Backtest de portfolio: muchos bots (estrategia, ticker, timeframe) sobre una sola
+# linea de tiempo con una cuenta compartida. El tamaño de cada trade sale de la equity
+# real de la cuenta (cash + flotante de todos los bots) y una orden se cancela si no
+# alcanza el margen libre, con el apalancamiento de cada ticker de configs/leverages.yml.
+#
+# Usa las señales vectorizadas de las estrategias (classmethod signals, ver vectorized_engine).
+# Como el stop loss y la señal de salida de un trade se conocen cuando se abre, al abrirlo
+# se escribe su flotante y su margen en la grilla de tiempos unificada. Asi la equity y el
+# margen usado en cualquier momento se leen directo, y la cola de eventos (entradas y
+# salidas de cada bot) se recorre una sola vez: el costo crece con el total de velas.
+LEVERAGES_PATH = './configs/leverages.yml'
+MARGIN_CALL_LEVEL = 100  # % de margin level
+STOP_OUT_LEVEL = 50
+
+# A la misma hora se procesan primero las salidas (liberan margen) y despues las entradas
+_EXIT, _ENTRY = 0, 1
+
+
+class PortfolioBot:
+
+    def __init__(self, name: str, strategy, ticker: str, prices: pd.DataFrame, risk: float, commission: float, params: dict = None):
+        self.name = name
+        self.strategy = strategy
+        self.ticker = ticker
+        self.prices = prices
+        self.risk = risk
+        self.commission = commission
+        self.params = params or {}
+
+    def __repr__(self):
+        return f"<PortfolioBot(name={self.name}, strategy={self.strategy.__name__}, ticker={self.ticker})>"
+
+
+def load_leverages(path=LEVERAGES_PATH) -> dict:
+    with open(path, 'r') as file_name:
+        return yaml.safe_load(file_name)
+
+
+class _BotState:
+    ''' Arrays y señales de un bot ya escalados, y su mapeo a la grilla unificada '''
+
+    def __init__(self, bot: PortfolioBot, leverage: float):
+        (
+            scaled_pip_value,
+            scaled_minimum_lot,
+            scaled_maximum_lot,
+            scaled_contract_volume,
+            minimum_fraction,
+            trade_tick_value_loss,
+            volume_step,
+        ) = get_scaled_symbol_metadata(bot.ticker)
+
+        self.bot = bot
+        self.margin = 1 / leverage
+
+        # Los precios del modo compacto ya vienen escalados
+        if bot.prices.attrs.get('prices_scaled'):
+            minimum_fraction = 1.0
+
+        self.times = bot.prices.index.asi8
+
+        self.open = bot.prices['Open'].to_numpy(dtype=np.float64) * minimum_fraction
+        self.high = bot.prices['High'].to_numpy(dtype=np.float64) * minimum_fraction
+        self.low = bot.prices['Low'].to_numpy(dtype=np.float64) * minimum_fraction
+        self.close = bot.prices['Close'].to_numpy(dtype=np.float64) * minimum_fraction
+
+        self.params = _strategy_params(
+            bot.strategy,
+            {
+                'pip_value': scaled_pip_value,
+                'minimum_lot': scaled_minimum_lot,
+                'maximum_lot': scaled_maximum_lot,
+                'contract_volume': scaled_contract_volume,
+                'trade_tick_value_loss': trade_tick_value_loss,
+                'volume_step': volume_step,
+                'risk': bot.risk,
+                **bot.params,
+            }
+        )
+
+        signals = bot.strategy.signals(
+            {'Open': self.open, 'High': self.high, 'Low': self.low, 'Close': self.close},
+            self.params,
+        )
+
+        self.long_entry = np.asarray(signals['long_entry'], dtype=bool)
+        self.entries = np.flatnonzero(self.long_entry | np.asarray(signals['short_entry'], dtype=bool))
+        self.long_exits = np.flatnonzero(signals['long_exit'])
+        self.short_exits = np.flatnonzero(signals['short_exit'])
+        self.sl_distance = np.asarray(signals['sl_distance'], dtype=np.float64)
+        self.start_bar = _start_bar(signals['indicators'])
+
+        self.positions = None  # posicion de cada vela en la grilla unificada
+        self.next_positions = None  # posicion en la grilla de la vela siguiente (cuando cierra la actual)
+
+    def units_size(self, equity, price, sl_price):
+        return calculate_units_size(
+            account_size=equity,
+            risk_percentage=self.params.risk,
+            stop_loss_pips=diff_pips(price, sl_price, pip_value=self.params.pip_value),
+            maximum_lot=self.params.maximum_lot,
+            minimum_lot=self.params.minimum_lot,
+            return_lots=False,
+            contract_volume=self.params.contract_volume,
+            trade_tick_value_loss=self.params.trade_tick_value_loss
+        )
+
+    def next_entry(self, bar):
+        ''' (vela de la señal, vela de entrada) de la proxima entrada desde bar; None si no hay '''
+        signal_bar = _first_at_or_after(self.entries, max(bar, self.start_bar))
+
+        # Una señal en la ultima vela no llega a ejecutarse
+        if signal_bar is None or signal_bar + 1 >= len(self.close):
+            return None
+
+        return signal_bar, signal_bar + 1
+
+    def exit_for(self, entry_bar, sl, is_long):
+        ''' (vela de salida, precio de salida) con las mismas reglas que vectorized_engine.simulate '''
+        n = len(self.close)
+        stop_bar = _first_stop_hit(self.low, self.high, entry_bar, sl, is_long)
+        exit_signal_bar = _first_at_or_after(self.long_exits if is_long else self.short_exits, entry_bar)
+
+        if stop_bar is not None and (exit_signal_bar is None or stop_bar <= exit_signal_bar):
+            exit_price = min(self.open[stop_bar], sl) if is_long else max(self.open[stop_bar], sl)
+            return stop_bar, exit_price
+
+        if exit_signal_bar is not None and exit_signal_bar + 1 < n:
+            return exit_signal_bar + 1, self.open[exit_signal_bar + 1]
+
+        # Sigue abierto al terminar: se cierra en el Open de la ultima vela
+        return n - 1, self.open[n - 1]
+
+    def price_on_grid(self, start, stop):
+        ''' Precio del bot para valuar el flotante en las posiciones [start, stop) de la grilla.
+
+        El valor de cada posicion es el del cierre de esa vela de la grilla. Si la vela del bot
+        ya cerro (la siguiente abre en la proxima posicion o antes) se usa su Close; si sigue
+        abierta (una vela H4 en una grilla con velas H1) su Close todavia no se conoce y se usa el Open.
+        '''
+        grid_positions = np.arange(start, stop)
+        bars = np.searchsorted(self.positions, grid_positions, side='right') - 1
+        closed = grid_positions + 1 >= self.next_positions[bars]
+
+        return np.where(closed, self.close[bars], self.open[bars])
+
+
+def run_portfolio(
+    bots,
+    initial_cash: float,
+    leverages: dict = None,
+    margin_call_level: float = MARGIN_CALL_LEVEL,
+    stop_out_level: float = STOP_OUT_LEVEL,
+):
+    ''' Simula todos los bots con una sola cuenta. Devuelve (stats, equity_curve, trades).
+
+    equity_curve tiene Equity, UsedMargin, FreeMargin y MarginLevel en la grilla unificada
+    (union de las velas de todos los bots). trades tiene la columna Bot y las barras de
+    entrada y salida en esa grilla.
+    '''
+    unsupported = [bot.name for bot in bots if not supports_vectorized(bot.strategy)]
+    if unsupported:
+        raise Exception(f'Las estrategias de estos bots no declaran signals: {unsupported}')
+
+    leverages = leverages if leverages is not None else load_leverages()
+    states = [_BotState(bot, leverages[bot.ticker]) for bot in bots]
+
+    grid_times = np.unique(np.concatenate([state.times for state in states]))
+    n_grid = len(grid_times)
+    for state in states:
+        state.positions = np.searchsorted(grid_times, state.times)
+        state.next_positions = np.append(state.positions[1:], n_grid)
+
+    unrealized = np.zeros(n_grid)
+    used_margin = np.zeros(n_grid)
+    realized = np.zeros(n_grid)
+    cash = initial_cash
+    trades = []
+
+    events = []
+    for bot_index, state in enumerate(states):
+        entry = state.next_entry(0)
+        if entry is not None:
+            heapq.heappush(events, (state.positions[entry[1]], _ENTRY, bot_index, entry))
+
+    while events:
+        position, kind, bot_index, payload = heapq.heappop(events)
+        state = states[bot_index]
+
+        if kind == _EXIT:
+            size, entry_bar, exit_bar, entry_price, exit_price = payload
+            pnl = size * (exit_price - entry_price)
+            cash += pnl
+            realized[position] += pnl
+            trades.append((state.bot.name, size, entry_bar, exit_bar, state.positions[entry_bar], position, entry_price, exit_price))
+
+            next_bar = exit_bar
+        else:
+            signal_bar, entry_bar = payload
+
+            # Equity al cierre de la vela anterior (lo que ve next() en la vela de la señal)
+            equity = cash - realized[position] + (unrealized[position - 1] if position > 0 else 0)
+            if equity <= 0:
+                continue
+
+            is_long = bool(state.long_entry[signal_bar])
+            price = state.close[signal_bar]
+            distance = state.sl_distance[signal_bar]
+            sl = price - distance if is_long else price + distance
+
+            size = state.units_size(equity, price, sl)
+            size = size if is_long else -size
+            entry_price = state.open[entry_bar] * (1 + copysign(state.bot.commission, size))
+            required_margin = abs(size) * entry_price * state.margin
+
+            # Sin margen libre suficiente la orden se cancela
+            if not size or required_margin > equity - used_margin[position]:
+                next_bar = entry_bar
+            else:
+                exit_bar, exit_price = state.exit_for(entry_bar, sl, is_long)
+                exit_position = state.positions[exit_bar]
+
+                unrealized[position:exit_position] += size * (state.price_on_grid(position, exit_position) - entry_price)
+                used_margin[position:exit_position] += required_margin
+
+                heapq.heappush(events, (exit_position, _EXIT, bot_index, (size, entry_bar, exit_bar, entry_price, exit_price)))
+                continue
+
+        entry = state.next_entry(next_bar)
+        if entry is not None:
+            heapq.heappush(events, (state.positions[entry[1]], _ENTRY, bot_index, entry))
+
+    index = pd.DatetimeIndex(pd.to_datetime(grid_times, utc=True))
+    equity = initial_cash + np.cumsum(realized) + unrealized
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        margin_level = np.where(used_margin > 0, equity / used_margin * 100, np.inf)
+
+    equity_curve = pd.DataFrame(
+        {
+            'Equity': equity,
+            'UsedMargin': used_margin,
+            'FreeMargin': equity - used_margin,
+            'MarginLevel': margin_level,
+        },
+        index=index,
+    )
+    equity_curve['MarginCall'] = equity_curve['MarginLevel'] < margin_call_level
+    equity_curve['StopOut'] = equity_curve['MarginLevel'] < stop_out_level
+
+    trades = pd.DataFrame(
+        trades,
+        columns=['Bot', 'Size', 'BotEntryBar', 'BotExitBar', 'EntryBar', 'ExitBar', 'EntryPrice', 'ExitPrice'],
+    )
+    trades = trades.astype({'Size': np.int64, 'EntryBar': np.int64, 'ExitBar': np.int64})
+    trades = trades.sort_values(['ExitBar', 'EntryBar'], kind='stable').reset_index(drop=True)
+    trades['PnL'] = trades['Size'] * (trades['ExitPrice'] - trades['EntryPrice'])
+    trades['ReturnPct'] = np.sign(trades['Size']) * (trades['ExitPrice'] / trades['EntryPrice'] - 1)
+    trades['EntryTime'] = index[trades['EntryBar'].to_numpy()]
+    trades['ExitTime'] = index[trades['ExitBar'].to_numpy()]
+    trades['Duration'] = trades['ExitTime'] - trades['EntryTime']
+
+    stats = compute_stats(
+        trades=trades,
+        equity=equity,
+        ohlc_data=pd.DataFrame({'Close': equity}, index=index),
+        strategy_instance=None,
+        risk_free_rate=0.0,
+    )
+
+    return stats, equity_curve, trades
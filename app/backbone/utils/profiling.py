@@ -0,0 +1,225 @@
+import functools
+import inspect
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+import pandas as pd
+import backtesting.backtesting as bt_backtesting
+from backtesting import Backtest, Strategy
+from backtesting.backtesting import _Broker
+
+# resource solo existe en POSIX; en Windows el pico de memoria sale de psutil si esta instalado
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Profiling opcional de backtests. Con BACKTEST_PROFILING=1, run_strategy y walk_forward
+# miden tiempo y cantidad de llamadas por fase (init de indicadores, next, broker/ordenes,
+# compute_stats, post-procesamiento) y por metodo de la estrategia, mas el pico de memoria.
+# Cada corrida agrega una linea json a BACKTEST_PROFILE_PATH para juntar los de todo un pipeline.
+PROFILING_ENABLED = os.environ.get('BACKTEST_PROFILING', '0') == '1'
+PROFILE_PATH = os.environ.get('BACKTEST_PROFILE_PATH', './profiles/backtests.jsonl')
+PROFILE_MEMORY = os.environ.get('BACKTEST_PROFILE_MEMORY', '0') == '1'  # tracemalloc, mas lento
+
+# Fases de backtesting.py que se miden siempre
+_LIBRARY_PHASES = [
+    (Backtest, 'run', 'backtest.run'),
+    (Backtest, 'optimize', 'backtest.optimize'),
+    (_Broker, 'next', 'broker.next'),
+    (_Broker, '_process_orders', 'broker.orders'),
+    (bt_backtesting, 'compute_stats', 'compute_stats'),
+]
+
+_active = []
+
+
+def _peak_rss_mb():
+    ''' Pico de memoria residente del proceso en MB, None si no hay forma de medirlo '''
+    if resource is not None:
+        # ru_maxrss viene en KB en linux y en bytes en mac
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024
+
+    if psutil is not None:
+        memory = psutil.Process().memory_info()
+        # peak_wset es el pico en Windows; si no esta se usa la memoria actual
+        return getattr(memory, 'peak_wset', memory.rss) / (1024 * 1024)
+
+    return None
+
+
+class Profiler:
+    ''' Acumula tiempos (inclusivos) y llamadas por fase de una corrida '''
+
+    def __init__(self, label, **context):
+        self.label = label
+        self.context = context
+        self.phases = {}
+        self.wall_seconds = None
+        self.peak_traced_mb = None
+        self._started = None
+
+    def add(self, name, seconds):
+        phase = self.phases.setdefault(name, {'calls': 0, 'seconds': 0.0})
+        phase['calls'] += 1
+        phase['seconds'] += seconds
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def timed(self, func, name):
+        @functools.wraps(func)
+        def timed_func(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(name, time.perf_counter() - start)
+
+        return timed_func
+
+    def report(self) -> dict:
+        peak_rss_mb = _peak_rss_mb()
+
+        return {
+            'label': self.label,
+            'pid': os.getpid(),
+            'started_at': self._started,
+            'wall_seconds': self.wall_seconds,
+            'peak_rss_mb': round(peak_rss_mb, 3) if peak_rss_mb is not None else None,
+            'peak_traced_mb': self.peak_traced_mb,
+            'context': {k: str(v) for k, v in self.context.items()},
+            'phases': self.phases,
+        }
+
+    def write(self, path=None):
+        path = path or PROFILE_PATH
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        # Una linea por corrida en modo append: los procesos de un pool pueden escribir al mismo archivo
+        with open(path, 'a') as f:
+            f.write(json.dumps(self.report()) + '\n')
+
+
+def _patch(owner, attr, wrapper):
+    ''' Reemplaza owner.attr y devuelve la funcion que lo restaura '''
+    own_attr = attr in vars(owner)
+    original = vars(owner)[attr] if own_attr else getattr(owner, attr)
+    setattr(owner, attr, wrapper(original))
+
+    def restore():
+        if own_attr:
+            setattr(owner, attr, original)
+        else:
+            delattr(owner, attr)
+
+    return restore
+
+
+def _strategy_methods(strategy):
+    ''' Metodos de la estrategia y de sus bases propias (hasta Strategy de backtesting.py) '''
+    for cls in strategy.__mro__:
+        if cls is Strategy or not issubclass(cls, Strategy):
+            break
+
+        for name, value in vars(cls).items():
+            if inspect.isfunction(value) and not name.startswith('__') and name != 'next_live':
+                yield cls, name
+
+
+@contextmanager
+def profiled(label, strategy=None, path=None, enabled=None, **context):
+    ''' Mide la corrida que se ejecuta dentro del bloque.
+
+    No hace nada si el profiling esta apagado o si ya hay una medicion en curso
+    (por ejemplo run de Backtest adentro de walk_forward). Las corridas de optimize
+    que backtesting.py manda a otros procesos solo suman al tiempo de backtest.optimize.
+    '''
+    enabled = PROFILING_ENABLED if enabled is None else enabled
+    if not enabled or _active:
+        yield None
+        return
+
+    profiler = Profiler(label, strategy=getattr(strategy, '__name__', strategy), **context)
+
+    restores = [
+        _patch(owner, attr, functools.partial(profiler.timed, name=name))
+        for owner, attr, name in _LIBRARY_PHASES
+    ]
+    if strategy is not None:
+        restores.extend(
+            _patch(cls, name, functools.partial(profiler.timed, name=f'{cls.__name__}.{name}'))
+            for cls, name in list(_strategy_methods(strategy))
+        )
+
+    tracing = PROFILE_MEMORY and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+
+    _active.append(profiler)
+    profiler._started = pd.Timestamp.now(tz='UTC').isoformat()
+    start = time.perf_counter()
+
+    try:
+        yield profiler
+    finally:
+        profiler.wall_seconds = time.perf_counter() - start
+        _active.pop()
+
+        if tracing:
+            profiler.peak_traced_mb = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 3)
+            tracemalloc.stop()
+
+        for restore in reversed(restores):
+            restore()
+
+        profiler.write(path)
+
+
+@contextmanager
+def phase(name):
+    ''' Fase manual (por ejemplo el post-procesamiento de pandas) dentro de la medicion en curso '''
+    if not _active:
+        yield
+        return
+
+    with _active[-1].phase(name):
+        yield
+
+
+def aggregate_reports(path=None) -> pd.DataFrame:
+    ''' Junta los reportes de un archivo jsonl: llamadas, segundos totales y por llamada por label y fase '''
+    path = path or PROFILE_PATH
+
+    rows = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+
+            report = json.loads(line)
+            rows.append({'label': report['label'], 'phase': 'total', 'calls': 1, 'seconds': report['wall_seconds']})
+            rows.extend(
+                {'label': report['label'], 'phase': name, 'calls': values['calls'], 'seconds': values['seconds']}
+                for name, values in report['phases'].items()
+            )
+
+    df = pd.DataFrame(rows, columns=['label', 'phase', 'calls', 'seconds'])
+    df = df.groupby(['label', 'phase'], as_index=False)[['calls', 'seconds']].sum()
+    df['seconds_per_call'] = df['seconds'] / df['calls']
+
+    return df.sort_values(['label', 'seconds'], ascending=[True, False]).reset_index(drop=True)
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+# Numeros de timeframe de MetaTrader5: minutos < 16384, horas = 16384 + h (D1 = 16408),
+# W1 = 32769 y MN1 = 49153
+TIMEFRAME_W1 = 32769
+TIMEFRAME_MN1 = 49153
+
+NANOSECONDS_PER_SECOND = 1_000_000_000
+# El epoch cae jueves; MT5 arranca las semanas el domingo a las 00:00
+WEEK_OFFSET_SECONDS = 4 * 24 * 3600
+
+
+def timeframe_seconds(timeframe: int):
+    ''' Duracion en segundos del timeframe, None para MN1 que no es fija '''
+    if timeframe == TIMEFRAME_MN1:
+        return None
+    if timeframe == TIMEFRAME_W1:
+        return 7 * 24 * 3600
+    if timeframe > 16384:
+        return (timeframe - 16384) * 3600
+    return timeframe * 60
+
+
+def can_resample(base_timeframe: int, timeframe: int) -> bool:
+    ''' Cada vela del timeframe tiene que estar formada por velas enteras del base '''
+    base_seconds = timeframe_seconds(base_timeframe)
+    seconds = timeframe_seconds(timeframe)
+
+    if base_seconds is None:
+        return base_timeframe == timeframe
+    if seconds is None:
+        # MN1 se arma con cualquier base que divida el dia
+        return (24 * 3600) % base_seconds == 0
+
+    return seconds >= base_seconds and seconds % base_seconds == 0
+
+
+def bar_open_times(times: np.ndarray, timeframe: int) -> np.ndarray:
+    ''' Apertura (ns) de la vela de timeframe a la que pertenece cada timestamp.
+
+    Igual que MT5, las velas intradiarias se alinean a la medianoche del server
+    (los timestamps de MT5 ya vienen en hora del server), W1 al domingo y MN1 al
+    primer dia del mes.
+    '''
+    times = np.asarray(times, dtype=np.int64)
+
+    if timeframe == TIMEFRAME_MN1:
+        return times.view('M8[ns]').astype('M8[M]').astype('M8[ns]').view(np.int64)
+
+    period = timeframe_seconds(timeframe) * NANOSECONDS_PER_SECOND
+
+    if timeframe == TIMEFRAME_W1:
+        offset = WEEK_OFFSET_SECONDS * NANOSECONDS_PER_SECOND
+        return (times + offset) // period * period - offset
+
+    return times // period * period
+
+
+def resample_bars(prices: pd.DataFrame, timeframe: int) -> pd.DataFrame:
+    ''' Arma las velas de timeframe a partir de velas de un timeframe menor.
+
+    Solo se generan velas donde hay velas base (fuera de sesion no hay velas,
+    igual que en el broker).
+    '''
+    if prices.empty:
+        return prices.copy()
+
+    index = pd.DatetimeIndex(prices.index)
+    times = index.tz_localize(None).asi8 if index.tz is not None else index.asi8
+
+    open_times = bar_open_times(times, timeframe)
+
+    # Las velas vienen ordenadas, asi que cada grupo es un tramo contiguo
+    starts = np.flatnonzero(np.r_[True, open_times[1:] != open_times[:-1]])
+    ends = np.r_[starts[1:], len(open_times)] - 1
+
+    resampled = {
+        'Open': prices['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(prices['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(prices['Low'].to_numpy(), starts),
+        'Close': prices['Close'].to_numpy()[ends],
+    }
+
+    if 'Volume' in prices:
+        resampled['Volume'] = np.add.reduceat(prices['Volume'].to_numpy(), starts)
+
+    new_index = pd.DatetimeIndex(open_times[starts].view('M8[ns]'), name=index.name)
+    if index.tz is not None:
+        new_index = new_index.tz_localize(index.tz)
+
+    return pd.DataFrame(resampled, index=new_index)
+
+
+def compare_with_broker(resampled: pd.DataFrame, broker_bars: pd.DataFrame, tolerance=1e-9) -> dict:
+    ''' Compara las velas resampleadas contra las que devuelve el broker para el mismo timeframe '''
+    common_index = resampled.index.intersection(broker_bars.index)
+    columns = ['Open', 'High', 'Low', 'Close']
+
+    diff = (resampled.loc[common_index, columns] - broker_bars.loc[common_index, columns]).abs()
+    mismatched = diff[(diff > tolerance).any(axis=1)]
+
+    return {
+        'common_bars': len(common_index),
+        'only_resampled': len(resampled.index.difference(broker_bars.index)),
+        'only_broker': len(broker_bars.index.difference(resampled.index)),
+        'mismatched_bars': len(mismatched),
+        'max_abs_diff': diff.max().to_dict(),
+        'mismatched_index': mismatched.index,
+    }
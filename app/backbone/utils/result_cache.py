@@ -0,0 +1,359 @@
+import hashlib
+import importlib
+import inspect
+import os
+import sys
+import threading
+import types
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+import backtesting
+from backtesting import Strategy
+from app.backbone.utils.indicator_cache import (
+    _Uncacheable,
+    _argument_fingerprint,
+    _function_fingerprint,
+    _hash_array,
+)
+
+# Cache de resultados de backtests direccionado por contenido. La clave junta el codigo
+# de la estrategia (archivos de la clase y de sus bases propias, y de los modulos del
+# proyecto que importan), los parametros, la huella de las velas, commission, margin, risk,
+# cash, la metadata del simbolo y el codigo del motor (wfo_utils, metrics y todo lo que
+# importan, version de backtesting.py). Si se toca una estrategia solo cambian las claves
+# de esa estrategia y en un barrido se recalcula solo eso.
+#
+# Se guarda en disco (un pickle por resultado) para compartirlo entre procesos y corridas,
+# hasta un tamaño maximo: cuando se pasa se borran los que hace mas tiempo que no se usan
+# hasta bajar a RESULT_CACHE_EVICT_TO del maximo, asi el directorio se recorre una vez cada
+# tantos resultados nuevos y no en cada put.
+RESULT_CACHE_ENABLED = os.environ.get('RESULT_CACHE_ENABLED', '0') == '1'
+RESULT_CACHE_PATH = os.environ.get('RESULT_CACHE_PATH', './result_cache')
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MB', 2048)) * 1024 * 1024
+RESULT_CACHE_EVICT_TO = float(os.environ.get('RESULT_CACHE_EVICT_TO', 0.9))
+
+# Modulos que calculan las metricas: si cambian ellos o los modulos del proyecto que
+# importan (general_purpose, spread_store, ...), cambian todas las claves
+ENGINE_MODULES = [
+    'app.backbone.utils.wfo_utils',
+    'app.backbone.utils.metrics',
+    'app.backbone.utils.vectorized_engine',  # la grilla de walk_forward (import local en wfo_utils)
+]
+
+# Solo se siguen las dependencias que son codigo del proyecto
+PROJECT_PATH = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_file_hashes = {}
+_file_hashes_lock = threading.Lock()
+_dependencies = {}
+
+
+def _file_hash(path) -> str:
+    ''' Hash del archivo, recalculado solo si cambio su mtime o tamaño '''
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    with _file_hashes_lock:
+        cached = _file_hashes.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+    with open(path, 'rb') as f:
+        digest = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+    with _file_hashes_lock:
+        _file_hashes[path] = (version, digest)
+
+    return digest
+
+
+def _project_file(module):
+    path = getattr(module, '__file__', None)
+    if path is None:
+        return None
+
+    path = os.path.abspath(path)
+    return path if path.startswith(PROJECT_PATH + os.sep) else None
+
+
+def module_dependencies(module_name) -> tuple:
+    ''' Archivos del proyecto que usa el modulo: el suyo y, recursivamente, los de los modulos
+    de los que importa algo (modulos, funciones o clases). Se calcula una vez por modulo '''
+    with _file_hashes_lock:
+        cached = _dependencies.get(module_name)
+    if cached is not None:
+        return cached
+
+    module = sys.modules.get(module_name) or importlib.import_module(module_name)
+    files = set()
+    pending = [module]
+    seen = set()
+
+    while pending:
+        module = pending.pop()
+        path = _project_file(module)
+        if path is None or path in seen:
+            continue
+
+        seen.add(path)
+        files.add(path)
+
+        for value in list(vars(module).values()):
+            if isinstance(value, types.ModuleType):
+                pending.append(value)
+                continue
+
+            owner = getattr(value, '__module__', None)
+            if isinstance(owner, str) and owner in sys.modules:
+                pending.append(sys.modules[owner])
+
+    dependencies = tuple(sorted(files))
+    with _file_hashes_lock:
+        _dependencies[module_name] = dependencies
+
+    return dependencies
+
+
+def _files_fingerprint(paths) -> str:
+    return '|'.join(
+        f'{os.path.relpath(path, PROJECT_PATH)}:{_file_hash(path)}'
+        for path in sorted(paths)
+    )
+
+
+def strategy_fingerprint(strategy) -> str:
+    ''' Codigo de la estrategia y de sus bases hasta Strategy de backtesting.py. Se hashea el
+    archivo entero de cada clase y de los modulos del proyecto que importan, para que cuenten
+    las funciones auxiliares (por ejemplo las de general_purpose) '''
+    names = []
+    paths = set()
+    for cls in strategy.__mro__:
+        if cls is Strategy or not issubclass(cls, Strategy):
+            break
+
+        path = inspect.getsourcefile(cls)
+        if path is None:
+            raise _Uncacheable(cls.__qualname__)
+
+        names.append(f'{cls.__module__}.{cls.__qualname__}')
+        paths.add(os.path.abspath(path))
+        if cls.__module__ in sys.modules:
+            paths.update(module_dependencies(cls.__module__))
+
+    return '|'.join(names) + '|' + _files_fingerprint(paths)
+
+
+def engine_fingerprint() -> str:
+    paths = set()
+    for module_name in ENGINE_MODULES:
+        paths.update(module_dependencies(module_name))
+
+    return f'backtesting={backtesting.__version__}|' + _files_fingerprint(paths)
+
+
+def data_fingerprint(prices: pd.DataFrame) -> str:
+    ''' Huella de las velas: cada columna, el indice y los attrs (modo compacto, minimum_fraction).
+
+    Se hashea el contenido de cada columna en cada llamada: las velas se pueden editar en el
+    lugar (el buffer de velas, scale_prices sobre una copia que reusa el array) y la huella
+    memorizada por array de indicator_cache serviria un resultado viejo.
+    '''
+    parts = [
+        f'{column}={_hash_array(prices[column].to_numpy())}'
+        for column in prices.columns
+    ]
+    index = prices.index
+    parts.append(_hash_array(index.asi8 if isinstance(index, pd.DatetimeIndex) else np.asarray(index)))
+    parts.append(repr(sorted(prices.attrs.items())))
+
+    return '|'.join(parts)
+
+
+def _value_fingerprint(value) -> str:
+    if isinstance(value, dict):
+        items = sorted((_value_fingerprint(k), _value_fingerprint(v)) for k, v in value.items())
+        return '{' + ','.join(f'{k}:{v}' for k, v in items) + '}'
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return 'ts:' + pd.Timestamp(value).isoformat()
+    if isinstance(value, range):
+        return repr(value)
+    if isinstance(value, (tuple, list)):
+        return '[' + ','.join(_value_fingerprint(v) for v in value) + ']'
+    if isinstance(value, np.random.Generator):
+        # El estado del generador cambia con cada uso: no se puede reproducir
+        raise _Uncacheable('Generator')
+    if callable(value) and not isinstance(value, type):
+        return 'fn:' + _function_fingerprint(value)
+    if isinstance(value, type):
+        return 'cls:' + strategy_fingerprint(value) if issubclass(value, Strategy) else f'cls:{value.__module__}.{value.__qualname__}'
+
+    return _argument_fingerprint(value)
+
+
+def _unseeded(strategy, params) -> bool:
+    ''' Estrategias aleatorias (atributo rng) sin semilla: cada corrida da distinto '''
+    if not hasattr(strategy, 'rng'):
+        return False
+
+    opt_params = params.get('opt_params') or {}
+    rng = opt_params.get('rng', strategy.rng) if isinstance(opt_params, dict) else strategy.rng
+
+    return rng is None
+
+
+def _storable(value):
+    ''' Los stats de backtesting.py traen la instancia de la estrategia: se guarda su repr '''
+    if isinstance(value, tuple):
+        return tuple(_storable(v) for v in value)
+
+    if isinstance(value, pd.Series) and '_strategy' in value.index and not isinstance(value['_strategy'], (str, type(None))):
+        value = value.copy()
+        value['_strategy'] = str(value['_strategy'])
+
+    return value
+
+
+class ResultCache:
+    ''' Cache en disco de resultados. El ultimo uso de cada resultado se marca con el mtime
+    del archivo; al pasar max_bytes se borran los usados hace mas tiempo.
+
+    El tamaño total se lleva en memoria: se lee el directorio la primera vez y despues solo
+    al desalojar, que es cuando ademas aparecen los resultados que guardaron otros procesos.
+    '''
+
+    def __init__(self, cache_path=RESULT_CACHE_PATH, max_bytes=RESULT_CACHE_MAX_BYTES, evict_to=RESULT_CACHE_EVICT_TO):
+        self.cache_path = cache_path
+        self.max_bytes = max_bytes
+        self.evict_to = evict_to
+        self.hits = 0
+        self.misses = 0
+        self._total = None
+        self._lock = threading.Lock()
+
+    def key(self, kind, strategy, prices, **params) -> str:
+        if _unseeded(strategy, params):
+            raise _Uncacheable('rng')
+
+        parts = [
+            kind,
+            engine_fingerprint(),
+            strategy_fingerprint(strategy),
+            data_fingerprint(prices),
+        ]
+        parts.extend(f'{name}={_value_fingerprint(value)}' for name, value in sorted(params.items()))
+
+        return hashlib.blake2b('|'.join(parts).encode(), digest_size=20).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_path, key[:2], f'{key}.pkl')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            value = pd.read_pickle(path)
+        except FileNotFoundError:
+            # Tambien si otro proceso lo borro al desalojar
+            return None
+
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        try:
+            previous_size = os.path.getsize(path)
+        except FileNotFoundError:
+            previous_size = 0
+
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            pd.to_pickle(_storable(value), tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        size = os.path.getsize(path)
+
+        with self._lock:
+            if self._total is None:
+                self._total = sum(file_size for _, file_size, _ in self._files())
+            else:
+                self._total += size - previous_size
+
+            if self._total > self.max_bytes:
+                self._evict(keep=path)
+
+    def _files(self):
+        ''' (mtime, tamaño, path) de cada resultado guardado '''
+        files = []
+        for root, _, names in os.walk(self.cache_path):
+            for name in names:
+                if not name.endswith('.pkl'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, os.path.join(root, name)))
+
+        return files
+
+    def _evict(self, keep=None):
+        ''' Borra los usados hace mas tiempo hasta quedar en evict_to * max_bytes '''
+        files = self._files()
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * self.evict_to
+
+        for _, size, path in sorted(files):
+            if total <= target:
+                break
+
+            if keep and os.path.abspath(path) == os.path.abspath(keep):
+                continue
+
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+
+        self._total = total
+
+    def cached(self, kind, compute, strategy, prices, **params):
+        ''' Devuelve el resultado guardado para esta combinacion o lo calcula con compute()
+        y lo guarda. Si algun parametro no se puede huellar se calcula sin cache '''
+        try:
+            key = self.key(kind, strategy, prices, **params)
+        except _Uncacheable:
+            return compute()
+
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = compute()
+        self.put(key, value)
+
+        return value
+
+    def clear(self):
+        for root, _, files in os.walk(self.cache_path):
+            for name in files:
+                if name.endswith('.pkl'):
+                    os.remove(os.path.join(root, name))
+        self._total = None
+        self.hits = 0
+        self.misses = 0
+
+
+result_cache = ResultCache()
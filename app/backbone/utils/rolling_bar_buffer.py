@@ -0,0 +1,148 @@
+import os
+import numpy as np
+import pandas as pd
+
+DEFAULT_BUFFER_PATH = './data_cache/live'
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+BAR_COLUMNS = PRICE_COLUMNS + ['Volume']
+
+
+class RollingBarBuffer:
+    ''' Ventana de las ultimas `capacity` velas cerradas de un simbolo, ya escaladas.
+
+    Se guarda en disco entre corridas (un archivo por ticker, timeframe y capacidad) y en
+    cada update solo se le piden al broker las velas posteriores a la ultima guardada.
+    Internamente usa un array del doble de la capacidad, asi la ventana siempre es un
+    tramo contiguo y agregar velas no copia la ventana entera.
+    '''
+
+    def __init__(self, ticker, timeframe, capacity, scale=1.0, buffer_path=DEFAULT_BUFFER_PATH):
+        self.ticker = ticker
+        self.timeframe = timeframe
+        self.capacity = capacity
+        self.scale = scale
+        # Bots con distinto look_back_bars + warmup_bars sobre el mismo simbolo no comparten archivo
+        self.path = os.path.join(buffer_path, f'{ticker}_{timeframe}_{capacity}.npz')
+
+        self._times = np.empty(2 * capacity, dtype=np.int64)
+        self._bars = np.empty((2 * capacity, len(BAR_COLUMNS)), dtype=np.float64)
+        self._end = 0
+        self._size = 0
+
+        self._load()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def last_time(self):
+        ''' Apertura (segundos epoch) de la ultima vela guardada '''
+        return int(self._times[self._end - 1]) if self._size else None
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+
+        stored = np.load(self.path)
+        times, bars = stored['times'], stored['bars']
+
+        # Si cambio el minimum_fraction se reescalan los precios guardados
+        bars = bars.copy()
+        bars[:, :len(PRICE_COLUMNS)] *= self.scale / float(stored['scale'])
+
+        self._append(times[-self.capacity:], bars[-self.capacity:])
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f'{self.path}.{os.getpid()}.tmp.npz'
+        start = self._end - self._size
+        np.savez(
+            tmp_path,
+            times=self._times[start:self._end],
+            bars=self._bars[start:self._end],
+            scale=np.float64(self.scale),
+        )
+        os.replace(tmp_path, self.path)
+
+    def _append(self, times, bars):
+        n = len(times)
+        if n == 0:
+            return
+
+        if n >= self.capacity:
+            times, bars = times[-self.capacity:], bars[-self.capacity:]
+            n = self.capacity
+            self._end = 0
+            self._size = 0
+
+        # Cuando no entra, se mueve la ventana al principio (una copia cada `capacity` velas)
+        if self._end + n > len(self._times):
+            keep = min(self._size, self.capacity - n)
+            self._times[:keep] = self._times[self._end - keep:self._end]
+            self._bars[:keep] = self._bars[self._end - keep:self._end]
+            self._end = keep
+            self._size = keep
+
+        self._times[self._end:self._end + n] = times
+        self._bars[self._end:self._end + n] = bars
+        self._end += n
+        self._size = min(self._size + n, self.capacity)
+
+    def append_rates(self, rates):
+        ''' Agrega las velas (array de MT5) posteriores a la ultima guardada '''
+        if rates is None or len(rates) == 0:
+            return 0
+
+        rates = rates[rates['time'] > self.last_time] if self._size else rates
+
+        bars = np.column_stack([
+            rates['open'] * self.scale,
+            rates['high'] * self.scale,
+            rates['low'] * self.scale,
+            rates['close'] * self.scale,
+            rates['tick_volume'].astype(np.float64),
+        ])
+
+        self._append(rates['time'].astype(np.int64), bars)
+
+        return len(rates)
+
+    def update(self, metatrader, batch_size=16):
+        ''' Trae del broker solo las velas cerradas que faltan (start_pos=1 saltea la vela en formacion) '''
+        # Buffer vacio o incompleto (primera corrida, o el broker tenia menos historia): se pide
+        # la ventana entera, si no las velas que faltan al principio no se completarian nunca
+        if self._size < self.capacity:
+            rates = metatrader.copy_rates_from_pos(self.ticker, self.timeframe, 1, self.capacity)
+            if rates is not None and len(rates):
+                self._end = 0
+                self._size = 0
+                self.append_rates(rates)
+
+            self.save()
+            return
+
+        count = batch_size
+        while True:
+            rates = metatrader.copy_rates_from_pos(self.ticker, self.timeframe, 1, count)
+            if rates is None or len(rates) == 0:
+                break
+
+            # Alcanza con que la tanda llegue hasta la ultima vela guardada
+            if rates['time'][0] <= self.last_time or count >= self.capacity:
+                self.append_rates(rates)
+                break
+
+            count = min(count * 2, self.capacity)
+
+        self.save()
+
+    def frame(self) -> pd.DataFrame:
+        ''' DataFrame OHLCV con indice UTC de la ventana actual. Es una copia: el buffer se
+        reescribe en el proximo update y una vista cambiaria debajo de la estrategia '''
+        start = self._end - self._size
+        index = pd.DatetimeIndex(
+            self._times[start:self._end] * 1_000_000_000,
+            name='Date'
+        ).tz_localize('UTC')
+
+        return pd.DataFrame(self._bars[start:self._end].copy(), index=index, columns=BAR_COLUMNS, copy=False)
@@ -0,0 +1,238 @@
+import os
+from functools import partial
+from math import copysign
+import numpy as np
+import pandas as pd
+from backtesting.backtesting import _Broker
+from app.backbone.utils.data_cache import to_utc_timestamp
+from app.backbone.utils.metatrader import mt5
+from app.backbone.utils.resample import bar_open_times
+
+# Spreads por vela y ticks comprimidos:
+# <store_path>/<ticker>/<timeframe>_spreads.npz y <store_path>/<ticker>/ticks_<from>_<to>.npz
+DEFAULT_SPREAD_STORE_PATH = os.environ.get('SPREAD_STORE_PATH', './data_cache/spreads')
+
+
+def _delta_encode(times: np.ndarray):
+    ''' Primer timestamp + diferencias en el entero mas chico que las contenga '''
+    times = np.asarray(times, dtype=np.int64)
+    if len(times) == 0:
+        return np.int64(0), np.empty(0, dtype=np.uint32)
+
+    deltas = np.diff(times)
+    dtype = np.uint32 if len(deltas) == 0 or (deltas.min() >= 0 and deltas.max() <= np.iinfo(np.uint32).max) else np.int64
+
+    return times[0], deltas.astype(dtype)
+
+
+def _delta_decode(first, deltas):
+    times = np.empty(len(deltas) + 1, dtype=np.int64)
+    times[0] = 0
+    np.cumsum(deltas, dtype=np.int64, out=times[1:])
+    return times + first
+
+
+def _save_npz(path, **arrays):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp.npz'
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+def _spreads_path(store_path, ticker, timeframe):
+    return os.path.join(store_path, ticker, f'{timeframe}_spreads.npz')
+
+
+def store_bar_spreads(ticker, timeframe, prices: pd.DataFrame, point: float, store_path=DEFAULT_SPREAD_STORE_PATH):
+    ''' Guarda la columna spread (en puntos) de las velas de MT5. Se mergea con lo que ya
+    estaba guardado (gana la vela nueva), asi bajar un tramo corto no borra el resto '''
+    if 'spread' not in prices or prices.empty:
+        return
+
+    index = pd.DatetimeIndex(prices.index)
+    index = index.tz_localize('UTC') if index.tz is None else index.tz_convert('UTC')
+    spreads = pd.Series(prices['spread'].to_numpy(), index=index)
+
+    if has_bar_spreads(ticker, timeframe, store_path=store_path):
+        stored, _ = load_bar_spreads(ticker, timeframe, store_path=store_path)
+        spreads = pd.concat([stored, spreads])
+        spreads = spreads[~spreads.index.duplicated(keep='last')].sort_index()
+
+    times = spreads.index.tz_localize(None).asi8 // 1_000_000_000
+    first, deltas = _delta_encode(times)
+
+    values = spreads.to_numpy()
+    spread_dtype = np.uint16 if values.min() >= 0 and values.max() <= np.iinfo(np.uint16).max else np.int32
+
+    _save_npz(
+        _spreads_path(store_path, ticker, timeframe),
+        time_first=first,
+        time_deltas=deltas,
+        spread=values.astype(spread_dtype),
+        point=np.float64(point),
+    )
+
+
+def has_bar_spreads(ticker, timeframe, store_path=DEFAULT_SPREAD_STORE_PATH) -> bool:
+    return os.path.exists(_spreads_path(store_path, ticker, timeframe))
+
+
+def load_bar_spreads(ticker, timeframe, store_path=DEFAULT_SPREAD_STORE_PATH):
+    ''' Devuelve (serie de spreads en puntos con indice UTC, valor del punto) '''
+    stored = np.load(_spreads_path(store_path, ticker, timeframe))
+    times = _delta_decode(stored['time_first'], stored['time_deltas'])
+
+    index = pd.DatetimeIndex(times * 1_000_000_000, name='Date').tz_localize('UTC')
+    return pd.Series(stored['spread'], index=index, name='spread'), float(stored['point'])
+
+
+def resample_bar_spreads(ticker, timeframe, base_timeframe, store_path=DEFAULT_SPREAD_STORE_PATH):
+    ''' Guarda los spreads de un timeframe derivado a partir de los del timeframe base:
+    el spread de cada vela es el promedio (redondeado) de las velas base que la forman '''
+    bar_spreads, point = load_bar_spreads(ticker, base_timeframe, store_path=store_path)
+    if bar_spreads.empty:
+        return
+
+    open_times = bar_open_times(bar_spreads.index.tz_localize(None).asi8, timeframe)
+    starts = np.flatnonzero(np.r_[True, open_times[1:] != open_times[:-1]])
+    counts = np.diff(np.r_[starts, len(open_times)])
+
+    spreads = np.rint(np.add.reduceat(bar_spreads.to_numpy(dtype=np.float64), starts) / counts)
+    index = pd.DatetimeIndex(open_times[starts].view('M8[ns]'), name='Date').tz_localize('UTC')
+
+    store_bar_spreads(
+        ticker,
+        timeframe,
+        pd.DataFrame({'spread': spreads.astype(np.int64)}, index=index),
+        point=point,
+        store_path=store_path,
+    )
+
+
+def relative_spreads(prices: pd.DataFrame, spreads: pd.Series, point: float, commission=None) -> np.ndarray:
+    ''' Spread relativo al Close para cada vela de prices (mismo formato que commission).
+
+    Las velas fuera del rango de spreads guardado no tienen spread propio: se les cobra
+    commission si se pasa (si no, el spread guardado mas cercano) y se avisa cuantas son.
+    '''
+    # El point del simbolo esta en precios sin escalar: las velas compactas del bar store
+    # ya vienen multiplicadas por minimum_fraction
+    if prices.attrs.get('prices_scaled'):
+        point = point * prices.attrs['minimum_fraction']
+
+    if spreads.empty:
+        if commission is None:
+            raise Exception('No hay spreads guardados y no se paso commission')
+
+        outside = np.ones(len(prices), dtype=bool)
+        relative = np.full(len(prices), np.nan)
+    else:
+        outside = (prices.index < spreads.index[0]) | (prices.index > spreads.index[-1])
+        spread_points = spreads.reindex(prices.index, method='ffill').bfill().to_numpy(dtype=np.float64)
+        relative = spread_points * point / prices['Close'].to_numpy(dtype=np.float64)
+
+    if outside.any():
+        fallback = 'la comision fija' if commission is not None else 'el spread guardado mas cercano'
+        print(f'{outside.sum()} de {len(prices)} velas fuera del rango de spreads guardado, se cobra {fallback}')
+
+        if commission is not None:
+            relative[outside] = commission
+
+    return relative
+
+
+def fetch_ticks(ticker, date_from, date_to, store_path=DEFAULT_SPREAD_STORE_PATH):
+    ''' Baja los ticks del broker y los guarda comprimidos: tiempos en ms delta-encoded y precios en float32 '''
+    ticks = mt5.copy_ticks_range(
+        ticker,
+        to_utc_timestamp(date_from).to_pydatetime(),
+        to_utc_timestamp(date_to).to_pydatetime(),
+        mt5.COPY_TICKS_ALL,
+    )
+
+    if ticks is None:
+        raise Exception("copy_ticks_range() failed, error code =", mt5.last_error())
+
+    first, deltas = _delta_encode(ticks['time_msc'])
+    path = os.path.join(
+        store_path,
+        ticker,
+        f'ticks_{to_utc_timestamp(date_from):%Y%m%d}_{to_utc_timestamp(date_to):%Y%m%d}.npz'
+    )
+
+    _save_npz(
+        path,
+        time_first=first,
+        time_deltas=deltas,
+        bid=ticks['bid'].astype(np.float32),
+        ask=ticks['ask'].astype(np.float32),
+        volume=ticks['volume'].astype(np.float32),
+    )
+
+    return path
+
+
+def load_ticks(path) -> pd.DataFrame:
+    stored = np.load(path)
+    times = _delta_decode(stored['time_first'], stored['time_deltas'])
+
+    return pd.DataFrame(
+        {
+            'bid': stored['bid'],
+            'ask': stored['ask'],
+            'volume': stored['volume'],
+        },
+        index=pd.DatetimeIndex(times * 1_000_000, name='Date').tz_localize('UTC'),
+    )
+
+
+def ticks_to_bars(ticks: pd.DataFrame, timeframe: int) -> pd.DataFrame:
+    ''' Arma velas (sobre el bid, como MT5) con estadisticas de spread por vela '''
+    index = pd.DatetimeIndex(ticks.index)
+    times = (index.tz_convert('UTC').tz_localize(None) if index.tz is not None else index).asi8
+
+    open_times = bar_open_times(times, timeframe)
+    starts = np.flatnonzero(np.r_[True, open_times[1:] != open_times[:-1]])
+    ends = np.r_[starts[1:], len(open_times)] - 1
+    counts = np.diff(np.r_[starts, len(open_times)])
+
+    bid = ticks['bid'].to_numpy(dtype=np.float64)
+    spread = ticks['ask'].to_numpy(dtype=np.float64) - bid
+
+    bars = pd.DataFrame(
+        {
+            'Open': bid[starts],
+            'High': np.maximum.reduceat(bid, starts),
+            'Low': np.minimum.reduceat(bid, starts),
+            'Close': bid[ends],
+            'Volume': counts,
+            'SpreadMean': np.add.reduceat(spread, starts) / counts,
+            'SpreadMin': np.minimum.reduceat(spread, starts),
+            'SpreadMax': np.maximum.reduceat(spread, starts),
+        },
+        index=pd.DatetimeIndex(open_times[starts].view('M8[ns]'), name='Date').tz_localize('UTC'),
+    )
+
+    return bars
+
+
+class _SpreadBroker(_Broker):
+    ''' Broker de backtesting que cobra el spread de la vela en la que se ejecuta la orden '''
+
+    def __init__(self, *, spreads, **kwargs):
+        super().__init__(**kwargs)
+        self._spreads = spreads
+
+    def _adjusted_price(self, size=None, price=None) -> float:
+        # self._data esta recortado hasta la vela actual
+        spread = self._spreads[len(self._data) - 1]
+        return (price or self.last_price) * (1 + copysign(spread, size))
+
+
+def use_spread_costs(bt, spreads: np.ndarray):
+    ''' Hace que el Backtest cobre un spread por vela en vez de la comision fija '''
+    if len(spreads) != len(bt._data):
+        raise Exception('spreads tiene que tener una posicion por vela')
+
+    bt._broker = partial(_SpreadBroker, spreads=np.asarray(spreads, dtype=np.float64), **bt._broker.keywords)
+    return bt
@@ -0,0 +1,513 @@
+import os
+from math import copysign
+import numpy as np
+import pandas as pd
+from backtesting._stats import _Stats, geometric_mean
+from backtesting._util import _data_period
+from backbone.utils.general_purpose import calculate_units_size, diff_pips
+from app.backbone.utils.metrics import windowed_stability_ratio
+from app.backbone.utils.vectorized_engine import (
+    _first_at_or_after,
+    _first_stop_hit,
+    _start_bar,
+    _strategy_params,
+    supports_vectorized,
+)
+from app.backbone.utils.wfo_utils import get_performance, get_scaled_symbol_metadata
+
+# Backtest por tramos para historias muy largas (años de M1). Usa las señales del motor
+# vectorizado (classmethod signals) pero las calcula tramo por tramo: cada tramo se extiende
+# hacia atras WARMUP_BARS velas para que los indicadores lleguen calientes al borde, y entre
+# tramos se arrastra la cuenta (cash, posicion abierta, orden o salida pendiente para la
+# vela siguiente). La equity se escribe en un .npy mapeado y los trades se agregan a un csv
+# a medida que se cierran, asi la memoria de la simulacion depende del tamaño del tramo y no
+# del largo de la historia. Al final las metricas se calculan sobre esos archivos, tambien
+# de a un tramo por vez (drawdown, retornos diarios y StabilityRatio se acumulan por ventana).
+#
+# Con indicadores de ventana finita (SMA, bandas, canales) el resultado es identico al de
+# run_strategy_vectorized si el warmup cubre la ventana mas larga; con los recursivos (ATR,
+# EMA, MACD) la diferencia cae exponencialmente con el warmup.
+#
+# _streaming_stats reproduce compute_stats de backtesting.py linea por linea, asi que depende
+# de la version fijada en requirements.txt: al actualizarla hay que volver a compararlos
+# (tests/test_streaming_engine.py falla si la version instalada no es BACKTESTING_VERSION).
+BACKTESTING_VERSION = '0.3.3'
+CHUNK_BARS = int(os.environ.get('STREAMING_CHUNK_BARS', 250_000))
+WARMUP_BARS = int(os.environ.get('STREAMING_WARMUP_BARS', 5_000))
+STREAMING_PATH = os.environ.get('STREAMING_PATH', './streaming')
+
+TRADE_COLUMNS = ['Size', 'EntryBar', 'ExitBar', 'EntryPrice', 'ExitPrice']
+
+
+class _ChunkedSimulation:
+    ''' Estado de la cuenta entre tramos, con las mismas reglas que vectorized_engine.simulate '''
+
+    def __init__(self, n, cash, margin, units_size, equity, trades_path):
+        self.n = n
+        self.cash = cash
+        self.leverage = 1 / margin
+        self.units_size = units_size
+        self.equity = equity
+        self.trades_path = trades_path
+
+        self.bar = None             # vela desde la que se buscan entradas sin posicion
+        self.pending_entry = None   # (size, sl, is_long) si la señal fue en la ultima vela del tramo
+        self.position = None        # (size, entry_bar, entry_price, sl, is_long, last_call)
+        self.exit_at = None         # salida a mercado en el Open del tramo siguiente
+        self.finished = False
+
+        self.trades = []
+        self.trade_count = 0
+
+    def run_chunk(self, w0, c0, c1, open_, high, low, close, signals, commissions):
+        ''' Simula las velas [c0, c1). Los arrays arrancan en w0 (c0 menos el warmup) '''
+        if self.finished:
+            self.equity[c0:c1] = self.equity[c0 - 1] if c0 else self.cash
+            return
+
+        if self.bar is None:
+            self.bar = _start_bar(signals['indicators'])
+            self.equity[:self.bar] = self.cash
+
+        long_entry = np.asarray(signals['long_entry'], dtype=bool)
+        entries = np.flatnonzero(long_entry | np.asarray(signals['short_entry'], dtype=bool)) + w0
+        long_exits = np.flatnonzero(signals['long_exit']) + w0
+        short_exits = np.flatnonzero(signals['short_exit']) + w0
+        sl_distance = np.asarray(signals['sl_distance'], dtype=np.float64)
+
+        while not self.finished:
+            if self.position is not None:
+                if not self._advance_position(w0, c0, c1, open_, high, low, close, long_exits, short_exits):
+                    return
+                continue
+
+            if self.pending_entry is not None:
+                size, sl, is_long = self.pending_entry
+                self.pending_entry = None
+                self._open(c0, size, sl, is_long, False, w0, open_, commissions)
+                continue
+
+            signal_bar = _first_at_or_after(entries, max(self.bar, c0))
+            if signal_bar is None or signal_bar >= c1:
+                self.equity[self.bar:c1] = self.cash
+                self.bar = c1
+                return
+
+            is_long = bool(long_entry[signal_bar - w0])
+            price = close[signal_bar - w0]
+            distance = sl_distance[signal_bar - w0]
+            sl = price - distance if is_long else price + distance
+            size = self.units_size(self.cash, price, sl)
+            size = size if is_long else -size
+
+            # Una señal en la ultima vela se ejecuta en el cierre final de backtesting (Open de la misma vela)
+            last_call = signal_bar == self.n - 1
+            entry_bar = self.n - 1 if last_call else signal_bar + 1
+            self.equity[self.bar:entry_bar] = self.cash
+
+            if entry_bar == c1:
+                self.pending_entry = (size, sl, is_long)
+                self.bar = c1
+                return
+
+            self._open(entry_bar, size, sl, is_long, last_call, w0, open_, commissions)
+
+    def _open(self, entry_bar, size, sl, is_long, last_call, w0, open_, commissions):
+        entry_price = open_[entry_bar - w0] * (1 + copysign(commissions[entry_bar - w0], size))
+
+        # Sin margen suficiente backtesting cancela la orden
+        if abs(size) * entry_price > self.cash * self.leverage:
+            if last_call:
+                self.equity[self.n - 1] = self.cash
+                self.finished = True
+            self.bar = entry_bar
+            return
+
+        self.position = (size, entry_bar, entry_price, sl, is_long, last_call)
+
+    def _advance_position(self, w0, c0, c1, open_, high, low, close, long_exits, short_exits) -> bool:
+        ''' Busca la salida de la posicion en el tramo. Devuelve False si sigue abierta al terminarlo '''
+        n = self.n
+        size, entry_bar, entry_price, sl, is_long, last_call = self.position
+        from_bar = max(entry_bar, c0)
+
+        stop_bar = _first_stop_hit(low, high, from_bar - w0, sl, is_long)
+        stop_bar = None if stop_bar is None else stop_bar + w0
+
+        final_close = False
+        if last_call:
+            # El trade queda abierto (no cuenta en los stats) salvo que toque el stop en esa vela
+            if stop_bar is None:
+                self.equity[n - 1] = self.cash + size * (close[n - 1 - w0] - entry_price)
+                self.finished = True
+                return True
+            exit_bar, market_exit = stop_bar, False
+        elif self.exit_at is not None:
+            exit_bar, market_exit = self.exit_at, True
+        else:
+            exit_signal_bar = _first_at_or_after(long_exits if is_long else short_exits, from_bar)
+
+            if stop_bar is not None and (exit_signal_bar is None or stop_bar <= exit_signal_bar):
+                exit_bar, market_exit = stop_bar, False
+            elif exit_signal_bar is not None and exit_signal_bar + 1 < n:
+                exit_bar, market_exit = exit_signal_bar + 1, True
+            elif exit_signal_bar is not None or c1 == n:
+                # Sigue abierto al terminar: backtesting lo cierra en el Open de la ultima vela
+                exit_bar, market_exit, final_close = n - 1, True, True
+            else:
+                # Ni stop ni señal de salida en este tramo: se arrastra al siguiente
+                self._write_open_equity(from_bar, c1, c1, w0, close)
+                return False
+
+        # La salida a mercado en la primera vela del tramo siguiente tambien se arrastra
+        if exit_bar >= c1:
+            if self._write_open_equity(from_bar, c1, c1, w0, close):
+                self.exit_at = exit_bar
+            return False
+
+        open_until = n if final_close else exit_bar
+        if not self._write_open_equity(from_bar, open_until, c1, w0, close):
+            return True
+
+        exit_price = open_[exit_bar - w0] if market_exit else (
+            min(open_[exit_bar - w0], sl) if is_long else max(open_[exit_bar - w0], sl)
+        )
+
+        self.cash += size * (exit_price - entry_price)
+        self.equity[exit_bar] = self.cash
+        self.trades.append((size, entry_bar, exit_bar, entry_price, exit_price))
+
+        self.position = None
+        self.exit_at = None
+        self.bar = exit_bar
+        self.finished = final_close
+
+        return True
+
+    def _write_open_equity(self, from_bar, until, c1, w0, close) -> bool:
+        ''' Equity con el trade abierto en [from_bar, until). Si llega a cero backtesting
+        cierra todo al Close y corta: devuelve False '''
+        size, entry_bar, entry_price = self.position[:3]
+        open_equity = self.cash + size * (close[from_bar - w0:until - w0] - entry_price)
+
+        ruined = np.flatnonzero(open_equity <= 0)
+        if len(ruined):
+            ruin_bar = from_bar + int(ruined[0])
+            self.equity[from_bar:ruin_bar] = open_equity[:ruined[0]]
+            self.equity[ruin_bar:c1] = 0
+            self.trades.append((size, entry_bar, ruin_bar, entry_price, close[ruin_bar - w0]))
+            self.cash = 0
+            self.position = None
+            self.finished = True
+            return False
+
+        self.equity[from_bar:min(until, c1)] = open_equity[:min(until, c1) - from_bar]
+        return True
+
+    def flush_trades(self):
+        if not self.trades:
+            return
+
+        pd.DataFrame(self.trades, columns=TRADE_COLUMNS).to_csv(
+            self.trades_path, mode='a', header=self.trade_count == 0, index=False
+        )
+        self.trade_count += len(self.trades)
+        self.trades = []
+
+
+def _exposure_bars(trades: pd.DataFrame) -> int:
+    ''' Velas con posicion abierta (union de [EntryBar, ExitBar] de los trades) '''
+    if trades.empty:
+        return 0
+
+    intervals = trades[['EntryBar', 'ExitBar']].to_numpy(dtype=np.int64)
+    intervals = intervals[np.argsort(intervals[:, 0], kind='stable')]
+
+    bars = 0
+    current_start, current_end = intervals[0]
+    for start, end in intervals[1:]:
+        if start > current_end:
+            bars += current_end - current_start + 1
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+
+    return int(bars + current_end - current_start + 1)
+
+
+def _streaming_stats(trades: pd.DataFrame, equity: np.ndarray, index: pd.DatetimeIndex, close: np.ndarray, window: int):
+    ''' Los mismos stats que compute_stats de backtesting.py (BACKTESTING_VERSION), pero recorriendo la equity de a
+    window velas: no se arman el drawdown ni la curva de equity completos en memoria.
+    _equity_curve solo tiene la columna Equity, sobre la equity mapeada '''
+    n = len(equity)
+    times = index.asi8
+
+    peak = -np.inf
+    equity_peak = -np.inf
+    max_dd = np.nan
+
+    # Episodios de drawdown: entre dos velas sin drawdown con al menos una vela en el medio
+    last_zero = None
+    episode_max = 0.0
+    episodes = 0
+    durations_sum = np.float64(0)
+    max_duration = None
+    peaks_sum = 0.0
+    nonzero_sum = 0.0
+    nonzero_count = 0
+    nonzero_max = np.nan
+
+    weekend_bars = 0
+    day_keys = []
+    day_equity = []
+
+    def add_episode(start, end, episode_peak):
+        nonlocal episodes, durations_sum, max_duration, peaks_sum
+        duration = times[end] - times[start]
+        episodes += 1
+        durations_sum += duration
+        max_duration = duration if max_duration is None else max(max_duration, duration)
+        peaks_sum += episode_peak
+
+    for start in range(0, n, window):
+        eq = np.asarray(equity[start:start + window], dtype=np.float64)
+        running_peak = np.maximum(np.maximum.accumulate(eq), peak)
+        peak = running_peak[-1]
+        dd = 1 - eq / running_peak
+
+        equity_peak = max(equity_peak, eq.max())
+        max_dd = np.fmax(max_dd, dd.max())
+
+        nonzero = dd[dd > 0]
+        if len(nonzero):
+            nonzero_sum += nonzero.sum()
+            nonzero_count += len(nonzero)
+            nonzero_max = np.fmax(nonzero_max, nonzero.max())
+
+        zeros = np.flatnonzero(dd == 0)
+        if not len(zeros):
+            episode_max = max(episode_max, dd.max())
+        else:
+            head = dd[:zeros[0]]
+            if last_zero is not None and start + zeros[0] > last_zero + 1:
+                add_episode(last_zero, start + zeros[0], max(episode_max, head.max() if len(head) else 0.0))
+
+            segment_max = np.maximum.reduceat(dd, zeros)
+            for i in np.flatnonzero(np.diff(zeros) > 1):
+                add_episode(start + zeros[i], start + zeros[i + 1], segment_max[i])
+
+            last_zero = start + zeros[-1]
+            episode_max = segment_max[-1]
+
+        window_index = index[start:start + window]
+        weekend_bars += int((window_index.dayofweek >= 5).sum())
+
+        days = window_index.normalize()
+        is_last = np.r_[days[1:] != days[:-1], True]
+        day_keys.append(days[is_last])
+        day_equity.append(eq[is_last])
+
+    # compute_stats cierra el ultimo episodio en la ultima vela aunque siga en drawdown
+    if last_zero is not None and n - 1 > last_zero + 1:
+        add_episode(last_zero, n - 1, episode_max)
+
+    period = _data_period(index)
+
+    def _round_timedelta(value):
+        if not isinstance(value, pd.Timedelta):
+            return value
+        resolution = getattr(period, 'resolution_string', None) or period.resolution
+        return value.ceil(resolution)
+
+    if episodes:
+        max_dd_duration = pd.Timedelta(int(max_duration))
+        avg_dd_duration = pd.Timedelta(durations_sum / episodes)
+        avg_dd = peaks_sum / episodes
+    else:
+        # Igual que compute_stats: sin episodios las duraciones son los drawdowns no nulos
+        max_dd_duration = nonzero_max
+        avg_dd_duration = nonzero_sum / nonzero_count if nonzero_count else np.nan
+        avg_dd = avg_dd_duration
+
+    pl = trades['PnL']
+    returns = trades['ReturnPct']
+    durations = trades['Duration']
+
+    equity_first = float(equity[0])
+    equity_final = float(equity[-1])
+
+    s = pd.Series(dtype=object)
+    s.loc['Start'] = index[0]
+    s.loc['End'] = index[-1]
+    s.loc['Duration'] = s.End - s.Start
+    s.loc['Exposure Time [%]'] = _exposure_bars(trades) / n * 100
+    s.loc['Equity Final [$]'] = equity_final
+    s.loc['Equity Peak [$]'] = equity_peak
+    s.loc['Return [%]'] = (equity_final - equity_first) / equity_first * 100
+    s.loc['Buy & Hold Return [%]'] = (close[-1] - close[0]) / close[0] * 100
+
+    day_equity = pd.Series(np.concatenate(day_equity), index=pd.DatetimeIndex(np.concatenate(day_keys)))
+    day_equity = day_equity.groupby(level=0).last()
+    day_returns = day_equity.resample('D').last().dropna().pct_change()
+    gmean_day_return = geometric_mean(day_returns)
+    annual_trading_days = float(365 if weekend_bars / n > 2 / 7 * .6 else 252)
+
+    annualized_return = (1 + gmean_day_return)**annual_trading_days - 1
+    s.loc['Return (Ann.) [%]'] = annualized_return * 100
+    s.loc['Volatility (Ann.) [%]'] = np.sqrt((day_returns.var(ddof=int(bool(day_returns.shape))) + (1 + gmean_day_return)**2)**annual_trading_days - (1 + gmean_day_return)**(2*annual_trading_days)) * 100
+    s.loc['Sharpe Ratio'] = np.clip(s.loc['Return (Ann.) [%]'] / (s.loc['Volatility (Ann.) [%]'] or np.nan), 0, np.inf)
+    s.loc['Sortino Ratio'] = np.clip(annualized_return / (np.sqrt(np.mean(day_returns.clip(-np.inf, 0)**2)) * np.sqrt(annual_trading_days)), 0, np.inf)
+    max_dd = -np.nan_to_num(max_dd)
+    s.loc['Calmar Ratio'] = np.clip(annualized_return / (-max_dd or np.nan), 0, np.inf)
+    s.loc['Max. Drawdown [%]'] = max_dd * 100
+    s.loc['Avg. Drawdown [%]'] = -avg_dd * 100
+    s.loc['Max. Drawdown Duration'] = _round_timedelta(max_dd_duration)
+    s.loc['Avg. Drawdown Duration'] = _round_timedelta(avg_dd_duration)
+    s.loc['# Trades'] = n_trades = len(trades)
+    s.loc['Win Rate [%]'] = np.nan if not n_trades else (pl > 0).sum() / n_trades * 100
+    s.loc['Best Trade [%]'] = returns.max() * 100
+    s.loc['Worst Trade [%]'] = returns.min() * 100
+    s.loc['Avg. Trade [%]'] = geometric_mean(returns) * 100
+    s.loc['Max. Trade Duration'] = _round_timedelta(durations.max())
+    s.loc['Avg. Trade Duration'] = _round_timedelta(durations.mean())
+    s.loc['Profit Factor'] = returns[returns > 0].sum() / (abs(returns[returns < 0].sum()) or np.nan)
+    s.loc['Expectancy [%]'] = returns.mean() * 100
+    s.loc['SQN'] = np.sqrt(n_trades) * pl.mean() / (pl.std() or np.nan)
+
+    # Vista sobre el .npy mapeado, sin copiar la equity. Se arma el array de objetos a mano:
+    # asignar un DataFrame con s.loc o pasarlo en una lista a pd.Series lo recorre entero
+    equity_curve = pd.DataFrame(np.asarray(equity).reshape(-1, 1), index=index, columns=['Equity'], copy=False)
+
+    keys = [*s.index, '_strategy', '_equity_curve', '_trades']
+    values = np.empty(len(keys), dtype=object)
+    for i, value in enumerate([*s.to_numpy(), None, equity_curve, trades]):
+        values[i] = value
+
+    return _Stats(values, index=keys)
+
+
+def run_strategy_chunked(
+    strategy,
+    ticker,
+    prices: pd.DataFrame,
+    initial_cash: float,
+    commission: float,
+    margin: float,
+    risk=None,
+    spreads=None,
+    chunk_bars: int = CHUNK_BARS,
+    warmup_bars: int = WARMUP_BARS,
+    output_path: str = None,
+    **params,
+):
+    ''' Igual que run_strategy_vectorized pero por tramos de chunk_bars velas. Devuelve
+    (df_stats, trade_performance, stats); la equity (equity.npy) y los trades (trades.csv)
+    quedan en output_path.
+
+    prices puede ser la vista mapeada de attach_bars: solo se lee (y escala) un tramo por vez.
+    '''
+    if not supports_vectorized(strategy):
+        raise Exception(f'{strategy.__name__} no declara signals, no se puede correr por tramos')
+
+    if chunk_bars <= 0 or warmup_bars < 0:
+        raise Exception('chunk_bars tiene que ser positivo y warmup_bars no negativo')
+
+    (
+        scaled_pip_value,
+        scaled_minimum_lot,
+        scaled_maximum_lot,
+        scaled_contract_volume,
+        minimum_fraction,
+        trade_tick_value_loss,
+        volume_step,
+    ) = get_scaled_symbol_metadata(ticker)
+
+    # Los precios del modo compacto del bar store ya vienen escalados
+    if prices.attrs.get('prices_scaled'):
+        minimum_fraction = 1.0
+
+    run_params = _strategy_params(
+        strategy,
+        {
+            'pip_value': scaled_pip_value,
+            'minimum_lot': scaled_minimum_lot,
+            'maximum_lot': scaled_maximum_lot,
+            'contract_volume': scaled_contract_volume,
+            'trade_tick_value_loss': trade_tick_value_loss,
+            'volume_step': volume_step,
+            'risk': risk,
+            **params,
+        }
+    )
+
+    def units_size(equity, price, sl_price):
+        return calculate_units_size(
+            account_size=equity,
+            risk_percentage=run_params.risk,
+            stop_loss_pips=diff_pips(price, sl_price, pip_value=run_params.pip_value),
+            maximum_lot=run_params.maximum_lot,
+            minimum_lot=run_params.minimum_lot,
+            return_lots=False,
+            contract_volume=run_params.contract_volume,
+            trade_tick_value_loss=run_params.trade_tick_value_loss
+        )
+
+    output_path = output_path or os.path.join(STREAMING_PATH, f'{strategy.__name__}_{ticker}')
+    os.makedirs(output_path, exist_ok=True)
+
+    trades_path = os.path.join(output_path, 'trades.csv')
+    if os.path.exists(trades_path):
+        os.remove(trades_path)
+
+    n = len(prices)
+    equity = np.lib.format.open_memmap(
+        os.path.join(output_path, 'equity.npy'), mode='w+', dtype=np.float64, shape=(n,)
+    )
+
+    columns = {column: prices[column].to_numpy() for column in ['Open', 'High', 'Low', 'Close']}
+    commissions = np.broadcast_to(np.asarray(spreads if spreads is not None else commission, dtype=np.float64), (n,))
+
+    simulation = _ChunkedSimulation(n, initial_cash, margin, units_size, equity, trades_path)
+
+    for c0 in range(0, n, chunk_bars):
+        c1 = min(c0 + chunk_bars, n)
+        w0 = max(0, c0 - warmup_bars)
+
+        window = {
+            column: values[w0:c1].astype(np.float64) * minimum_fraction
+            for column, values in columns.items()
+        }
+        signals = strategy.signals(window, run_params)
+
+        if c0 == 0:
+            start_bar = _start_bar(signals['indicators'])
+            if start_bar >= c1 and c1 < n:
+                raise Exception(f'El primer tramo ({c1} velas) no alcanza para calentar los indicadores')
+            if start_bar > warmup_bars and n > chunk_bars:
+                raise Exception(f'warmup_bars tiene que ser al menos {start_bar} para {strategy.__name__}')
+
+        simulation.run_chunk(
+            w0, c0, c1,
+            window['Open'], window['High'], window['Low'], window['Close'],
+            signals,
+            commissions[w0:c1],
+        )
+        simulation.flush_trades()
+
+    equity.flush()
+
+    index = prices.index
+    trades = (
+        pd.read_csv(trades_path, float_precision='round_trip')
+        if simulation.trade_count else pd.DataFrame(columns=TRADE_COLUMNS)
+    )
+    trades = trades.astype({'Size': np.int64, 'EntryBar': np.int64, 'ExitBar': np.int64})
+    trades['PnL'] = trades['Size'] * (trades['ExitPrice'] - trades['EntryPrice'])
+    trades['ReturnPct'] = np.sign(trades['Size']) * (trades['ExitPrice'] / trades['EntryPrice'] - 1)
+    trades['EntryTime'] = index[trades['EntryBar'].to_numpy()]
+    trades['ExitTime'] = index[trades['ExitBar'].to_numpy()]
+    trades['Duration'] = trades['ExitTime'] - trades['EntryTime']
+
+    stats = _streaming_stats(trades, equity, index, columns['Close'], chunk_bars)
+
+    return get_performance(stats, initial_cash, stability=windowed_stability_ratio(equity, chunk_bars))
@@ -0,0 +1,109 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Lock entre procesos: fcntl en POSIX, msvcrt en Windows
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# Metadata escalada por ticker para no ir al broker en cada backtest
+DEFAULT_METADATA_CACHE_PATH = os.environ.get('SYMBOL_METADATA_CACHE_PATH', './data_cache/_symbol_metadata.json')
+DEFAULT_METADATA_TTL = 7 * 24 * 3600  # segundos
+
+METADATA_FIELDS = [
+    'scaled_pip_value',
+    'scaled_minimum_lot',
+    'scaled_maximum_lot',
+    'scaled_contract_volume',
+    'minimum_fraction',
+    'trade_tick_value_loss',
+    'volume_step',
+]
+
+# Copia en memoria del archivo para que el camino caliente no toque disco
+_memory_cache = {}
+
+
+def _read_file(cache_path):
+    if not os.path.exists(cache_path):
+        return {}
+
+    with open(cache_path, 'r') as f:
+        return json.load(f)
+
+
+def get_cached_metadata(ticker, cache_path=DEFAULT_METADATA_CACHE_PATH, ttl=DEFAULT_METADATA_TTL):
+    ''' Devuelve la tupla de metadata escalada si esta en cache y no vencio, sino None '''
+    entries = _memory_cache.get(cache_path)
+    if entries is None or ticker not in entries:
+        entries = _read_file(cache_path)
+        _memory_cache[cache_path] = entries
+
+    entry = entries.get(ticker)
+    if entry is None or time.time() - entry['updated_at'] > ttl:
+        return None
+
+    return tuple(entry[field] for field in METADATA_FIELDS)
+
+
+@contextmanager
+def _file_lock(cache_path):
+    ''' Lock exclusivo sobre <cache_path>.lock: los procesos del pool que guardan metadata
+    leen, modifican y reemplazan el archivo de a uno, si no se pierden entradas '''
+    os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+
+    with open(f'{cache_path}.lock', 'a+') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _write_file(cache_path, entries):
+    tmp_path = f'{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp_path, cache_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def store_metadata(ticker, metadata: tuple, cache_path=DEFAULT_METADATA_CACHE_PATH):
+    with _file_lock(cache_path):
+        entries = _read_file(cache_path)
+        entries[ticker] = {
+            **dict(zip(METADATA_FIELDS, metadata)),
+            'updated_at': time.time(),
+        }
+        _write_file(cache_path, entries)
+
+    _memory_cache[cache_path] = entries
+
+
+def clear_metadata(ticker=None, cache_path=DEFAULT_METADATA_CACHE_PATH):
+    ''' Borra un ticker (o todos) para forzar que se vuelvan a pedir al broker '''
+    with _file_lock(cache_path):
+        entries = _read_file(cache_path) if ticker else {}
+        entries.pop(ticker, None)
+
+        if os.path.exists(cache_path) or entries:
+            _write_file(cache_path, entries)
+
+    _memory_cache[cache_path] = entries
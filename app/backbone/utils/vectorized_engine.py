@@ -0,0 +1,376 @@
+from collections.abc import Sequence
+from itertools import product
+from math import copysign
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from backtesting._stats import compute_stats
+from backbone.utils.general_purpose import calculate_units_size, diff_pips
+from app.backbone.utils.wfo_utils import get_performance, get_scaled_symbol_metadata, run_strategy, scale_prices
+
+# Motor rapido para las estrategias de cruce de indicadores (TripleSMA, Channel,
+# BbandsCross, BPercent, Macd). La estrategia declara sus señales con un
+# classmethod `signals(data, params)` y el motor reproduce la ejecucion de
+# backtesting.py sin recorrer vela por vela: salta de señal en señal y busca el
+# stop loss con numpy.
+#
+# signals devuelve un dict con:
+#   indicators: arrays de los indicadores que la estrategia crea con self.I (para la vela de arranque)
+#   long_entry, short_entry, long_exit, short_exit: arrays booleanos por vela
+#   sl_distance: distancia del stop loss al Close de la vela de la señal
+SL_SEARCH_WINDOW = 256
+
+
+def supports_vectorized(strategy) -> bool:
+    return callable(getattr(strategy, 'signals', None))
+
+
+def _strategy_params(strategy, params: dict):
+    ''' Parametros de la corrida con los defaults de la clase, como los ve self en la estrategia '''
+    names = {name for name in dir(strategy) if not name.startswith('_') and not callable(getattr(strategy, name))}
+    values = {name: getattr(strategy, name) for name in names}
+    values.update(params)
+    return SimpleNamespace(**values)
+
+
+def _start_bar(indicators) -> int:
+    ''' Primera vela en la que backtesting llama a next() '''
+    if not indicators:
+        return 1
+    return 1 + max(
+        int(np.isnan(np.atleast_2d(indicator)).argmin(axis=-1).max())
+        for indicator in indicators
+    )
+
+
+def _first_at_or_after(positions: np.ndarray, bar: int):
+    i = np.searchsorted(positions, bar)
+    return int(positions[i]) if i < len(positions) else None
+
+
+def _first_stop_hit(low, high, bar, sl, is_long):
+    ''' Primera vela desde bar en la que se toca el stop loss (None si no se toca) '''
+    n = len(low)
+    window = SL_SEARCH_WINDOW
+    while bar < n:
+        end = min(bar + window, n)
+        hits = low[bar:end] < sl if is_long else high[bar:end] > sl
+        if hits.any():
+            return bar + int(hits.argmax())
+        bar = end
+        window *= 2
+    return None
+
+
+def simulate(
+    prices: pd.DataFrame,
+    signals: dict,
+    units_size,
+    cash: float,
+    commission,
+    margin: float,
+):
+    ''' Simula la estrategia con la misma semantica que Backtest.run (sin hedging ni trade_on_close).
+
+    - La orden se ejecuta en el Open de la vela siguiente a la señal, con la comision aplicada al precio de entrada.
+    - El stop loss se revisa desde la vela de entrada y tiene prioridad sobre la señal de salida de la misma vela.
+    - Lo que queda abierto se cierra en el Open de la ultima vela.
+
+    Devuelve (trades, equity) en el mismo formato que usa compute_stats.
+    '''
+    open_ = prices['Open'].to_numpy(dtype=np.float64)
+    high = prices['High'].to_numpy(dtype=np.float64)
+    low = prices['Low'].to_numpy(dtype=np.float64)
+    close = prices['Close'].to_numpy(dtype=np.float64)
+    n = len(close)
+
+    long_entry = np.asarray(signals['long_entry'], dtype=bool)
+    short_entry = np.asarray(signals['short_entry'], dtype=bool)
+    entries = np.flatnonzero(long_entry | short_entry)
+    long_exits = np.flatnonzero(signals['long_exit'])
+    short_exits = np.flatnonzero(signals['short_exit'])
+    sl_distance = np.asarray(signals['sl_distance'], dtype=np.float64)
+    commissions = np.broadcast_to(np.asarray(commission, dtype=np.float64), (n,))
+    leverage = 1 / margin
+
+    equity = np.full(n, np.nan)
+    trades = []
+    bar = _start_bar(signals['indicators'])  # vela en la que la estrategia decide sin posicion
+
+    while bar < n:
+        signal_bar = _first_at_or_after(entries, bar)
+        if signal_bar is None:
+            equity[bar:] = cash
+            break
+
+        is_long = bool(long_entry[signal_bar])
+        price = close[signal_bar]
+        sl = price - sl_distance[signal_bar] if is_long else price + sl_distance[signal_bar]
+        size = units_size(cash, price, sl)
+        size = size if is_long else -size
+
+        # Una señal en la ultima vela se ejecuta en el cierre final de backtesting (Open de la misma vela)
+        last_call = signal_bar == n - 1
+        entry_bar = n - 1 if last_call else signal_bar + 1
+        equity[bar:entry_bar] = cash
+
+        entry_price = open_[entry_bar] * (1 + copysign(commissions[entry_bar], size))
+
+        # Sin margen suficiente backtesting cancela la orden
+        if abs(size) * entry_price > cash * leverage:
+            if last_call:
+                equity[n - 1] = cash
+                break
+            bar = entry_bar
+            continue
+
+        stop_bar = _first_stop_hit(low, high, entry_bar, sl, is_long)
+
+        if last_call:
+            # El trade queda abierto (no cuenta en los stats) salvo que toque el stop en esa vela
+            if stop_bar is None:
+                equity[n - 1] = cash + size * (close[n - 1] - entry_price)
+                break
+            exit_bar, market_exit, final_close = stop_bar, False, False
+        else:
+            exit_signal_bar = _first_at_or_after(long_exits if is_long else short_exits, entry_bar)
+
+            if stop_bar is not None and (exit_signal_bar is None or stop_bar <= exit_signal_bar):
+                exit_bar, market_exit, final_close = stop_bar, False, False
+            elif exit_signal_bar is not None and exit_signal_bar + 1 < n:
+                exit_bar, market_exit, final_close = exit_signal_bar + 1, True, False
+            else:
+                # Sigue abierto al terminar: backtesting lo cierra en el Open de la ultima vela
+                exit_bar, market_exit, final_close = n - 1, True, True
+
+        if market_exit:
+            exit_price = open_[exit_bar]
+        else:
+            exit_price = min(open_[exit_bar], sl) if is_long else max(open_[exit_bar], sl)
+
+        # Equity con el trade abierto; si llega a cero backtesting cierra todo al Close y corta
+        open_until = n if final_close else exit_bar
+        open_equity = cash + size * (close[entry_bar:open_until] - entry_price)
+        ruined = np.flatnonzero(open_equity <= 0)
+        if len(ruined):
+            ruin_bar = entry_bar + int(ruined[0])
+            equity[entry_bar:ruin_bar] = open_equity[:ruined[0]]
+            equity[ruin_bar:] = 0
+            trades.append((size, entry_bar, ruin_bar, entry_price, close[ruin_bar]))
+            cash = 0
+            break
+
+        equity[entry_bar:exit_bar] = open_equity[:exit_bar - entry_bar]
+        cash += size * (exit_price - entry_price)
+        equity[exit_bar] = cash
+        trades.append((size, entry_bar, exit_bar, entry_price, exit_price))
+
+        if final_close:
+            break
+
+        bar = exit_bar
+
+    equity = pd.Series(equity).bfill().fillna(cash).values
+
+    index = prices.index
+    trades = pd.DataFrame(trades, columns=['Size', 'EntryBar', 'ExitBar', 'EntryPrice', 'ExitPrice'])
+    trades = trades.astype({'Size': np.int64, 'EntryBar': np.int64, 'ExitBar': np.int64})
+    trades['PnL'] = trades['Size'] * (trades['ExitPrice'] - trades['EntryPrice'])
+    trades['ReturnPct'] = np.sign(trades['Size']) * (trades['ExitPrice'] / trades['EntryPrice'] - 1)
+    trades['EntryTime'] = index[trades['EntryBar'].to_numpy()]
+    trades['ExitTime'] = index[trades['ExitBar'].to_numpy()]
+    trades['Duration'] = trades['ExitTime'] - trades['EntryTime']
+
+    return trades, equity
+
+
+def run_strategy_vectorized(
+    strategy,
+    ticker,
+    prices: pd.DataFrame,
+    initial_cash: float,
+    commission: float,
+    margin: float,
+    risk=None,
+    opt_params=None,
+    spreads=None,
+    **params,
+):
+    ''' Igual que run_strategy pero con el motor vectorizado. Devuelve (df_stats, trade_performance, stats).
+
+    Si la estrategia no declara signals o cambia de parametros por fecha (opt_params)
+    se usa run_strategy.
+    '''
+    if not supports_vectorized(strategy) or opt_params:
+        return run_strategy(
+            strategy=strategy,
+            ticker=ticker,
+            prices=prices,
+            initial_cash=initial_cash,
+            commission=commission,
+            margin=margin,
+            risk=risk,
+            opt_params=opt_params,
+            spreads=spreads,
+        )
+
+    (
+        scaled_pip_value,
+        scaled_minimum_lot,
+        scaled_maximum_lot,
+        scaled_contract_volume,
+        minimum_fraction,
+        trade_tick_value_loss,
+        volume_step,
+    ) = get_scaled_symbol_metadata(ticker)
+
+    scaled_prices = scale_prices(prices, minimum_fraction)
+
+    stats = _run_vectorized(
+        strategy,
+        scaled_prices,
+        {
+            'pip_value': scaled_pip_value,
+            'minimum_lot': scaled_minimum_lot,
+            'maximum_lot': scaled_maximum_lot,
+            'contract_volume': scaled_contract_volume,
+            'trade_tick_value_loss': trade_tick_value_loss,
+            'volume_step': volume_step,
+            'risk': risk,
+            **params,
+        },
+        cash=initial_cash,
+        commission=spreads if spreads is not None else commission,
+        margin=margin,
+    )
+
+    return get_performance(stats, initial_cash)
+
+
+def _run_vectorized(strategy, scaled_prices: pd.DataFrame, params: dict, cash, commission, margin):
+    ''' Corre la estrategia sobre precios ya escalados y devuelve los stats de compute_stats '''
+    run_params = _strategy_params(strategy, params)
+
+    def units_size(equity, price, sl_price):
+        return calculate_units_size(
+            account_size=equity,
+            risk_percentage=run_params.risk,
+            stop_loss_pips=diff_pips(price, sl_price, pip_value=run_params.pip_value),
+            maximum_lot=run_params.maximum_lot,
+            minimum_lot=run_params.minimum_lot,
+            return_lots=False,
+            contract_volume=run_params.contract_volume,
+            trade_tick_value_loss=run_params.trade_tick_value_loss
+        )
+
+    signals = strategy.signals(
+        {
+            column: scaled_prices[column].to_numpy(dtype=np.float64)
+            for column in ["Open", "High", "Low", "Close"]
+        },
+        run_params,
+    )
+
+    trades, equity = simulate(
+        scaled_prices,
+        signals,
+        units_size,
+        cash=cash,
+        commission=commission,
+        margin=margin,
+    )
+
+    return compute_stats(
+        trades=trades,
+        equity=equity,
+        ohlc_data=scaled_prices,
+        strategy_instance=None,
+        risk_free_rate=0.0,
+    )
+
+
+def optimize_vectorized(strategy, scaled_prices: pd.DataFrame, cash, commission, margin, maximize, **params) -> dict:
+    ''' Backtest.optimize (method='grid') con el motor vectorizado. Devuelve los parametros
+    de la mejor combinacion, los mismos que elige backtesting.py:
+
+    - la grilla se recorre en el mismo orden (producto de los valores en el orden de params);
+    - las corridas sin trades no puntuan;
+    - gana el maximo de maximize y, si empatan, la primera; si ninguna tiene trades, la primera.
+    '''
+    if isinstance(maximize, str):
+        key = maximize
+        maximize = lambda stats: stats[key]
+
+    names = list(params.keys())
+    combos = [dict(zip(names, values)) for values in product(*(_as_tuple(v) for v in params.values()))]
+
+    best, best_value = combos[0], np.nan
+    for combo in combos:
+        stats = _run_vectorized(strategy, scaled_prices, combo, cash, commission, margin)
+        value = maximize(stats) if stats['# Trades'] else np.nan
+
+        if not np.isnan(value) and (np.isnan(best_value) or value > best_value):
+            best, best_value = combo, value
+
+    return best
+
+
+def _as_tuple(value):
+    # Igual que backtesting: lo que no es una secuencia es una grilla de un solo valor
+    return value if isinstance(value, Sequence) and not isinstance(value, str) else (value,)
+
+
+def check_parity(
+    strategy,
+    ticker,
+    prices: pd.DataFrame,
+    initial_cash: float,
+    commission: float,
+    margin: float,
+    risk=None,
+    spreads=None,
+    atol=1e-6,
+):
+    ''' Corre la estrategia con los dos motores y devuelve las diferencias (vacio si coinciden) '''
+    kwargs = dict(
+        strategy=strategy,
+        ticker=ticker,
+        prices=prices,
+        initial_cash=initial_cash,
+        commission=commission,
+        margin=margin,
+        risk=risk,
+        spreads=spreads,
+    )
+
+    df_stats, trade_performance, stats = run_strategy(**kwargs)
+    fast_df_stats, fast_trade_performance, fast_stats = run_strategy_vectorized(**kwargs)
+
+    differences = {}
+
+    for name, expected, actual in (
+        ('df_stats', df_stats, fast_df_stats),
+        ('trade_performance', trade_performance, fast_trade_performance),
+    ):
+        for column in expected.columns:
+            a = expected[column].to_numpy(dtype=np.float64)
+            b = actual[column].to_numpy(dtype=np.float64)
+            if not np.allclose(a, b, atol=atol, equal_nan=True):
+                differences[f'{name}.{column}'] = (a[0], b[0])
+
+    trades, fast_trades = stats._trades, fast_stats._trades
+    if len(trades) != len(fast_trades):
+        differences['trades'] = (len(trades), len(fast_trades))
+    else:
+        for column in ['Size', 'EntryBar', 'ExitBar', 'EntryPrice', 'ExitPrice', 'PnL']:
+            a = trades[column].to_numpy(dtype=np.float64)
+            b = fast_trades[column].to_numpy(dtype=np.float64)
+            if not np.allclose(a, b, atol=atol):
+                differences[f'trades.{column}'] = int(np.argmax(~np.isclose(a, b, atol=atol)))
+
+    equity = stats._equity_curve['Equity'].to_numpy()
+    fast_equity = fast_stats._equity_curve['Equity'].to_numpy()
+    if not np.allclose(equity, fast_equity, atol=atol):
+        differences['equity'] = int(np.argmax(~np.isclose(equity, fast_equity, atol=atol)))
+
+    return differences
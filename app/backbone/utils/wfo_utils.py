@@ -1,4 +1,6 @@
 import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
 from backbone.utils.general_purpose import transformar_a_uno
 from unittest.mock import patch
 from backtesting import Backtest
@@ -6,22 +8,28 @@ import pandas as pd
 import plotly.express as px
 from backtesting._stats import compute_stats
 import numpy as np
-from sklearn.linear_model import LinearRegression
-import MetaTrader5 as mt5
+from app.backbone.utils.metatrader import mt5
+from app.backbone.utils.metrics import stability_ratio, trade_metrics, trades_with_equity
+from app.backbone.utils.symbol_metadata import get_cached_metadata, store_metadata
+from app.backbone.utils.spread_store import use_spread_costs
+from app.backbone.utils.profiling import phase, profiled
+from app.backbone.utils.result_cache import RESULT_CACHE_ENABLED, result_cache
 
 np.seterr(divide="ignore")
 
+# Procesos para las ventanas de entrenamiento de walk_forward (1 = en serie)
+WFO_MAX_WORKERS = int(os.environ.get("WFO_MAX_WORKERS", 1))
+
+# Grilla de optimize de walk_forward con el motor vectorizado para las estrategias que lo
+# soportan (mismos parametros elegidos que Backtest.optimize, ver vectorized_engine)
+VECTORIZED_OPTIMIZE = os.environ.get("VECTORIZED_OPTIMIZE", "1") == "1"
 
-def optimization_function(stats):
-    equity_curve = stats._equity_curve["Equity"].values
-    x = np.arange(len(equity_curve)).reshape(-1, 1)
-    reg = LinearRegression().fit(x, equity_curve)
-    stability_ratio = reg.score(x, equity_curve)
 
+def optimization_function(stats):
     return (
         (stats["Return [%]"] / (1 + (-1 * stats["Max. Drawdown [%]"])))
         * np.log(1 + stats["# Trades"])
-        * stability_ratio
+        * stability_ratio(stats._equity_curve["Equity"].values)
     )
 
 
@@ -33,7 +41,14 @@ def plot_full_equity_curve(df_equity, title):
     fig.show()
 
 
-def get_scaled_symbol_metadata(ticker: str, metatrader=None):
+def get_scaled_symbol_metadata(ticker: str, metatrader=None, refresh=False):
+
+    # Los backtests usan la metadata cacheada; el bot en vivo (metatrader) y
+    # refresh=True siempre la piden al broker y actualizan el cache
+    if not metatrader and not refresh:
+        cached_metadata = get_cached_metadata(ticker)
+        if cached_metadata:
+            return cached_metadata
 
     if metatrader:
         info = metatrader.symbol_info(ticker)
@@ -58,7 +73,7 @@ def get_scaled_symbol_metadata(ticker: str, metatrader=None):
     scaled_minimum_lot = minimum_lot / minimum_fraction
     scaled_maximum_lot = maximum_lot / minimum_fraction
 
-    return (
+    metadata = (
         scaled_pip_value,
         scaled_minimum_lot,
         scaled_maximum_lot,
@@ -68,6 +83,23 @@ def get_scaled_symbol_metadata(ticker: str, metatrader=None):
         volume_step
     )
 
+    store_metadata(ticker, metadata)
+
+    return metadata
+
+
+def scale_prices(prices: pd.DataFrame, minimum_fraction: float) -> pd.DataFrame:
+    ''' OHLC multiplicado por minimum_fraction. Los precios del modo compacto del bar store
+    ya vienen escalados (attrs["prices_scaled"]) y se devuelven sin copiar '''
+    if prices.attrs.get("prices_scaled"):
+        return prices
+
+    scaled_prices = prices.copy()
+    scaled_prices.loc[:, ["Open", "High", "Low", "Close"]] = (
+        scaled_prices.loc[:, ["Open", "High", "Low", "Close"]].copy() * minimum_fraction
+    )
+    return scaled_prices
+
 
 def run_strategy(
     strategy,
@@ -80,27 +112,87 @@ def run_strategy(
     plot_path=None,
     file_name=None,
     opt_params=None,
+    spreads=None,
+    profile=None,
+    cache=None,
 ):
+    ''' Corre la estrategia con los precios escalados y devuelve df_stats, trade_performance y stats.
+
+    Con profile=True (o BACKTEST_PROFILING=1) se mide cada fase de la corrida, ver utils.profiling.
+    Con cache=True (o RESULT_CACHE_ENABLED=1) se reusa el resultado de una corrida identica,
+    ver utils.result_cache; las corridas que generan grafico no pasan por el cache.
+    '''
+    def compute():
+        with profiled('run_strategy', strategy=strategy, enabled=profile, ticker=ticker, bars=len(prices)):
+            return _run_strategy(
+                strategy,
+                ticker,
+                prices,
+                initial_cash,
+                commission,
+                margin,
+                risk=risk,
+                plot_path=plot_path,
+                file_name=file_name,
+                opt_params=opt_params,
+                spreads=spreads,
+            )
+
+    cache = RESULT_CACHE_ENABLED if cache is None else cache
+    if not cache or plot_path:
+        return compute()
+
+    return result_cache.cached(
+        'run_strategy',
+        compute,
+        strategy,
+        prices,
+        ticker=ticker,
+        metadata=get_scaled_symbol_metadata(ticker),
+        initial_cash=initial_cash,
+        commission=commission,
+        margin=margin,
+        risk=risk,
+        opt_params=opt_params,
+        spreads=spreads,
+    )
 
-    (
-        scaled_pip_value,
-        scaled_minimum_lot,
-        scaled_maximum_lot,
-        scaled_contract_volume,
-        minimum_fraction,
-        trade_tick_value_loss,
-        volume_step,
-    ) = get_scaled_symbol_metadata(ticker)
 
-    scaled_prices = prices.copy()
-    scaled_prices.loc[:, ["Open", "High", "Low", "Close"]] = (
-        scaled_prices.loc[:, ["Open", "High", "Low", "Close"]].copy() * minimum_fraction
-    )
+def _run_strategy(
+    strategy,
+    ticker,
+    prices: pd.DataFrame,
+    initial_cash: float,
+    commission: float,
+    margin: float,
+    risk=None,
+    plot_path=None,
+    file_name=None,
+    opt_params=None,
+    spreads=None,
+):
+
+    with phase('prepare_data'):
+        (
+            scaled_pip_value,
+            scaled_minimum_lot,
+            scaled_maximum_lot,
+            scaled_contract_volume,
+            minimum_fraction,
+            trade_tick_value_loss,
+            volume_step,
+        ) = get_scaled_symbol_metadata(ticker)
+
+        scaled_prices = scale_prices(prices, minimum_fraction)
 
     bt_train = Backtest(
         scaled_prices, strategy, commission=commission, cash=initial_cash, margin=margin
     )
 
+    # Spread relativo por vela en lugar de la comision fija
+    if spreads is not None:
+        use_spread_costs(bt_train, spreads)
+
     stats = bt_train.run(
         pip_value=scaled_pip_value,
         minimum_lot=scaled_minimum_lot,
@@ -116,56 +208,30 @@ def run_strategy(
         if not os.path.exists(plot_path):
             os.mkdir(plot_path)
             
-        bt_train.plot(
-            filename=os.path.join(plot_path, file_name), 
-            resample=False, 
-            open_browser=False
-        )
+        with phase('plot'):
+            bt_train.plot(
+                filename=os.path.join(plot_path, file_name), 
+                resample=False, 
+                open_browser=False
+            )
 
-    
-    equity_curve = stats._equity_curve
-    trades = stats._trades.round(3)
-    
-    trades = pd.merge(
-        trades,
-        equity_curve['Equity'],
-        left_on='ExitTime',
-        right_index=True,
-        how='inner'
-    )
-    
-    trades['ReturnPct'] = trades['PnL'] / trades['Equity'].shift(1)
-    if len(trades) > 0:
-        trades.loc[0, 'ReturnPct'] = trades.loc[0, 'PnL'] / initial_cash
+    with phase('post_processing'):
+        return get_performance(stats, initial_cash)
 
-    trades['Duration'] = pd.to_timedelta(trades['Duration'])
-    trades['Duration'] = (trades['Duration'].dt.total_seconds() // 3600 // 24).astype(int)
-      
-    stats._trades = trades
-    
-    winning_trades = trades[trades["PnL"]>=0]
-    losing_trades = trades[trades["PnL"]<0]
 
-    long_trades = trades[trades["Size"] >= 0]
-    short_trades = trades[trades["Size"] < 0]
-    
-    long_winning_trades = long_trades[long_trades["PnL"] >= 0]
-    long_losing_trades = long_trades[long_trades["PnL"] < 0]
-    
-    short_winning_trades = short_trades[short_trades["PnL"] >= 0]
-    short_losing_trades = short_trades[short_trades["PnL"] < 0]
-    
-    equity_curve = equity_curve["Equity"].values
-    
-    x = np.arange(len(equity_curve)).reshape(-1, 1)
-    reg = LinearRegression().fit(x, equity_curve)
-    stability_ratio = reg.score(x, equity_curve)
+def get_performance(stats, initial_cash, stability=None):
+    ''' Arma df_stats y trade_performance a partir de los stats de backtesting. stability
+    es el StabilityRatio si ya se calculo (si no se calcula sobre la equity) '''
+    equity = stats._equity_curve["Equity"].to_numpy()
+    trades = trades_with_equity(stats._trades, equity, initial_cash)
+
+    stats._trades = trades
 
     stats["Duration"] = pd.to_timedelta(stats["Duration"])
 
     df_stats = pd.DataFrame(
         {
-            "StabilityRatio": [stability_ratio],
+            "StabilityRatio": [stability_ratio(equity) if stability is None else stability],
             "Trades": [stats["# Trades"]],
             "Return": [stats["Return [%]"]],
             "Drawdown": [np.abs(stats["Max. Drawdown [%]"])],
@@ -178,27 +244,13 @@ def run_strategy(
     df_stats["CustomMetric"] = (df_stats["Return"] / (1 + df_stats["Drawdown"])) * np.log(1 + df_stats["Trades"])
     df_stats = df_stats.round(3)
     
-    trade_performance = pd.DataFrame(
-        {
-            "MeanWinningReturnPct":[winning_trades.ReturnPct.mean() * 100],
-            "StdWinningReturnPct":[winning_trades.ReturnPct.std() * 100],
-            "MeanLosingReturnPct":[losing_trades.ReturnPct.mean() * 100],
-            "StdLosingReturnPct":[losing_trades.ReturnPct.std() * 100],
-            "MeanTradeDuration":[trades['Duration'].mean()],
-            "StdTradeDuration":[trades['Duration'].std()],
-            "LongWinrate": [long_winning_trades.size / long_trades.size if long_trades.size > 0 else 0],
-            "WinLongMeanReturnPct": [long_winning_trades.ReturnPct.mean() * 100],
-            "WinLongStdReturnPct": [long_winning_trades.ReturnPct.std() * 100],
-            "LoseLongMeanReturnPct": [long_losing_trades.ReturnPct.mean() * 100],
-            "LoseLongStdReturnPct": [long_losing_trades.ReturnPct.std() * 100],
-            "ShortWinrate": [short_winning_trades.size / short_trades.size if short_trades.size > 0 else 0],
-            "WinShortMeanReturnPct": [short_winning_trades.ReturnPct.mean() * 100],
-            "WinShortStdReturnPct": [short_winning_trades.ReturnPct.std() * 100],
-            "LoseShortMeanReturnPct": [short_losing_trades.ReturnPct.mean() * 100],
-            "LoseShortStdReturnPct": [short_losing_trades.ReturnPct.std() * 100],
-        }
-    ).round(3)
-    
+    metrics = trade_metrics(
+        pnl=trades["PnL"].to_numpy(),
+        returns=trades["ReturnPct"].to_numpy(),
+        sizes=trades["Size"].to_numpy(),
+        durations=trades["Duration"].to_numpy(),
+    )
+    trade_performance = pd.DataFrame({name: [value] for name, value in metrics.items()}).round(3)
 
     return df_stats, trade_performance, stats
 
@@ -214,30 +266,144 @@ def walk_forward(
     commission=0.0002,
     margin=1 / 30,
     verbose=False,
+    profile=None,
+    max_workers=None,
+):
+    ''' Optimiza en cada ventana de lookback y valida en la siguiente. Con profile=True
+    (o BACKTEST_PROFILING=1) se miden las fases de todo el walk forward, ver utils.profiling.
+
+    Con max_workers > 1 (o WFO_MAX_WORKERS) las optimizaciones de todas las ventanas se
+    corren primero en paralelo y despues se encadenan las validaciones; el resultado es
+    el mismo que en serie.
+
+    Las estrategias con signals optimizan cada ventana con el motor vectorizado
+    (VECTORIZED_OPTIMIZE=0 vuelve a Backtest.optimize).
+    '''
+    with profiled(
+        'walk_forward',
+        strategy=strategy,
+        enabled=profile,
+        bars=len(data_full),
+        lookback_bars=lookback_bars,
+        validation_bars=validation_bars,
+    ):
+        return _walk_forward(
+            strategy,
+            data_full,
+            warmup_bars,
+            lookback_bars=lookback_bars,
+            validation_bars=validation_bars,
+            params=params,
+            cash=cash,
+            commission=commission,
+            margin=margin,
+            verbose=verbose,
+            max_workers=max_workers or WFO_MAX_WORKERS,
+        )
+
+
+def _optimize_window(strategy, train_data, params, cash, commission, margin):
+    ''' Optimiza una ventana de entrenamiento y devuelve los parametros elegidos. Las
+    estrategias con signals recorren la grilla con el motor vectorizado '''
+    # Import local: vectorized_engine importa este modulo
+    from app.backbone.utils.vectorized_engine import optimize_vectorized, supports_vectorized
+
+    if VECTORIZED_OPTIMIZE and supports_vectorized(strategy):
+        grid = {param: values for param, values in params.items() if param != "maximize"}
+        return optimize_vectorized(
+            strategy, train_data, cash, commission, margin, params["maximize"], **grid
+        )
+
+    bt_training = Backtest(
+        train_data, strategy, cash=cash, commission=commission, margin=margin
+    )
+
+    with patch("backtesting.backtesting._tqdm", lambda *args, **kwargs: args[0]):
+        stats_training = bt_training.optimize(**params)
+
+    return {
+        param: getattr(stats_training._strategy, param)
+        for param in params.keys()
+        if param != "maximize"
+    }
+
+
+def _optimize_window_in_worker(strategy, train_data, params, cash, commission, margin):
+    ''' _optimize_window dentro del pool de walk_forward. La grilla se recorre en serie: si no
+    optimize abriria otro pool por ventana y habria mas procesos que cores.
+
+    Depende de Backtest.optimize de backtesting 0.3.3 (la version de requirements.txt): solo
+    abre su ProcessPoolExecutor si mp.get_start_method() es "fork", y si no recorre la grilla
+    en serie avisando con un warning. Se le hace creer que es "spawn" y se calla solo ese aviso.
+    Al actualizar backtesting hay que revisarlo (tests/test_wfo_utils.py falla si optimize
+    vuelve a abrir un pool en el worker).
+    '''
+    with patch("backtesting.backtesting.mp.get_start_method", lambda allow_none=False: "spawn"), warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message=r"For multiprocessing support in `Backtest\.optimize\(\)`")
+        return _optimize_window(strategy, train_data, params, cash, commission, margin)
+
+
+def _walk_forward(
+    strategy,
+    data_full,
+    warmup_bars,
+    lookback_bars,
+    validation_bars,
+    params,
+    cash,
+    commission,
+    margin,
+    verbose,
+    max_workers=1,
 ):
 
     optimized_params_history = {}
     stats_master = []
     equity_final = None
 
-    # Iniciar el índice en el final del primer lookback
-
+    # Ventanas (final del lookback, velas de validacion), desde el final del primer lookback
+    windows = []
     i = lookback_bars + warmup_bars
 
     while i < len(data_full):
+        current_validation_bars = min(validation_bars, len(data_full) - i)
+        windows.append((i, current_validation_bars))
+
+        # Mover el índice `i` al final del período de validación actual
+        i += current_validation_bars
+
+    # Las optimizaciones no dependen entre si (solo la validacion usa la equity de la
+    # ventana anterior): con max_workers > 1 se corren todas juntas en un pool
+    windows_params = None
+    max_workers = max(1, min(max_workers, len(windows)))
+
+    if max_workers > 1:
+        with phase("train_windows"), ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(
+                    _optimize_window_in_worker,
+                    strategy,
+                    data_full.iloc[i - lookback_bars - warmup_bars : i],
+                    params,
+                    cash,
+                    commission,
+                    margin,
+                )
+                for i, _ in windows
+            ]
+            windows_params = [future.result() for future in futures]
+
+    for window, (i, current_validation_bars) in enumerate(windows):
 
         train_data = data_full.iloc[i - lookback_bars - warmup_bars : i]
 
         if verbose:
             print(f"train from {train_data.index[0]} to {train_data.index[-1]}")
-        bt_training = Backtest(
-            train_data, strategy, cash=cash, commission=commission, margin=margin
-        )
 
-        with patch("backtesting.backtesting._tqdm", lambda *args, **kwargs: args[0]):
-            stats_training = bt_training.optimize(**params)
-        remaining_bars = len(data_full) - i
-        current_validation_bars = min(validation_bars, remaining_bars)
+        if windows_params is None:
+            validation_params = _optimize_window(strategy, train_data, params, cash, commission, margin)
+        else:
+            validation_params = windows_params[window]
 
         validation_data = data_full.iloc[i - warmup_bars : i + current_validation_bars]
 
@@ -253,12 +419,6 @@ def walk_forward(
             margin=margin,
         )
 
-        validation_params = {
-            param: getattr(stats_training._strategy, param)
-            for param in params.keys()
-            if param != "maximize"
-        }
-
         optimized_params_history[validation_date] = validation_params
 
         if verbose:
@@ -272,10 +432,8 @@ def walk_forward(
             print("=" * 32)
         stats_master.append(stats_validation)
 
-        # Mover el índice `i` al final del período de validación actual
-
-        i += current_validation_bars
-    wfo_stats = get_wfo_stats(stats_master, warmup_bars, data_full)
+    with phase('wfo_stats'):
+        wfo_stats = get_wfo_stats(stats_master, warmup_bars, data_full)
 
     return wfo_stats, optimized_params_history
 
@@ -334,6 +492,9 @@ def run_wfo(
     validation_bars: int,
     plot=True,
     risk:None=float,
+    profile=None,
+    cache=None,
+    max_workers=None,
 ):
 
     (
@@ -346,10 +507,7 @@ def run_wfo(
         volume_step
     ) = get_scaled_symbol_metadata(ticker)
 
-    scaled_prices = prices.copy()
-    scaled_prices.loc[:, ["Open", "High", "Low", "Close"]] = (
-        scaled_prices.loc[:, ["Open", "High", "Low", "Close"]].copy() * minimum_fraction
-    )
+    scaled_prices = scale_prices(prices, minimum_fraction)
 
     params["minimum_lot"] = [scaled_minimum_lot]
     params["maximum_lot"] = [scaled_maximum_lot]
@@ -361,18 +519,40 @@ def run_wfo(
 
     params["maximize"] = optim_func
 
-    wfo_stats, optimized_params_history = walk_forward(
-        strategy,
-        scaled_prices,
-        lookback_bars=lookback_bars,
-        validation_bars=validation_bars,
-        warmup_bars=warmup_bars,
-        params=params,
-        commission=commission,
-        margin=margin,
-        cash=initial_cash,
-        verbose=False,
-    )
+    def compute():
+        return walk_forward(
+            strategy,
+            scaled_prices,
+            lookback_bars=lookback_bars,
+            validation_bars=validation_bars,
+            warmup_bars=warmup_bars,
+            params=params,
+            commission=commission,
+            margin=margin,
+            cash=initial_cash,
+            verbose=False,
+            profile=profile,
+            max_workers=max_workers,
+        )
+
+    # params ya tiene la metadata del simbolo, el riesgo y la funcion a maximizar
+    cache = RESULT_CACHE_ENABLED if cache is None else cache
+    if cache:
+        wfo_stats, optimized_params_history = result_cache.cached(
+            'walk_forward',
+            compute,
+            strategy,
+            scaled_prices,
+            params=params,
+            lookback_bars=lookback_bars,
+            validation_bars=validation_bars,
+            warmup_bars=warmup_bars,
+            commission=commission,
+            margin=margin,
+            initial_cash=initial_cash,
+        )
+    else:
+        wfo_stats, optimized_params_history = compute()
 
     df_equity = wfo_stats["_equity"]
     df_trades = wfo_stats["_trades"]
@@ -381,9 +561,7 @@ def run_wfo(
         plot_full_equity_curve(df_equity, title=f"{ticker}, {interval}")
     # Calculo el stability ratio
 
-    x = np.arange(df_equity.shape[0]).reshape(-1, 1)
-    reg = LinearRegression().fit(x, df_equity.Equity)
-    stability_ratio = reg.score(x, df_equity.Equity)
+    equity_stability_ratio = stability_ratio(df_equity.Equity)
 
     # Extraigo metricas
 
@@ -392,7 +570,7 @@ def run_wfo(
             "strategy": [strategy.__name__],
             "ticker": [ticker],
             "interval": [interval],
-            "stability_ratio": [stability_ratio],
+            "stability_ratio": [equity_stability_ratio],
             "return": [wfo_stats["Return [%]"]],
             "final_eq": [wfo_stats["Equity Final [$]"]],
             "drawdown": [wfo_stats["Max. Drawdown [%]"]],
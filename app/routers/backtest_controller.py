@@ -4,7 +4,7 @@ import os
 from typing import Optional
 from fastapi import APIRouter, Query
 from fastapi import Form, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from pandas import Timestamp
 from app.backbone.services.bot_service import BotService
@@ -193,6 +193,17 @@ def get_bot_backtes(request: Request, bot_id: UUID, date_from: date = Query(...)
     else:
         return {'error': result.message}
 
+@router.get('/backtest/bot/{bot_id}/plot')
+def get_bot_backtest_plot(bot_id: UUID, date_from: date = Query(...), date_to: date = Query(...)):
+    # El grafico de bt.py se genera la primera vez que se pide y queda en cache
+    result = backtest_service.get_backtest_plot(bot_id=bot_id, date_from=date_from, date_to=date_to)
+    
+    if result.ok:
+        return FileResponse(result.item, media_type='text/html')
+    
+    else:
+        return {'error': result.message}
+
 @router.get('/backtest/{bot_performance_id}/montecarlo', response_class=HTMLResponse)
 async def get_montecarlo_modal(request: Request, bot_performance_id: UUID):
     performance = {"Id": bot_performance_id}
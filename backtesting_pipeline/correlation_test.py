@@ -6,21 +6,14 @@ root_dir = os.path.abspath(os.path.join(current_dir, ".."))
 if root_dir not in sys.path:
     sys.path.insert(0, root_dir)
     
-import re
 import pandas as pd
 import yaml
 import plotly.express as px
 import numpy as np
 from sklearn.linear_model import LinearRegression
+from app.backbone.utils.data_catalog import DataCatalog
 
 
-def find_matching_files(directory, ticker, interval):
-    pattern = rf"^{ticker}_{interval}_.+_.+\.csv$"
-    all_files = os.listdir(directory)
-    matching_files = [file for file in all_files if re.match(pattern, file)]
-
-    return matching_files
-
 def replace_in_document(obj, element_to_replace, element):
     if isinstance(obj, dict):
         return {k: replace_in_document(v, element_to_replace, element) for k, v in obj.items()}
@@ -60,6 +53,9 @@ if __name__ == '__main__':
         filter_performance['ticker_interval'] = filter_performance['ticker'] + '_' + filter_performance['interval'].astype(str)
         filter_performance = filter_performance[filter_performance['ticker_interval'].isin(run_only_in)]
 
+    catalog = DataCatalog(os.path.join(data_path, "catalog"))
+    catalog.sync_csv_dir(os.path.join(data_path, "data"))
+
     result = pd.DataFrame()
 
     for _, row in filter_performance.iterrows():
@@ -68,12 +64,8 @@ if __name__ == '__main__':
         method = row.method
         strategy = row.strategy
         
-        path = os.path.join(data_path, "data")
-        matching_file = find_matching_files(path, ticker, interval).pop()
-
         # busco el df del activo
-        prices = pd.read_csv(os.path.join(path, matching_file))
-        prices["Date"] = pd.to_datetime(prices["Date"])
+        prices = catalog.read(ticker, interval, columns=["Close"]).reset_index()
         
         equity = pd.read_csv(
             os.path.join(root_path, method, f'{ticker}_{interval}', 'equity.csv'), index_col=0
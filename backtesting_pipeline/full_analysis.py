@@ -6,20 +6,13 @@ root_dir = os.path.abspath(os.path.join(current_dir, ".."))
 if root_dir not in sys.path:
     sys.path.insert(0, root_dir)
 
+from app.backbone.utils.data_catalog import DataCatalog
 from backbone.utils.general_purpose import load_function
 from backbone.utils.wfo_utils import optimization_function, run_strategy, run_wfo
 import os
 import pandas as pd
 import yaml
 import os
-import re
-
-def find_matching_files(directory, ticker, interval):
-    pattern = rf"^{ticker}_{interval}_.+_.+\.csv$"
-    all_files = os.listdir(directory)
-    matching_files = [file for file in all_files if re.match(pattern, file)]
-
-    return matching_files
 
 def replace_in_document(obj, element_to_replace, element):
     if isinstance(obj, dict):
@@ -85,6 +78,9 @@ if __name__ == "__main__":
     warmup_bars = configs["warmup_bars"]
     params = configs["opt_params"]
 
+    catalog = DataCatalog(os.path.join(data_path, "catalog"))
+    catalog.sync_csv_dir(os.path.join(data_path, "data"))
+
     all_wfo_performances = pd.DataFrame()
     all_opt_params = {}
 
@@ -96,12 +92,7 @@ if __name__ == "__main__":
             ticker = row.ticker
             interval = row.interval
 
-            path = os.path.join(data_path, "data")
-            matching_file = find_matching_files(path, ticker, interval).pop()
-
-            prices = pd.read_csv(os.path.join(path, matching_file))
-            prices["Date"] = pd.to_datetime(prices["Date"])
-            prices = prices.set_index("Date")
+            prices = catalog.read(ticker, interval)
 
             print(ticker, interval)
 
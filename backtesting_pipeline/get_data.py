@@ -7,11 +7,8 @@ root_dir = os.path.abspath(os.path.join(current_dir, '..'))
 if root_dir not in sys.path:
     sys.path.insert(0, root_dir)
 
-import pandas as pd
-import pandas_ta as pandas_ta
-import MetaTrader5 as mt5
-import pandas as pd
-from backtest.get_data import get_data
+from app.backbone.utils.metatrader import mt5, save_symbols_snapshot
+from app.backbone.utils.bulk_downloader import download_universe
 import pytz
 from datetime import datetime
 
@@ -30,13 +27,14 @@ if __name__ == '__main__':
     out_path = configs['out_path']
     date_from = configs['date_from']
     date_to = configs['date_to']
+    max_workers = configs.get('max_workers', 4)
+    chunk_days = configs.get('chunk_days', 365)
+    base_interval = configs.get('base_interval', mt5.TIMEFRAME_H1)
+    # Dias finales de cada timeframe derivado que se comparan contra las velas del broker
+    check_days = configs.get('check_days', 30)
 
-    data_path = os.path.join(out_path, 'data')
     commissions_path = os.path.join(out_path, 'commissions')
     
-    if not os.path.exists(data_path):
-        os.makedirs(data_path)
-
     if not os.path.exists(commissions_path):
         os.makedirs(commissions_path)
 
@@ -76,18 +74,22 @@ if __name__ == '__main__':
         mt5.TIMEFRAME_H1,
     ]
 
-    symbols = get_data(tickers, intervals, date_from_get_data, date_to_get_data, save_in=data_path)
-
-    commissions = {}
-
-    for ticker in tickers:
-        symbol_info = mt5.symbol_info_tick(ticker)
-        
-        avg_price = (symbol_info.bid + symbol_info.ask) / 2
-        spread = symbol_info.ask - symbol_info.bid
-        
-        commissions[ticker] = round(spread / avg_price, 5)
+    # Las comisiones salen del spread y se calculan en la misma pasada de descarga
+    commissions = download_universe(
+        tickers,
+        intervals,
+        date_from_get_data,
+        date_to_get_data,
+        out_path=out_path,
+        max_workers=max_workers,
+        chunk_days=chunk_days,
+        base_interval=base_interval,
+        check_days=check_days,
+    )
         
+    # Snapshot de metadata para poder correr los backtests con METATRADER_BACKEND=offline
+    save_symbols_snapshot(mt5, tickers)
+
     with open(f"{commissions_path}/commissions.yml", "w") as file:
         yaml.dump(commissions, file, default_flow_style=False)
 
@@ -10,9 +10,9 @@ import re
 import uuid
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import LinearRegression
 import yaml
 import plotly.graph_objects as go
+from backbone.utils.metrics import stability_ratio
 from backbone.utils.montecarlo_utils import max_drawdown
 
 pd.set_option('display.max_columns', 500) # number of columns to be displayed
@@ -103,15 +103,13 @@ if __name__ == '__main__':
         ret_dd = ret / dd
         custom_metric = (ret / (1 + dd)) * np.log(1 + filtered_trades.shape[0])  
         
-        x = np.arange(filtered_trades.shape[0]).reshape(-1, 1)
-        reg = LinearRegression().fit(x, filtered_trades['Equity'])
-        stability_ratio = reg.score(x, filtered_trades['Equity'])
+        equity_stability_ratio = stability_ratio(filtered_trades['Equity'])
         
         metrics = pd.DataFrame({
             'strategy': [f'take_off_{trades_to_remove}_trades'],
             'ticker': [ticker],
             'interval': [interval],
-            'stability_ratio': [stability_ratio],
+            'stability_ratio': [equity_stability_ratio],
             'return': [ret],
             'drawdown': [dd],
             'return_drawdown': [ret_dd],
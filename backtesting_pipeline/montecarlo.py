@@ -41,6 +41,8 @@ if __name__ == "__main__":
     out_path = configs["out_path"]
     root_path = configs["root_path"]
     run_only_in = configs['run_only_in']
+    seed = configs.get('seed')
+    max_workers = configs.get('max_workers', os.cpu_count() or 1)
 
     filter_performance = pd.read_csv(os.path.join(in_path, "filter_performance.csv"))
     filter_performance = filter_performance.sort_values(by='custom_metric', ascending=False).drop_duplicates(subset=['ticker'])
@@ -84,6 +86,8 @@ if __name__ == "__main__":
                 threshold_ruin=threshold_ruin,
                 return_raw_curves=False,
                 percentiles=[0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95],
+                rng=seed,
+                max_workers=max_workers,
             )
 
             mc = mc.round(3).reset_index().rename(
@@ -10,8 +10,10 @@ import pandas as pd
 from pandas import Timestamp
 import pytz
 import yaml
+from app.backbone.utils.backtest_result import BacktestResult
+from app.backbone.utils.data_catalog import DataCatalog
 from app.backbone.utils.general_purpose import load_function
-from app.backbone.utils.wfo_utils import run_strategy
+from app.backbone.utils.wfo_utils import get_scaled_symbol_metadata, run_strategy, scale_prices
 
 def replace_in_document(obj, element_to_replace, element):
     if isinstance(obj, dict):
@@ -65,7 +67,8 @@ if __name__ == "__main__":
         commissions = yaml.safe_load(file_name)
         
     data_path = os.path.join(in_path, "data")
-    all_files = os.listdir(data_path)
+    catalog = DataCatalog(os.path.join(in_path, "catalog"))
+    catalog.sync_csv_dir(data_path)
 
     timezone = pytz.timezone("Etc/UTC")
     limited_testing_start_date = Timestamp(date_from, tz="UTC")
@@ -74,28 +77,22 @@ if __name__ == "__main__":
     performance = pd.DataFrame()
     trade_performances = pd.DataFrame()
     stats_per_symbol = {}
-    symbols = {}
 
-    for file_name in all_files:
+    for entry in catalog.entries():
 
-        file_name_components = file_name.split("_")
-        ticker = file_name_components[0]
-        interval = file_name_components[1]
+        ticker = entry["ticker"]
+        interval = entry["interval"]
 
         if run_only_in and f'{ticker}_{interval}' not in run_only_in:
             continue
 
         try:
-            prices = pd.read_csv(os.path.join(data_path, file_name))
-            prices["Date"] = pd.to_datetime(prices["Date"])
-            prices = prices.set_index("Date")
-
-            prices = prices.loc[limited_testing_start_date:limited_testing_end_date]
-
-            if ticker not in symbols.keys():
-                symbols[ticker] = {}
-            
-            symbols[ticker][interval] = prices
+            prices = catalog.read(
+                ticker,
+                interval,
+                date_from=limited_testing_start_date,
+                date_to=limited_testing_end_date
+            )
 
             print(f'{ticker}_{interval}')
 
@@ -109,13 +106,11 @@ if __name__ == "__main__":
             df_stats, strategy_trade_performance, stats = run_strategy(
                 strategy=strategy,
                 ticker=ticker,
-                interval=interval,
                 commission=commission,
                 prices=prices,
                 initial_cash=initial_cash,
                 margin=margin,
                 risk=risk,
-                plot=False,  # enviar ruta de donde quiero que se guarde
             )
 
             performance = pd.concat([performance, df_stats])
@@ -181,38 +176,55 @@ if __name__ == "__main__":
         os.path.join(out_path, "trade_performance.csv"), index=False
     )
         
+    # Se grafica a partir de los stats de la primera pasada, sin volver a simular. La estrategia,
+    # los precios y los parametros se pasan aparte: si los stats vienen del cache de resultados
+    # no tienen la instancia de la estrategia para sacar los indicadores
     for index, row in filter_performance.iterrows():
         ticker = row.ticker
         interval = row.interval
-        
-        prices = symbols[ticker][interval]
-        
-        commission = commissions[ticker]
-        leverage = leverages[ticker]
-        margin = 1 / leverage
 
-        _, _, _ = run_strategy(
+        (
+            scaled_pip_value,
+            scaled_minimum_lot,
+            scaled_maximum_lot,
+            scaled_contract_volume,
+            minimum_fraction,
+            trade_tick_value_loss,
+            volume_step,
+        ) = get_scaled_symbol_metadata(ticker)
+
+        prices = catalog.read(
+            ticker,
+            interval,
+            date_from=limited_testing_start_date,
+            date_to=limited_testing_end_date
+        )
+
+        result = BacktestResult(
+            stats_per_symbol[ticker][interval],
             strategy=strategy,
-            ticker=ticker,
-            interval=interval,
-            commission=commission,
-            prices=prices,
-            initial_cash=initial_cash,
-            margin=margin,
-            risk=risk,
-            plot=True,
-            plot_path=plot_path,
+            prices=scale_prices(prices, minimum_fraction),
+            params={
+                'pip_value': scaled_pip_value,
+                'minimum_lot': scaled_minimum_lot,
+                'maximum_lot': scaled_maximum_lot,
+                'contract_volume': scaled_contract_volume,
+                'trade_tick_value_loss': trade_tick_value_loss,
+                'volume_step': volume_step,
+                'risk': risk,
+            },
         )
+        result.plot(filename=os.path.join(plot_path, f"{strategy_name}_{ticker}_{interval}.html"))
 
         path = os.path.join(out_path, f"{ticker}_{interval}")
 
         if not os.path.exists(path):
             os.makedirs(path)
             
-        stats_per_symbol[ticker][interval]._trades.to_csv(
+        result.trades.to_csv(
             os.path.join(path, "trades.csv"), index=False
         )
         
-        stats_per_symbol[ticker][interval]._equity_curve.to_csv(
+        result.equity_curve.to_csv(
             os.path.join(path, "equity.csv"),
-        )
\ No newline at end of file
+        )
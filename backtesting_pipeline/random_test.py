@@ -1,5 +1,4 @@
 import os
-import re
 import sys
 
 current_dir = os.path.abspath(os.path.dirname(__file__))
@@ -7,20 +6,17 @@ root_dir = os.path.abspath(os.path.join(current_dir, ".."))
 if root_dir not in sys.path:
     sys.path.insert(0, root_dir)
     
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import numpy as np
 import pandas as pd
 import yaml
+from app.backbone.utils.data_catalog import DataCatalog
 from backbone.utils.general_purpose import load_function
+from backbone.utils.montecarlo_utils import spawn_rngs
 from backbone.utils.wfo_utils import run_strategy
 
 
-def find_matching_files(directory, ticker, interval):
-    pattern = rf"^{ticker}_{interval}_.+_.+\.csv$"
-    all_files = os.listdir(directory)
-    matching_files = [file for file in all_files if re.match(pattern, file)]
-
-    return matching_files
-
 def replace_in_document(obj, element_to_replace, element):
     if isinstance(obj, dict):
         return {k: replace_in_document(v, element_to_replace, element) for k, v in obj.items()}
@@ -28,6 +24,57 @@ def replace_in_document(obj, element_to_replace, element):
         return obj.replace(element_to_replace, element)
     return obj
 
+def _days(value):
+    return pd.Timedelta(value).days if pd.notna(value) else np.nan
+
+def run_iteration(rng, keep_stats, params, strategy, ticker, interval, **kwargs):
+    ''' Una iteracion del random test con su propio generador. Devuelve las metricas con las
+    columnas del pipeline (strategy, ticker, interval, ...) y los stats solo si keep_stats:
+    traen las velas, la equity y los trades y no hace falta mandarlos de vuelta en cada iteracion '''
+    df_stats, trade_performance, stats = run_strategy(
+        strategy=strategy,
+        ticker=ticker,
+        opt_params={**params, 'rng': rng},
+        **kwargs,
+    )
+
+    df_stats = df_stats.rename(columns=performance_columns)
+    df_stats['drawdown_duration'] = _days(stats['Max. Drawdown Duration'])
+    df_stats['sharpe_ratio'] = stats['Sharpe Ratio']
+    df_stats['exposure'] = stats['Exposure Time [%]']
+    df_stats['final_equity'] = stats['Equity Final [$]']
+
+    for performance in (df_stats, trade_performance):
+        performance.insert(0, 'interval', interval)
+        performance.insert(0, 'ticker', ticker)
+        performance.insert(0, 'strategy', strategy.__name__)
+
+    return df_stats, trade_performance, stats if keep_stats else None
+
+def run_iterations(iteration, rngs, max_workers=1):
+    ''' Corre una iteracion por generador y devuelve el promedio de las metricas y de las
+    metricas de trades, y los stats de la primera iteracion.
+
+    Las iteraciones se reparten entre procesos; map mantiene el orden, asi que el promedio
+    es el mismo que corriendolas en serie con las mismas semillas.
+    '''
+    keep_stats = [True] + [False] * (len(rngs) - 1)
+    workers = max(1, min(max_workers, len(rngs)))
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(iteration, rngs, keep_stats, chunksize=-(-len(rngs) // workers)))
+    else:
+        results = [iteration(rng, keep) for rng, keep in zip(rngs, keep_stats)]
+
+    mean_performance = pd.concat([df_stats for df_stats, _, _ in results])
+    mean_trade_performance = pd.concat([trade_performance for _, trade_performance, _ in results])
+
+    mean_performance = mean_performance.groupby(by=['strategy','ticker','interval'])[cols_to_calculate_mean].mean().reset_index()
+    mean_trade_performance = mean_trade_performance.groupby(by=['strategy','ticker','interval']).mean().reset_index()
+
+    return mean_performance, mean_trade_performance, results[0][2]
+
 time_frames = {
     16385: 1,
     16386: 2,
@@ -50,6 +97,17 @@ cols_to_calculate_mean = [
     "Duration",
 ]
 
+# Columnas de get_performance -> columnas del pipeline
+performance_columns = {
+    "StabilityRatio": "stability_ratio",
+    "Trades": "trades",
+    "Return": "return",
+    "Drawdown": "drawdown",
+    "RreturnDd": "return/dd",
+    "WinRate": "win_rate",
+    "CustomMetric": "custom_metric",
+}
+
 ordered_cols = [
     "strategy",
     "ticker",
@@ -97,6 +155,10 @@ if __name__ == '__main__':
     strategy_path = configs["strategy_path"]
     run_only_in = configs['run_only_in']
     
+    # Semilla maestra: de ella sale un generador por activo y de ese uno por iteracion
+    seed = configs.get('seed')
+    max_workers = configs.get('max_workers', os.cpu_count() or 1)
+    
     plot_path = os.path.join(out_path, "plots")
     
     if not os.path.exists(out_path):
@@ -117,6 +179,9 @@ if __name__ == '__main__':
     
     strategy = load_function(strategy_path)
 
+    catalog = DataCatalog(os.path.join(data_path, "catalog"))
+    catalog.sync_csv_dir(os.path.join(data_path, "data"))
+
     performance = pd.DataFrame()
     trade_performance = pd.DataFrame()
     all_opt_params = {}
@@ -124,19 +189,16 @@ if __name__ == '__main__':
     symbols = {}
     stats_per_symbol = {}
 
-    for _, row in filter_performance.iterrows():
+    row_rngs = spawn_rngs(seed, len(filter_performance))
+
+    for row_rng, (_, row) in zip(row_rngs, filter_performance.iterrows()):
         try:
             ticker = row.ticker
             interval = row.interval
             method = row.method
             
-            path = os.path.join(data_path, "data")
-            matching_file = find_matching_files(path, ticker, interval).pop()
-
             # busco el df del activo
-            prices = pd.read_csv(os.path.join(path, matching_file))
-            prices["Date"] = pd.to_datetime(prices["Date"])
-            prices = prices.set_index("Date")
+            prices = catalog.read(ticker, interval)
             
             # busco los trades para obtener sus probs
             trade_history = pd.read_csv(
@@ -177,34 +239,24 @@ if __name__ == '__main__':
             if ticker not in stats_per_symbol.keys():
                 stats_per_symbol[ticker] = {}
             
-            mean_performance = pd.DataFrame()
-            mean_trade_performance = pd.DataFrame()
+            iteration = partial(
+                run_iteration,
+                params=params,
+                strategy=strategy,
+                ticker=ticker,
+                interval=interval,
+                commission=commission,
+                prices=prices,
+                initial_cash=initial_cash,
+                margin=margin,
+                risk=risk,
+            )
             
-            for i in range(0, n_iterations):
-                first = i == 0
-                
-                df_stats, strategy_trade_performance, stats = run_strategy(
-                    strategy=strategy,
-                    ticker=ticker,
-                    interval=interval,
-                    commission=commission,
-                    prices=prices,
-                    initial_cash=initial_cash,
-                    margin=margin,
-                    risk=risk,
-                    opt_params=params,
-                    plot=False,
-                    plot_path=plot_path,
-                )
-
-                mean_performance = pd.concat([mean_performance, df_stats])
-                mean_trade_performance = pd.concat([mean_trade_performance, strategy_trade_performance])
-                
-                if i == 0:
-                    stats_per_symbol[ticker][interval] = stats
-
-            mean_performance = mean_performance.groupby(by=['strategy','ticker','interval'])[cols_to_calculate_mean].mean().reset_index()
-            mean_trade_performance = mean_trade_performance.groupby(by=['strategy','ticker','interval']).mean().reset_index()
+            mean_performance, mean_trade_performance, stats_per_symbol[ticker][interval] = run_iterations(
+                iteration,
+                row_rng.spawn(n_iterations),
+                max_workers=max_workers,
+            )
             
             performance = pd.concat([performance, mean_performance])
             trade_performance = pd.concat([trade_performance, mean_trade_performance])
@@ -224,6 +276,10 @@ if __name__ == '__main__':
         ticker = row.ticker
         interval = row.interval
 
+        # El activo fallo arriba (ya se aviso): no hay trades ni equity para guardar
+        if interval not in stats_per_symbol.get(ticker, {}):
+            continue
+
         path = os.path.join(out_path, f"{ticker}_{interval}")
 
         if not os.path.exists(path):
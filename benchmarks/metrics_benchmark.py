@@ -0,0 +1,169 @@
+import os
+import sys
+import time
+
+current_dir = os.path.abspath(os.path.dirname(__file__))
+root_dir = os.path.abspath(os.path.join(current_dir, ".."))
+for path in (root_dir, os.path.join(root_dir, "app")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+os.environ.setdefault("METATRADER_BACKEND", "offline")
+
+import numpy as np
+import pandas as pd
+from backtesting._stats import compute_stats
+from sklearn.linear_model import LinearRegression
+from app.backbone.utils.wfo_utils import get_performance
+
+# Compara el post-proceso de run_strategy (get_performance, kernel de metrics.py)
+# contra la implementacion anterior con pandas + sklearn sobre backtests sinteticos.
+#
+#   python benchmarks/metrics_benchmark.py
+
+
+def legacy_get_performance(stats, initial_cash):
+    ''' Post-proceso de run_strategy antes del kernel de metrics (merge + mascaras + sklearn) '''
+    equity_curve = stats._equity_curve
+    trades = stats._trades.round(3)
+    
+    trades = pd.merge(
+        trades,
+        equity_curve['Equity'],
+        left_on='ExitTime',
+        right_index=True,
+        how='inner'
+    )
+    
+    trades['ReturnPct'] = trades['PnL'] / trades['Equity'].shift(1)
+    if len(trades) > 0:
+        trades.loc[0, 'ReturnPct'] = trades.loc[0, 'PnL'] / initial_cash
+
+    trades['Duration'] = pd.to_timedelta(trades['Duration'])
+    trades['Duration'] = (trades['Duration'].dt.total_seconds() // 3600 // 24).astype(int)
+      
+    stats._trades = trades
+    
+    winning_trades = trades[trades["PnL"]>=0]
+    losing_trades = trades[trades["PnL"]<0]
+
+    long_trades = trades[trades["Size"] >= 0]
+    short_trades = trades[trades["Size"] < 0]
+    
+    long_winning_trades = long_trades[long_trades["PnL"] >= 0]
+    long_losing_trades = long_trades[long_trades["PnL"] < 0]
+    
+    short_winning_trades = short_trades[short_trades["PnL"] >= 0]
+    short_losing_trades = short_trades[short_trades["PnL"] < 0]
+    
+    equity_curve = equity_curve["Equity"].values
+    
+    x = np.arange(len(equity_curve)).reshape(-1, 1)
+    reg = LinearRegression().fit(x, equity_curve)
+    stability_ratio = reg.score(x, equity_curve)
+
+    stats["Duration"] = pd.to_timedelta(stats["Duration"])
+
+    df_stats = pd.DataFrame(
+        {
+            "StabilityRatio": [stability_ratio],
+            "Trades": [stats["# Trades"]],
+            "Return": [stats["Return [%]"]],
+            "Drawdown": [np.abs(stats["Max. Drawdown [%]"])],
+            "RreturnDd": [stats["Return [%]"] / np.abs(stats["Max. Drawdown [%]"])],
+            "WinRate": [stats["Win Rate [%]"]],
+            "Duration": [stats["Duration"].days],
+        }
+    )
+    
+    df_stats["CustomMetric"] = (df_stats["Return"] / (1 + df_stats["Drawdown"])) * np.log(1 + df_stats["Trades"])
+    df_stats = df_stats.round(3)
+    
+    trade_performance = pd.DataFrame(
+        {
+            "MeanWinningReturnPct":[winning_trades.ReturnPct.mean() * 100],
+            "StdWinningReturnPct":[winning_trades.ReturnPct.std() * 100],
+            "MeanLosingReturnPct":[losing_trades.ReturnPct.mean() * 100],
+            "StdLosingReturnPct":[losing_trades.ReturnPct.std() * 100],
+            "MeanTradeDuration":[trades['Duration'].mean()],
+            "StdTradeDuration":[trades['Duration'].std()],
+            "LongWinrate": [long_winning_trades.size / long_trades.size if long_trades.size > 0 else 0],
+            "WinLongMeanReturnPct": [long_winning_trades.ReturnPct.mean() * 100],
+            "WinLongStdReturnPct": [long_winning_trades.ReturnPct.std() * 100],
+            "LoseLongMeanReturnPct": [long_losing_trades.ReturnPct.mean() * 100],
+            "LoseLongStdReturnPct": [long_losing_trades.ReturnPct.std() * 100],
+            "ShortWinrate": [short_winning_trades.size / short_trades.size if short_trades.size > 0 else 0],
+            "WinShortMeanReturnPct": [short_winning_trades.ReturnPct.mean() * 100],
+            "WinShortStdReturnPct": [short_winning_trades.ReturnPct.std() * 100],
+            "LoseShortMeanReturnPct": [short_losing_trades.ReturnPct.mean() * 100],
+            "LoseShortStdReturnPct": [short_losing_trades.ReturnPct.std() * 100],
+        }
+    ).round(3)
+    
+
+    return df_stats, trade_performance, stats
+
+
+def synthetic_stats(n_bars, n_trades, seed=0, initial_cash=10_000):
+    ''' Stats de backtesting con trades y equity aleatorios (un trade abierto a la vez) '''
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2020-01-01", periods=n_bars, freq="h", tz="UTC")
+    close = 1.1 * np.exp(np.cumsum(rng.normal(0, 1e-3, n_bars)))
+    prices = pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close}, index=index)
+
+    bars = np.sort(rng.choice(np.arange(1, n_bars - 1), size=2 * n_trades, replace=False)).reshape(-1, 2)
+    sizes = rng.integers(1_000, 100_000, n_trades) * rng.choice([-1, 1], n_trades)
+    entry_prices = close[bars[:, 0]]
+    exit_prices = close[bars[:, 1]]
+    pnl = sizes * (exit_prices - entry_prices)
+
+    equity = initial_cash + np.cumsum(np.bincount(bars[:, 1], weights=pnl, minlength=n_bars))
+    for (entry_bar, exit_bar), size, entry_price in zip(bars, sizes, entry_prices):
+        equity[entry_bar:exit_bar] += size * (close[entry_bar:exit_bar] - entry_price)
+
+    trades = pd.DataFrame({
+        "Size": sizes,
+        "EntryBar": bars[:, 0],
+        "ExitBar": bars[:, 1],
+        "EntryPrice": entry_prices,
+        "ExitPrice": exit_prices,
+        "PnL": pnl,
+        "ReturnPct": np.sign(sizes) * (exit_prices / entry_prices - 1),
+        "EntryTime": index[bars[:, 0]],
+        "ExitTime": index[bars[:, 1]],
+    })
+    trades["Duration"] = trades["ExitTime"] - trades["EntryTime"]
+
+    return compute_stats(trades=trades, equity=equity, ohlc_data=prices, strategy_instance=None)
+
+
+def timeit(func, stats, initial_cash, repeat):
+    best = np.inf
+    for _ in range(repeat):
+        copy = stats.copy()
+        start = time.perf_counter()
+        result = func(copy, initial_cash)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    initial_cash = 10_000
+
+    for n_bars, n_trades in [(2_000, 20), (10_000, 200), (100_000, 2_000)]:
+        stats = synthetic_stats(n_bars, n_trades, initial_cash=initial_cash)
+
+        legacy_time, (legacy_df_stats, legacy_trade_performance, legacy_stats) = timeit(legacy_get_performance, stats, initial_cash, repeat=20)
+        kernel_time, (df_stats, trade_performance, kernel_stats) = timeit(get_performance, stats, initial_cash, repeat=20)
+
+        same = (
+            np.allclose(legacy_df_stats.to_numpy(dtype=float), df_stats.to_numpy(dtype=float), equal_nan=True)
+            and np.allclose(legacy_trade_performance.to_numpy(dtype=float), trade_performance.to_numpy(dtype=float), equal_nan=True)
+            and legacy_stats._trades.equals(kernel_stats._trades)
+        )
+
+        print(
+            f"bars={n_bars:>7} trades={n_trades:>5} "
+            f"legacy={legacy_time * 1000:8.2f}ms kernel={kernel_time * 1000:8.2f}ms "
+            f"speedup={legacy_time / kernel_time:5.1f}x iguales={same}"
+        )
@@ -0,0 +1,492 @@
+import argparse
+import importlib
+import inspect
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+import uuid
+import warnings
+
+current_dir = os.path.abspath(os.path.dirname(__file__))
+root_dir = os.path.abspath(os.path.join(current_dir, ".."))
+for path in (current_dir, root_dir, os.path.join(root_dir, "app")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# Todo sale de datos sinteticos: nada de MetaTrader ni de la metadata real de los simbolos
+_tmp_dir = tempfile.mkdtemp(prefix="forex_ml_bot_bench_")
+os.environ.setdefault("METATRADER_BACKEND", "offline")
+os.environ["SYMBOL_METADATA_CACHE_PATH"] = os.path.join(_tmp_dir, "_symbol_metadata.json")
+os.environ["INDICATOR_CACHE_ENABLED"] = os.environ.get("BENCH_INDICATOR_CACHE", "0")
+
+import numpy as np
+import pandas as pd
+from synthetic_data import generate_ohlcv, generate_trades
+
+warnings.filterwarnings("ignore")
+
+# Suite de benchmarks de los caminos calientes sobre velas sinteticas con semilla fija.
+# Cada corrida guarda un json con los tiempos (mejor, mediana, media) por caso para
+# poder comparar entre commits.
+#
+#   python benchmarks/run_benchmarks.py --size small
+#   python benchmarks/run_benchmarks.py --only run_strategy --mode regime
+#   python benchmarks/run_benchmarks.py --compare benchmarks/results/a.json benchmarks/results/b.json
+
+RESULTS_PATH = os.path.join(current_dir, "results")
+
+SYNTHETIC_TICKER = "SYNTHETIC"
+
+# Metadata escalada de un par tipo EURUSD (ver get_scaled_symbol_metadata)
+SYNTHETIC_METADATA = (
+    1e-05,  # scaled_pip_value
+    0.01,  # scaled_minimum_lot
+    100.0,  # scaled_maximum_lot
+    100000.0,  # scaled_contract_volume
+    1.0,  # minimum_fraction
+    1.0,  # trade_tick_value_loss
+    0.01,  # volume_step
+)
+
+SIZES = {
+    "small": {"bars": 5_000, "wfo_bars": 6_000, "trades": 200, "simulations": 200, "mc_v2_simulations": 20, "bots": 4, "db_trades": 2_000, "repeat": 3},
+    "medium": {"bars": 20_000, "wfo_bars": 20_000, "trades": 1_000, "simulations": 1_000, "mc_v2_simulations": 50, "bots": 8, "db_trades": 10_000, "repeat": 3},
+    "large": {"bars": 100_000, "wfo_bars": 60_000, "trades": 5_000, "simulations": 5_000, "mc_v2_simulations": 100, "bots": 16, "db_trades": 50_000, "repeat": 5},
+}
+
+# Grilla de walk_forward por estrategia (la de los configs de backtesting_pipeline)
+WFO_GRIDS = {
+    "BbandsCross": {"bband_std": [1.5, 2.0, 2.5], "atr_multiplier": [1.5, 2.0, 2.5]},
+    "TripleSMA": {"atr_multiplier": [1.5, 2.0, 2.5, 3.0]},
+    "BPercent": {"b_open_threshold": [0.9, 0.95], "b_close_threshold": [0.4, 0.5, 0.6]},
+}
+
+INITIAL_CASH = 10_000
+COMMISSION = 7e-5
+MARGIN = 1 / 30
+RISK = 1
+
+
+def measure(func, repeat):
+    ''' Corre func repeat veces y devuelve los tiempos y el ultimo resultado '''
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+
+    return {
+        "best": min(times),
+        "median": float(np.median(times)),
+        "mean": float(np.mean(times)),
+        "repeat": repeat,
+    }, result
+
+
+def strategy_classes():
+    ''' Estrategias de backtesting definidas en app/backbone/strategies '''
+    from app.backbone.strategies.base_strategy import BaseStrategy
+
+    strategies_dir = os.path.join(root_dir, "app", "backbone", "strategies")
+    for file_name in sorted(os.listdir(strategies_dir)):
+        if not file_name.endswith(".py") or file_name in ("__init__.py", "base_strategy.py"):
+            continue
+
+        module_name = f"app.backbone.strategies.{file_name[:-3]}"
+        try:
+            module = importlib.import_module(module_name)
+        except Exception as e:
+            yield module_name, None, e
+            continue
+
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if issubclass(cls, BaseStrategy) and cls is not BaseStrategy and cls.__module__ == module.__name__:
+                yield module_name, cls, None
+
+
+def strategy_prices(strategy, prices, seed):
+    ''' Agrega las columnas extra que pide cada estrategia '''
+    if "VixClose" in inspect.getsource(strategy):
+        vix = generate_ohlcv(len(prices), seed=seed + 1, initial_price=20, volatility=0.01)
+        prices = prices.assign(VixClose=vix["Close"].to_numpy())
+
+    return prices
+
+
+def bench_run_strategy(size, seed, mode):
+    from app.backbone.utils.wfo_utils import run_strategy
+
+    prices = generate_ohlcv(size["bars"], seed=seed, mode=mode)
+    results = {}
+
+    for module_name, strategy, error in strategy_classes():
+        if strategy is None:
+            results[f"run_strategy/{module_name}"] = {"error": repr(error)}
+            continue
+
+        name = f"run_strategy/{strategy.__name__}"
+        strategy_data = strategy_prices(strategy, prices, seed)
+        np.random.seed(seed)
+
+        try:
+            timing, (df_stats, _, _) = measure(
+                lambda: run_strategy(
+                    strategy=strategy,
+                    ticker=SYNTHETIC_TICKER,
+                    prices=strategy_data,
+                    initial_cash=INITIAL_CASH,
+                    commission=COMMISSION,
+                    margin=MARGIN,
+                    risk=RISK,
+                ),
+                size["repeat"],
+            )
+            results[name] = {**timing, "bars": len(prices), "trades": int(df_stats["Trades"].iloc[0])}
+        except Exception as e:
+            results[name] = {"error": repr(e)}
+
+    return results
+
+
+def bench_walk_forward(size, seed, mode):
+    from app.backbone.utils.wfo_utils import optimization_function, walk_forward
+
+    prices = generate_ohlcv(size["wfo_bars"], seed=seed, mode=mode)
+    strategies = {cls.__name__: cls for _, cls, _ in strategy_classes() if cls is not None}
+
+    lookback_bars = len(prices) // 4
+    validation_bars = len(prices) // 8
+    warmup_bars = 200
+
+    results = {}
+    for strategy_name, grid in WFO_GRIDS.items():
+        name = f"walk_forward/{strategy_name}"
+        if strategy_name not in strategies:
+            results[name] = {"error": "estrategia no disponible"}
+            continue
+
+        params = {
+            **grid,
+            "pip_value": [SYNTHETIC_METADATA[0]],
+            "minimum_lot": [SYNTHETIC_METADATA[1]],
+            "maximum_lot": [SYNTHETIC_METADATA[2]],
+            "contract_volume": [SYNTHETIC_METADATA[3]],
+            "trade_tick_value_loss": [SYNTHETIC_METADATA[5]],
+            "volume_step": [SYNTHETIC_METADATA[6]],
+            "risk": [RISK],
+            "maximize": optimization_function,
+        }
+
+        try:
+            timing, (wfo_stats, _) = measure(
+                lambda: walk_forward(
+                    strategies[strategy_name],
+                    prices,
+                    warmup_bars=warmup_bars,
+                    lookback_bars=lookback_bars,
+                    validation_bars=validation_bars,
+                    params=params,
+                    cash=INITIAL_CASH,
+                    commission=COMMISSION,
+                    margin=MARGIN,
+                ),
+                size["repeat"],
+            )
+            combinations = int(np.prod([len(values) for values in grid.values()]))
+            results[name] = {**timing, "bars": len(prices), "combinations": combinations, "trades": int(wfo_stats["# Trades"])}
+        except Exception as e:
+            results[name] = {"error": repr(e)}
+
+    return results
+
+
+def bench_montecarlo(size, seed, mode):
+    from app.backbone.utils.montecarlo_utils import monte_carlo_simulation_v2, montecarlo_statistics_simulation
+
+    prices = generate_ohlcv(size["bars"], seed=seed, mode=mode)
+    trades, equity_curve = generate_trades(prices, size["trades"], seed=seed, initial_cash=INITIAL_CASH)
+    trades["ReturnPct"] = trades["PnL"] / INITIAL_CASH
+
+    results = {}
+
+    np.random.seed(seed)
+    try:
+        timing, _ = measure(
+            lambda: montecarlo_statistics_simulation(
+                trade_history=trades,
+                equity_curve=equity_curve,
+                n_simulations=size["simulations"],
+                initial_equity=INITIAL_CASH,
+                threshold_ruin=0.85,
+                return_raw_curves=False,
+            ),
+            size["repeat"],
+        )
+        results["montecarlo_statistics_simulation"] = {**timing, "trades": len(trades), "simulations": size["simulations"]}
+    except Exception as e:
+        results["montecarlo_statistics_simulation"] = {"error": repr(e)}
+
+    # monte_carlo_simulation_v2 recorre cada vela en python: se mide sobre una sola ventana chica
+    v2_bars = min(len(equity_curve), 2_000)
+    v2_trades = trades[trades["ExitBar"] < v2_bars]
+
+    np.random.seed(seed)
+    try:
+        timing, _ = measure(
+            lambda: monte_carlo_simulation_v2(
+                equity_curve=equity_curve.iloc[:v2_bars],
+                trade_history=v2_trades,
+                n_simulations=size["mc_v2_simulations"],
+                initial_equity=INITIAL_CASH,
+                threshold_ruin=0.85,
+                return_raw_curves=False,
+            ),
+            size["repeat"],
+        )
+        results["monte_carlo_simulation_v2"] = {**timing, "bars": v2_bars, "simulations": size["mc_v2_simulations"]}
+    except Exception as e:
+        results["monte_carlo_simulation_v2"] = {"error": repr(e)}
+
+    return results
+
+
+def _bot_curves(size, seed, mode):
+    ''' Equity y trades (con margen) de varios bots sinteticos para las funciones de portfolio '''
+    equity_curves = {}
+    all_trades = {}
+
+    for bot in range(size["bots"]):
+        prices = generate_ohlcv(size["bars"], seed=seed + bot, mode=mode)
+        trades, equity_curve = generate_trades(prices, size["trades"], seed=seed + bot, initial_cash=INITIAL_CASH)
+        trades["margin"] = np.abs(trades["Size"] * trades["EntryPrice"]) * MARGIN
+
+        equity_curves[f"bot_{bot}"] = equity_curve
+        all_trades[f"bot_{bot}"] = trades
+
+    return equity_curves, all_trades
+
+
+def bench_portfolio(size, seed, mode):
+    try:
+        from portfolio_pipeline import portfolio
+    except Exception as e:
+        return {name: {"error": repr(e)} for name in ("get_hipotetical_wallet_equity", "ftmo_simulator", "calculate_margin_metrics")}
+
+    equity_curves, all_trades = _bot_curves(size, seed, mode)
+
+    # get_hipotetical_wallet_equity usa el rango de fechas y el cash inicial globales del script
+    min_date = min(curve.index.min() for curve in equity_curves.values()).floor("D").date()
+    max_date = max(curve.index.max() for curve in equity_curves.values()).floor("D").date()
+    portfolio.date_range = pd.to_datetime(pd.date_range(start=min_date, end=max_date, freq="D"))
+    portfolio.INITIAL_CASH = INITIAL_CASH
+
+    results = {}
+    portfolio_equity = None
+
+    try:
+        timing, portfolio_equity = measure(
+            lambda: portfolio.get_hipotetical_wallet_equity(equity_curves=equity_curves, initial_equity=INITIAL_CASH),
+            size["repeat"],
+        )
+        results["get_hipotetical_wallet_equity"] = {**timing, "bots": len(equity_curves), "days": len(portfolio_equity)}
+    except Exception as e:
+        results["get_hipotetical_wallet_equity"] = {"error": repr(e)}
+
+    if portfolio_equity is None:
+        portfolio_equity = pd.DataFrame(
+            {"Equity": INITIAL_CASH + np.cumsum(np.random.default_rng(seed).normal(0, 50, len(portfolio.date_range)))},
+            index=portfolio.date_range,
+        )
+
+    try:
+        timing, _ = measure(lambda: portfolio.ftmo_simulator(portfolio_equity.copy(), INITIAL_CASH), size["repeat"])
+        results["ftmo_simulator"] = {**timing, "days": len(portfolio_equity)}
+    except Exception as e:
+        results["ftmo_simulator"] = {"error": repr(e)}
+
+    try:
+        timing, _ = measure(
+            lambda: portfolio.calculate_margin_metrics({name: df.copy() for name, df in all_trades.items()}, portfolio_equity),
+            size["repeat"],
+        )
+        results["calculate_margin_metrics"] = {**timing, "trades": sum(len(df) for df in all_trades.values())}
+    except Exception as e:
+        results["calculate_margin_metrics"] = {"error": repr(e)}
+
+    return results
+
+
+def bench_db(size, seed, mode):
+    ''' Alta masiva de trades con DbService sobre un SQLite en memoria '''
+    try:
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from backbone.entities import Base
+        from backbone.entities.trade import Trade
+        from backbone.database.db_service import DbService
+    except Exception as e:
+        return {"db_service.create_all": {"error": repr(e)}}
+
+    prices = generate_ohlcv(max(size["bars"], size["db_trades"] * 3), seed=seed, mode=mode)
+    trades, equity_curve = generate_trades(prices, size["db_trades"], seed=seed, initial_cash=INITIAL_CASH)
+    trades["Equity"] = equity_curve["Equity"].to_numpy()[trades["ExitBar"].to_numpy()]
+    trades["Duration"] = trades["Duration"].dt.days
+
+    db_service = DbService()
+
+    def persist():
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine, tables=[Trade.__table__])
+        session = sessionmaker(bind=engine)()
+
+        try:
+            performance_id = uuid.uuid4()
+            db_service.create_all(session, [
+                Trade(
+                    BotPerformanceId=performance_id,
+                    Size=int(row.Size),
+                    EntryBar=int(row.EntryBar),
+                    ExitBar=int(row.ExitBar),
+                    EntryPrice=float(row.EntryPrice),
+                    ExitPrice=float(row.ExitPrice),
+                    PnL=float(row.PnL),
+                    ReturnPct=float(row.ReturnPct),
+                    EntryTime=row.EntryTime.date(),
+                    ExitTime=row.ExitTime.date(),
+                    Duration=int(row.Duration),
+                    Equity=float(row.Equity),
+                )
+                for row in trades.itertuples()
+            ])
+            db_service.save(session)
+        finally:
+            session.close()
+            engine.dispose()
+
+    try:
+        timing, _ = measure(persist, size["repeat"])
+        return {"db_service.create_all": {**timing, "trades": len(trades)}}
+    except Exception as e:
+        return {"db_service.create_all": {"error": repr(e)}}
+
+
+BENCHMARKS = {
+    "run_strategy": bench_run_strategy,
+    "walk_forward": bench_walk_forward,
+    "montecarlo": bench_montecarlo,
+    "portfolio": bench_portfolio,
+    "db": bench_db,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=root_dir, text=True).strip()
+    except Exception:
+        return None
+
+
+def run(size_name, seed, mode, only=None, output=None, verbose=True):
+    from app.backbone.utils.symbol_metadata import store_metadata
+
+    store_metadata(SYNTHETIC_TICKER, SYNTHETIC_METADATA)
+
+    size = SIZES[size_name]
+    report = {
+        "commit": git_commit(),
+        "created_at": pd.Timestamp.now(tz="UTC").isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "size": size_name,
+        "seed": seed,
+        "mode": mode,
+        "results": {},
+    }
+
+    for group, bench in BENCHMARKS.items():
+        if only and group not in only:
+            continue
+
+        try:
+            results = bench(size, seed, mode)
+        except Exception:
+            results = {group: {"error": traceback.format_exc(limit=3)}}
+
+        report["results"].update(results)
+
+        if verbose:
+            for name, result in results.items():
+                if "error" in result:
+                    print(f"{name:<50} ERROR {result['error'][:80]}")
+                else:
+                    print(f"{name:<50} best={result['best'] * 1000:10.1f}ms median={result['median'] * 1000:10.1f}ms")
+
+    os.makedirs(RESULTS_PATH, exist_ok=True)
+    output = output or os.path.join(RESULTS_PATH, f"{pd.Timestamp.now(tz='UTC'):%Y%m%d_%H%M%S}_{report['commit'] or 'nogit'}_{size_name}.json")
+
+    tmp_path = f"{output}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, output)
+
+    if verbose:
+        print(f"Resultados en {output}")
+
+    return report
+
+
+def compare(base_path, new_path, threshold=0.1):
+    ''' Imprime la relacion de tiempos (mediana) entre dos corridas y devuelve los casos que empeoraron mas que threshold '''
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    if (base["size"], base["seed"], base["mode"]) != (new["size"], new["seed"], new["mode"]):
+        print("Atencion: las corridas no usan el mismo tamaño, semilla o modo")
+
+    regressions = []
+    print(f"{'caso':<50} {base['commit']:>12} {new['commit']:>12}   ratio")
+
+    for name in sorted(set(base["results"]) | set(new["results"])):
+        old_result = base["results"].get(name, {})
+        new_result = new["results"].get(name, {})
+
+        if "median" not in old_result or "median" not in new_result:
+            print(f"{name:<50} {'-':>12} {'-':>12}")
+            continue
+
+        ratio = new_result["median"] / old_result["median"]
+        flag = " <-- mas lento" if ratio > 1 + threshold else ""
+        print(f"{name:<50} {old_result['median'] * 1000:10.1f}ms {new_result['median'] * 1000:10.1f}ms {ratio:7.2f}x{flag}")
+
+        if flag:
+            regressions.append(name)
+
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks de backtesting sobre datos sinteticos")
+    parser.add_argument("--size", choices=SIZES.keys(), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mode", choices=["gbm", "regime"], default="gbm")
+    parser.add_argument("--only", nargs="*", choices=BENCHMARKS.keys())
+    parser.add_argument("--output")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"))
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(*args.compare, threshold=args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    run(args.size, args.seed, args.mode, only=args.only, output=args.output)
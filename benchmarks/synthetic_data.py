@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+# Generador de velas OHLCV sinteticas y reproducibles para los benchmarks.
+#
+#   gbm:    movimiento browniano geometrico con drift y volatilidad fijos
+#   regime: cadena de Markov entre regimenes (lateral, tendencia alcista, tendencia
+#           bajista, alta volatilidad), cada uno con su drift y volatilidad
+
+# (drift por vela, volatilidad por vela)
+REGIMES = np.array([
+    [0.0, 0.0008],
+    [0.00015, 0.0010],
+    [-0.00015, 0.0010],
+    [0.0, 0.0025],
+])
+
+# Probabilidad de pasar de un regimen (fila) a otro (columna) en cada vela
+REGIME_TRANSITIONS = np.array([
+    [0.995, 0.002, 0.002, 0.001],
+    [0.003, 0.995, 0.001, 0.001],
+    [0.003, 0.001, 0.995, 0.001],
+    [0.010, 0.005, 0.005, 0.980],
+])
+
+
+def _regime_path(rng, n_bars):
+    ''' Regimen de cada vela muestreando la cadena de Markov '''
+    cumulative = np.cumsum(REGIME_TRANSITIONS, axis=1)
+    draws = rng.random(n_bars)
+
+    regimes = np.empty(n_bars, dtype=np.int64)
+    regime = 0
+    for i in range(n_bars):
+        regimes[i] = regime
+        regime = min(int(np.searchsorted(cumulative[regime], draws[i], side='right')), len(REGIMES) - 1)
+
+    return regimes
+
+
+def generate_ohlcv(
+    n_bars: int,
+    seed: int = 0,
+    mode: str = 'gbm',
+    start: str = '2015-01-01',
+    freq: str = 'h',
+    initial_price: float = 1.1,
+    drift: float = 0.0,
+    volatility: float = 0.001,
+) -> pd.DataFrame:
+    ''' Velas con el mismo formato que get_data (indice UTC, Open/High/Low/Close/Volume) '''
+    if mode not in ('gbm', 'regime'):
+        raise Exception(f'mode tiene que ser gbm o regime, no {mode}')
+
+    rng = np.random.default_rng(seed)
+
+    if mode == 'gbm':
+        mu = np.full(n_bars, drift)
+        sigma = np.full(n_bars, volatility)
+    else:
+        regimes = _regime_path(rng, n_bars)
+        mu = REGIMES[regimes, 0]
+        sigma = REGIMES[regimes, 1]
+
+    log_returns = (mu - sigma ** 2 / 2) + sigma * rng.standard_normal(n_bars)
+    close = initial_price * np.exp(np.cumsum(log_returns))
+
+    # La apertura es el cierre anterior con un gap chico; maximos y minimos se alejan
+    # del cuerpo de la vela en proporcion a la volatilidad de esa vela
+    open_ = np.empty(n_bars)
+    open_[0] = initial_price
+    open_[1:] = close[:-1] * np.exp(sigma[1:] * 0.05 * rng.standard_normal(n_bars - 1))
+
+    body_high = np.maximum(open_, close)
+    body_low = np.minimum(open_, close)
+    high = body_high * np.exp(np.abs(sigma * 0.5 * rng.standard_normal(n_bars)))
+    low = body_low * np.exp(-np.abs(sigma * 0.5 * rng.standard_normal(n_bars)))
+
+    volume = np.round(rng.lognormal(mean=7, sigma=0.5, size=n_bars) * (sigma / sigma.mean()))
+
+    index = pd.date_range(start, periods=n_bars, freq=freq, tz='UTC')
+
+    return pd.DataFrame(
+        {
+            'Open': open_,
+            'High': high,
+            'Low': low,
+            'Close': close,
+            'Volume': volume,
+        },
+        index=index,
+    )
+
+
+def generate_trades(prices: pd.DataFrame, n_trades: int, seed: int = 0, initial_cash: float = 10_000) -> tuple:
+    ''' Trades sin solapar sobre los precios y la equity que resulta, con las columnas de stats._trades '''
+    rng = np.random.default_rng(seed)
+    close = prices['Close'].to_numpy()
+    n_bars = len(close)
+
+    bars = np.sort(rng.choice(np.arange(1, n_bars - 1), size=2 * n_trades, replace=False)).reshape(-1, 2)
+    sizes = rng.integers(1_000, 100_000, n_trades) * rng.choice([-1, 1], n_trades)
+    entry_prices = close[bars[:, 0]]
+    exit_prices = close[bars[:, 1]]
+    pnl = sizes * (exit_prices - entry_prices)
+
+    equity = initial_cash + np.cumsum(np.bincount(bars[:, 1], weights=pnl, minlength=n_bars))
+    for (entry_bar, exit_bar), size, entry_price in zip(bars, sizes, entry_prices):
+        equity[entry_bar:exit_bar] += size * (close[entry_bar:exit_bar] - entry_price)
+
+    trades = pd.DataFrame({
+        'Size': sizes,
+        'EntryBar': bars[:, 0],
+        'ExitBar': bars[:, 1],
+        'EntryPrice': entry_prices,
+        'ExitPrice': exit_prices,
+        'PnL': pnl,
+        'ReturnPct': np.sign(sizes) * (exit_prices / entry_prices - 1),
+        'EntryTime': prices.index[bars[:, 0]],
+        'ExitTime': prices.index[bars[:, 1]],
+    })
+    trades['Duration'] = trades['ExitTime'] - trades['EntryTime']
+
+    equity_curve = pd.DataFrame({'Equity': equity}, index=prices.index)
+
+    return trades, equity_curve
@@ -1,6 +1,6 @@
 
 import yaml
-import MetaTrader5 as mt5
+from app.backbone.utils.metatrader import mt5
 import pandas as pd
 import os
 import numpy as np
@@ -14,6 +14,10 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
+from app.backbone.utils.data_catalog import DataCatalog
+from app.backbone.utils.general_purpose import load_function
+from app.backbone.utils.portfolio_engine import PortfolioBot, run_portfolio
+from app.backbone.utils.vectorized_engine import supports_vectorized
 
 pd.set_option('display.max_columns', 500) # number of columns to be displayed
 
@@ -213,6 +217,51 @@ def get_percentual_differences(equity_curves):
     
     return percentual_differences
 
+def get_portfolio_bots(root, strategies, risk, configs_path='./backtesting_pipeline/configs'):
+    ''' Un PortfolioBot por cada ticker/timeframe de preliminar_analysis, con la estrategia,
+    las fechas y la data que usa el config del pipeline de cada estrategia '''
+    bots = []
+
+    for strategy_name in strategies:
+        config_path = os.path.join(configs_path, f'{strategy_name}.yml')
+        if not os.path.exists(config_path):
+            print(f'{strategy_name}: no esta {config_path}, queda fuera de la cuenta compartida')
+            continue
+
+        with open(config_path, 'r') as file_name:
+            configs = yaml.safe_load(file_name)['preliminar_analysis']
+
+        strategy = load_function(configs['strategy_path'])
+        if not supports_vectorized(strategy):
+            print(f'{strategy_name}: no declara signals, queda fuera de la cuenta compartida')
+            continue
+
+        in_path = configs['in_path']
+        with open(os.path.join(in_path, 'commissions/commissions.yml'), 'r') as file_name:
+            commissions = yaml.safe_load(file_name)
+
+        catalog = DataCatalog(os.path.join(in_path, 'catalog'))
+        catalog.sync_csv_dir(os.path.join(in_path, 'data'))
+
+        tickers_timeframes = os.listdir(os.path.join(root, strategy_name, 'preliminar_analysis'))
+        tickers_timeframes = [file for file in tickers_timeframes if not re.match(r".*\.\w+$", file) and '_' in file]
+
+        for ticker_timeframe in tickers_timeframes:
+            ticker, interval = ticker_timeframe.split('_')[:2]
+
+            prices = catalog.read(
+                ticker,
+                int(interval),
+                date_from=pd.Timestamp(configs['date_from'], tz='UTC'),
+                date_to=pd.Timestamp(configs['date_to'], tz='UTC'),
+            )
+
+            bots.append(
+                PortfolioBot(f'{strategy_name}_{ticker_timeframe}', strategy, ticker, prices, risk=risk, commission=commissions[ticker])
+            )
+
+    return bots
+
 timeframes_to_number = {
     'H1': 16385,
     'H2': 16386,
@@ -308,6 +357,18 @@ if __name__ == '__main__':
     equity_portfolio = get_hipotetical_wallet_equity(equity_curves=equity_curves, initial_equity=INITIAL_CASH)
     equity_curves['variaciones_porcentuales'] = equity_portfolio
 
+    # Todos los bots con una sola cuenta: el tamaño de cada trade sale de la equity de la
+    # cuenta y las ordenes sin margen libre se cancelan (ver utils.portfolio_engine)
+    with open("./backtesting_pipeline/configs/backtest_params.yml", "r") as file_name:
+        risk = yaml.safe_load(file_name)["risk"]
+
+    portfolio_bots = get_portfolio_bots(root, strategies, risk)
+    portfolio_stats, portfolio_equity, portfolio_trades = run_portfolio(portfolio_bots, INITIAL_CASH, leverages=leverages)
+
+    print(portfolio_stats)
+    print('margin_calls: ', int(portfolio_equity['MarginCall'].sum()))
+    print('stop_outs: ', int(portfolio_equity['StopOut'].sum()))
+
     # Crear una figura vacía
     fig = go.Figure()
 
@@ -315,6 +376,8 @@ if __name__ == '__main__':
     for k, v in equity_curves.items():
         fig.add_trace(go.Scatter(x=v.index, y=v.Equity, mode='lines', name=k))
 
+    fig.add_trace(go.Scatter(x=portfolio_equity.index, y=portfolio_equity.Equity, mode='lines', name='cuenta_compartida'))
+
     # Actualizar los detalles del layout del gráfico
     fig.update_layout(
         title="Curvas de Equity de Múltiples Bots",
@@ -0,0 +1,16 @@
+import os
+import tempfile
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+# Los tests corren sin terminal de MetaTrader: velas del cache local y metadata de un snapshot
+os.environ.setdefault('METATRADER_BACKEND', 'offline')
+os.environ.setdefault('METATRADER_SYMBOLS_SNAPSHOT', os.path.join(FIXTURES_PATH, 'symbols_snapshot.json'))
+os.environ.setdefault('SYMBOL_METADATA_CACHE_PATH', os.path.join(tempfile.mkdtemp(), '_symbol_metadata.json'))
+os.environ.setdefault('BAR_STORE_PATH', tempfile.mkdtemp())
+
+# Nada de lo que escriben los tests queda en los paths por defecto del repo (./data_cache)
+os.environ.setdefault('METATRADER_CACHE_PATH', tempfile.mkdtemp())
+os.environ.setdefault('SPREAD_STORE_PATH', tempfile.mkdtemp())
+os.environ.setdefault('INDICATOR_CACHE_ENABLED', '0')
+os.environ.setdefault('RESULT_CACHE_ENABLED', '0')
@@ -0,0 +1,73 @@
+import os
+import sys
+
+current_dir = os.path.abspath(os.path.dirname(__file__))
+root_dir = os.path.abspath(os.path.join(current_dir, '..', '..', '..'))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import pandas as pd
+from benchmarks.synthetic_data import generate_ohlcv
+
+# Genera las velas de los tests de resample. Son SINTETICAS, no salen de un broker:
+#
+# - H1: precios de generate_ohlcv en el horario de un server tipo MT5 (domingo desde las
+#   22, lunes a viernes hasta las 22, sin velas el 25/12 ni el 1/1).
+# - H4/D1/W1/MN1: armadas con pandas.resample siguiendo las reglas de alineacion de MT5
+#   (semanas que abren el domingo, meses que abren el dia 1). Es una implementacion
+#   independiente de resample_bars, sin la primera ni la ultima vela (pueden quedar
+#   incompletas).
+#
+# Los tests comprueban que resample_bars coincide con esta referencia, no con el broker.
+# Contra las velas reales se compara al bajar la data (check_resample en bulk_downloader).
+TICKER = 'EURUSD'
+DATE_FROM = '2023-11-26 22:00'
+DATE_TO = '2024-03-08 22:00'
+SEED = 7
+
+AGGREGATIONS = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+
+def h1_bars():
+    index = pd.date_range(DATE_FROM, DATE_TO, freq='h', tz='UTC')
+    dayofweek, hour = index.dayofweek, index.hour
+
+    session = (dayofweek < 4) | ((dayofweek == 4) & (hour <= 22)) | ((dayofweek == 6) & (hour >= 22))
+    holidays = ((index.month == 12) & (index.day == 25)) | ((index.month == 1) & (index.day == 1))
+    index = index[session & ~holidays]
+
+    prices = generate_ohlcv(len(index), seed=SEED, start='2023-11-26')
+    prices.index = index
+    prices.index.name = 'Date'
+    prices[['Open', 'High', 'Low', 'Close']] = prices[['Open', 'High', 'Low', 'Close']].round(5)
+    prices['Volume'] = prices['Volume'].astype(int)
+
+    return prices
+
+
+def reference_bars(prices):
+    reference = {
+        'H4': prices.resample('4h').agg(AGGREGATIONS),
+        'D1': prices.resample('D').agg(AGGREGATIONS),
+        'W1': prices.resample('7D', origin=pd.Timestamp('2023-11-26', tz='UTC')).agg(AGGREGATIONS),
+        'MN1': prices.resample('MS').agg(AGGREGATIONS),
+    }
+
+    for name, bars in reference.items():
+        bars = bars.dropna(subset=['Open']).iloc[1:-1]
+        bars['Volume'] = bars['Volume'].astype(int)
+        reference[name] = bars
+
+    return reference
+
+
+def generate(out_path=current_dir):
+    prices = h1_bars()
+    prices.to_csv(os.path.join(out_path, f'{TICKER}_H1.csv'))
+
+    for name, bars in reference_bars(prices).items():
+        bars.to_csv(os.path.join(out_path, f'{TICKER}_{name}.csv'))
+
+
+if __name__ == '__main__':
+    generate()
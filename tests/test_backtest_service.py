@@ -0,0 +1,47 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+from app.backbone.services.backtest_service import BacktestService
+
+
+class FakeDbService:
+    ''' Cada transaccion falla al commitear si tiene algun bot roto '''
+
+    def __init__(self):
+        self.committed = []
+        self.transactions = 0
+
+    @contextmanager
+    def get_database(self):
+        self.transactions += 1
+        db = []
+        yield db
+        if any(bot.Name.startswith('broken') for bot in db):
+            raise Exception('commit failed')
+        self.committed.extend(db)
+
+
+def test_failed_batch_is_retried_bot_by_bot(monkeypatch):
+    service = BacktestService.__new__(BacktestService)
+    service.db_service = FakeDbService()
+    monkeypatch.setattr(BacktestService, '_write_result', lambda self, db, bot, *args: db.append(bot))
+
+    bots = [SimpleNamespace(Name=name) for name in ['bot_1', 'broken_2', 'bot_3']]
+    results = [(bot, True, None, None, None) for bot in bots]
+
+    errors = service._save_results(results, None, None, 1, 'test', 100_000, 'test')
+
+    assert errors == ['broken_2: commit failed']
+    assert [bot.Name for bot in service.db_service.committed] == ['bot_1', 'bot_3']
+    assert service.db_service.transactions == 1 + len(bots)
+
+
+def test_batch_is_written_in_one_transaction(monkeypatch):
+    service = BacktestService.__new__(BacktestService)
+    service.db_service = FakeDbService()
+    monkeypatch.setattr(BacktestService, '_write_result', lambda self, db, bot, *args: db.append(bot))
+
+    results = [(SimpleNamespace(Name=f'bot_{i}'), True, None, None, None) for i in range(8)]
+
+    assert service._save_results(results, None, None, 1, 'test', 100_000, 'test') == []
+    assert service.db_service.transactions == 1
+    assert len(service.db_service.committed) == 8
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.backbone.strategies.triple_sma import TripleSMA
+from app.backbone.services import backtest_service
+from app.backbone.utils.bar_store import attach_bars, has_bars, publish_bars, store_key, to_compact
+from app.backbone.utils.wfo_utils import get_scaled_symbol_metadata, run_strategy, scale_prices
+from benchmarks.synthetic_data import generate_ohlcv
+
+H1 = 16385
+PRICES = generate_ohlcv(2000, seed=4, start='2024-01-01')
+MINIMUM_FRACTION = get_scaled_symbol_metadata('EURUSD')[4]
+
+
+def test_store_key_depends_on_range_and_mode():
+    date_from, date_to = pd.Timestamp('2024-01-01', tz='UTC'), pd.Timestamp('2024-02-01', tz='UTC')
+
+    keys = {
+        store_key(date_from, date_to, False),
+        store_key(date_from, date_to, True),
+        store_key(date_from, pd.Timestamp('2024-03-01', tz='UTC'), False),
+    }
+
+    assert len(keys) == 3
+
+
+def test_runs_with_different_keys_do_not_overwrite_each_other(tmp_path):
+    short = PRICES.iloc[:500]
+    short_key = store_key(short.index[0], short.index[-1])
+    full_key = store_key(PRICES.index[0], PRICES.index[-1])
+
+    publish_bars(short, 'EURUSD', H1, store_path=tmp_path, key=short_key)
+    publish_bars(PRICES, 'EURUSD', H1, store_path=tmp_path, key=full_key)
+
+    attached = attach_bars('EURUSD', H1, store_path=tmp_path, key=short_key)
+
+    assert len(attached) == 500
+    np.testing.assert_array_equal(attached['Close'].to_numpy(), short['Close'].to_numpy())
+    assert len(attach_bars('EURUSD', H1, store_path=tmp_path, key=full_key)) == len(PRICES)
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_worker_attaches_what_the_parent_published(monkeypatch, compact):
+    downloads = []
+
+    def get_data(ticker, timeframe, date_from, date_to):
+        downloads.append(ticker)
+        return PRICES
+
+    monkeypatch.setattr(backtest_service, 'get_data', get_data)
+    monkeypatch.setattr(backtest_service, 'has_bar_spreads', lambda *args: False)
+
+    job = {
+        'bot_name': 'TripleSMA_EURUSD_H1_1',
+        'strategy_path': 'app.backbone.strategies.triple_sma.TripleSMA',
+        'ticker': 'EURUSD',
+        'timeframe': H1,
+        'date_from': PRICES.index[0],
+        'date_to': PRICES.index[-1],
+        'risk': 1,
+        'commission': 7e-5,
+        'initial_cash': 100_000,
+        'margin': 1 / 30,
+        'compact': compact,
+    }
+
+    job['store_key'] = backtest_service._publish_job_bars(job)
+    assert has_bars('EURUSD', H1, key=job['store_key'])
+    assert (attach_bars('EURUSD', H1, key=job['store_key']).dtypes == (np.float32 if compact else np.float64)).all()
+
+    # El worker no vuelve a bajar la data
+    monkeypatch.setattr(backtest_service, 'get_data', lambda *args: pytest.fail('el worker bajo la data'))
+    performance, trade_performance, trades = backtest_service._run_backtest_job(job)
+
+    assert downloads == ['EURUSD']
+    assert len(performance) == 1
+    assert len(trades) > 0
+
+
+def test_compact_attach_matches_to_compact(tmp_path):
+    key = store_key(compact=True)
+    publish_bars(PRICES, 'EURUSD', H1, store_path=tmp_path, compact=True, minimum_fraction=MINIMUM_FRACTION, key=key)
+
+    attached = attach_bars('EURUSD', H1, store_path=tmp_path, key=key)
+    compact = to_compact(PRICES, MINIMUM_FRACTION)
+
+    assert (attached.dtypes == np.float32).all()
+    assert not attached['Close'].to_numpy().flags.writeable
+    assert attached.attrs == compact.attrs == {'prices_scaled': True, 'minimum_fraction': MINIMUM_FRACTION}
+    pd.testing.assert_frame_equal(attached, compact, check_names=False, check_freq=False)
+
+    # Precios ya escalados, con la precision de float32
+    np.testing.assert_allclose(attached['Close'].to_numpy(), PRICES['Close'].to_numpy() * MINIMUM_FRACTION, rtol=1e-7)
+
+
+def test_compact_bars_are_not_scaled_again(tmp_path):
+    key = store_key(compact=True)
+    publish_bars(PRICES, 'EURUSD', H1, store_path=tmp_path, compact=True, minimum_fraction=MINIMUM_FRACTION, key=key)
+    attached = attach_bars('EURUSD', H1, store_path=tmp_path, key=key)
+
+    # Ni copia ni vuelve a multiplicar por minimum_fraction
+    assert scale_prices(attached, 100.0) is attached
+
+    run = dict(initial_cash=100_000, commission=7e-5, margin=1 / 30, risk=1)
+    df_stats, _, _ = run_strategy(TripleSMA, 'EURUSD', attached, **run)
+    df_stats_64, _, _ = run_strategy(TripleSMA, 'EURUSD', PRICES, **run)
+
+    assert df_stats['Trades'].iloc[0] == df_stats_64['Trades'].iloc[0]
+    assert abs(df_stats['Return'].iloc[0] - df_stats_64['Return'].iloc[0]) < 0.01
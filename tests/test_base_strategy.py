@@ -0,0 +1,43 @@
+from datetime import date
+import numpy as np
+import pandas as pd
+import pytest
+from app.backbone.strategies.base_strategy import _is_schedule, compile_opt_params
+
+INDEX = pd.date_range('2024-01-01', periods=24 * 10, freq='h', tz='UTC')
+
+
+def test_flat_params_are_not_a_schedule():
+    assert not _is_schedule({'atr_multiplier': 2, 'risk': 1})
+    assert not _is_schedule({})
+    assert not _is_schedule(None)
+
+
+@pytest.mark.parametrize('key', [pd.Timestamp('2024-01-03', tz='UTC'), date(2024, 1, 3), '2024-01-03', '2024-01-03T00:00:00+00:00'])
+def test_date_keys_are_a_schedule(key):
+    opt_params = {key: {'atr_multiplier': 2}}
+
+    assert _is_schedule(opt_params)
+
+    bars, values = compile_opt_params(opt_params, INDEX)
+    np.testing.assert_array_equal(bars, [48])
+    assert values == [{'atr_multiplier': 2}]
+
+
+def test_string_dates_are_sorted_as_dates():
+    opt_params = {'2024-01-05': {'atr_multiplier': 3}, '2024-01-03': {'atr_multiplier': 2}}
+
+    bars, values = compile_opt_params(opt_params, INDEX)
+
+    np.testing.assert_array_equal(bars, [48, 96])
+    assert values == [{'atr_multiplier': 2}, {'atr_multiplier': 3}]
+
+
+@pytest.mark.parametrize('opt_params', [
+    {'2024-01-03': {'atr_multiplier': 2}, 'risk': 1},
+    {1: {'atr_multiplier': 2}},
+    {'atr_multiplier': {'value': 2}},
+])
+def test_mixed_or_unknown_keys_raise(opt_params):
+    with pytest.raises(Exception):
+        _is_schedule(opt_params)
@@ -0,0 +1,38 @@
+import numpy as np
+from app.backbone.utils import bulk_downloader
+from app.backbone.utils.data_cache import store_bars
+from app.backbone.utils.spread_store import has_bar_spreads
+from benchmarks.synthetic_data import generate_ohlcv
+
+H1 = 16385
+H4 = 16388
+
+
+def test_download_universe_writes_only_under_the_given_paths(tmp_path, monkeypatch):
+    prices = generate_ohlcv(24 * 20, seed=5, start='2024-01-01')
+    prices['spread'] = np.arange(len(prices)) % 5 + 10
+    store_bars(tmp_path / 'cache', 'EURUSD', H1, prices)
+
+    # Las velas ya estan en el cache: no se llama al broker
+    monkeypatch.setattr(bulk_downloader, '_download_ticker', lambda *args: (7e-5, 1e-5))
+
+    work_dir = tmp_path / 'cwd'
+    work_dir.mkdir()
+    monkeypatch.chdir(work_dir)
+
+    commissions = bulk_downloader.download_universe(
+        ['EURUSD'],
+        [H1, H4],
+        prices.index[0],
+        prices.index[-1],
+        out_path=str(tmp_path / 'out'),
+        cache_path=str(tmp_path / 'cache'),
+        base_interval=H1,
+        check_days=0,
+        spread_store_path=str(tmp_path / 'spreads'),
+    )
+
+    assert commissions == {'EURUSD': 7e-5}
+    assert has_bar_spreads('EURUSD', H1, store_path=str(tmp_path / 'spreads'))
+    assert has_bar_spreads('EURUSD', H4, store_path=str(tmp_path / 'spreads'))
+    assert list(work_dir.iterdir()) == []
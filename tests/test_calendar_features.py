@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.backbone.utils import calendar_features as calendar_module
+from app.backbone.utils.bar_store import attach_bars, publish_bars
+from app.backbone.utils.calendar_features import build_calendar, calendar_features
+from benchmarks.synthetic_data import generate_ohlcv
+
+
+def test_indexes_with_different_gaps_do_not_share_cache():
+    hours = pd.date_range('2024-01-01', periods=200, freq='h', tz='UTC')
+    # Mismo largo y mismos extremos, con el hueco en otro lugar
+    first = hours.delete(50)
+    second = hours.delete(150)
+
+    calendar_features(first)
+    calendar = calendar_features(second)
+    expected = build_calendar(second)
+
+    assert calendar.keys() == expected.keys()
+    for name in expected:
+        np.testing.assert_array_equal(calendar[name], expected[name])
+
+
+def test_attached_bars_reuse_the_published_calendar(tmp_path, monkeypatch):
+    prices = generate_ohlcv(500, seed=8, start='2024-01-01')
+    publish_bars(prices, 'EURUSD', 16385, store_path=tmp_path)
+    expected = build_calendar(prices.index)
+
+    # Un worker nuevo no tiene nada en memoria
+    calendar_module._calendar_cache.clear()
+    monkeypatch.setattr(calendar_module, 'build_calendar', lambda index: pytest.fail('se recalculo el calendario'))
+
+    attached = attach_bars('EURUSD', 16385, store_path=tmp_path)
+    calendar = calendar_features(attached.index)
+
+    for name in expected:
+        np.testing.assert_array_equal(calendar[name], expected[name])
@@ -0,0 +1,33 @@
+from app.backbone.strategies.triple_sma import TripleSMA
+from app.backbone.utils import compact_accuracy
+from app.backbone.utils.bar_store import to_compact
+from app.backbone.utils.compact_accuracy import compact_accuracy_report
+from benchmarks.synthetic_data import generate_ohlcv
+
+PRICES = generate_ohlcv(3000, seed=3)
+RUN = dict(initial_cash=100_000, commission=7e-5, margin=1 / 30, risk=1)
+
+
+def test_report_compares_float64_and_compact_runs():
+    report, summary = compact_accuracy_report(TripleSMA, 'EURUSD', PRICES, **RUN)
+
+    assert list(report.columns) == ['float64', 'float32', 'abs_diff', 'rel_diff']
+    assert {'Trades', 'Return', 'Drawdown'} <= set(report.index)
+    assert summary['same_trades']
+    assert summary['trades_float64'] == summary['trades_float32'] > 0
+    assert summary['max_equity_diff'] < 1
+
+
+def test_report_flags_different_trades(monkeypatch):
+    # Velas compactas de otro tramo: los trades no pueden coincidir
+    other = generate_ohlcv(len(PRICES), seed=30)
+    monkeypatch.setattr(
+        compact_accuracy,
+        'to_compact',
+        lambda prices, minimum_fraction: to_compact(other.set_axis(prices.index), minimum_fraction),
+    )
+
+    report, summary = compact_accuracy_report(TripleSMA, 'EURUSD', PRICES, **RUN)
+
+    assert not summary['same_trades']
+    assert report['abs_diff'].max() > 0
@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+from app.backbone.utils import get_data as get_data_module
+from app.backbone.utils.data_cache import add_coverage, get_coverage, missing_ranges
+from benchmarks.synthetic_data import generate_ohlcv
+
+BROKER_BARS = generate_ohlcv(6 * 365 * 24, seed=1, start='2018-01-01')
+TIMEFRAME = 16385
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    ''' Broker falso sobre BROKER_BARS que registra los rangos pedidos '''
+    requests = []
+
+    def fetch(ticker, timeframe, date_from, date_to):
+        requests.append((pd.Timestamp(date_from), pd.Timestamp(date_to)))
+        return BROKER_BARS.loc[date_from:date_to]
+
+    monkeypatch.setattr(get_data_module, '_get_data_from_metatrader', fetch)
+    monkeypatch.setattr(get_data_module, 'METATRADER_BACKEND', 'mt5')
+    return requests
+
+
+def utc(date):
+    return pd.Timestamp(date, tz='UTC')
+
+
+def test_missing_ranges_includes_gaps_between_intervals():
+    coverage = [(utc('2019-01-01'), utc('2020-01-01')), (utc('2022-01-01'), utc('2023-01-01'))]
+
+    assert missing_ranges(coverage, utc('2018-06-01'), utc('2023-06-01')) == [
+        (utc('2018-06-01'), utc('2019-01-01')),
+        (utc('2020-01-01'), utc('2022-01-01')),
+        (utc('2023-01-01'), utc('2023-06-01')),
+    ]
+    assert missing_ranges(coverage, utc('2019-02-01'), utc('2019-03-01')) == []
+
+
+def test_add_coverage_keeps_disjoint_intervals(tmp_path):
+    add_coverage(tmp_path, 'EURUSD', TIMEFRAME, '2022-01-01', '2023-01-01')
+    add_coverage(tmp_path, 'EURUSD', TIMEFRAME, '2019-01-01', '2020-01-01')
+
+    assert get_coverage(tmp_path, 'EURUSD', TIMEFRAME) == [
+        (utc('2019-01-01'), utc('2020-01-01')),
+        (utc('2022-01-01'), utc('2023-01-01')),
+    ]
+
+    add_coverage(tmp_path, 'EURUSD', TIMEFRAME, '2020-01-01', '2022-01-01')
+    assert get_coverage(tmp_path, 'EURUSD', TIMEFRAME) == [(utc('2019-01-01'), utc('2023-01-01'))]
+
+
+def test_disjoint_request_downloads_the_gap_later(tmp_path, broker):
+    get_data_module.get_data('EURUSD', TIMEFRAME, '2022-01-01', '2023-01-01', cache_path=tmp_path)
+    get_data_module.get_data('EURUSD', TIMEFRAME, '2019-01-01', '2020-01-01', cache_path=tmp_path)
+
+    # El hueco 2020-2022 no quedo marcado como cubierto
+    broker.clear()
+    prices = get_data_module.get_data('EURUSD', TIMEFRAME, '2019-01-01', '2023-01-01', cache_path=tmp_path)
+
+    assert broker == [(utc('2020-01-01'), utc('2022-01-01'))]
+    pd.testing.assert_frame_equal(prices, BROKER_BARS.loc[utc('2019-01-01'):utc('2023-01-01')], check_freq=False, check_names=False)
+
+    # Con todo cubierto no se vuelve a pedir nada
+    broker.clear()
+    get_data_module.get_data('EURUSD', TIMEFRAME, '2019-06-01', '2022-06-01', cache_path=tmp_path)
+    assert broker == []
+
+
+def test_offline_does_not_widen_coverage(tmp_path, broker, monkeypatch):
+    get_data_module.get_data('EURUSD', TIMEFRAME, '2022-01-01', '2023-01-01', cache_path=tmp_path)
+    broker.clear()
+
+    monkeypatch.setattr(get_data_module, 'METATRADER_BACKEND', 'offline')
+    prices = get_data_module.get_data('EURUSD', TIMEFRAME, '2021-01-01', '2024-01-01', cache_path=tmp_path)
+
+    assert broker == []
+    assert get_coverage(tmp_path, 'EURUSD', TIMEFRAME) == [(utc('2022-01-01'), utc('2023-01-01'))]
+    assert prices.index[0] == utc('2022-01-01')
+    assert prices.index[-1] == utc('2023-01-01')
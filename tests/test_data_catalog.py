@@ -0,0 +1,41 @@
+import pandas as pd
+from app.backbone.utils.data_catalog import DataCatalog
+from benchmarks.synthetic_data import generate_ohlcv
+
+
+def _write_csv(path, prices):
+    prices.rename_axis('Date').reset_index().to_csv(path, index=False)
+
+
+def test_sync_uses_the_newest_range(tmp_path):
+    csv_path = tmp_path / 'csv'
+    csv_path.mkdir()
+    old = generate_ohlcv(100, seed=1, start='2023-01-01')
+    new = generate_ohlcv(200, seed=2, start='2024-01-01')
+
+    _write_csv(csv_path / 'EURUSD_16385_2024-01-01_2024-02-01.csv', new)
+    _write_csv(csv_path / 'EURUSD_16385_2023-01-01_2023-02-01.csv', old)
+
+    catalog = DataCatalog(str(tmp_path / 'catalog'))
+    catalog.sync_csv_dir(str(csv_path))
+
+    entry = catalog.get_entry('EURUSD', 16385)
+    assert entry['rows'] == len(new)
+    assert entry['source']['path'].endswith('2024-01-01_2024-02-01.csv')
+    assert pd.Timestamp(entry['start']) == pd.Timestamp('2024-01-01', tz='UTC')
+
+
+def test_sync_does_not_reconvert_unchanged_files(tmp_path, monkeypatch):
+    csv_path = tmp_path / 'csv'
+    csv_path.mkdir()
+    _write_csv(csv_path / 'EURUSD_16385_2023-01-01_2023-02-01.csv', generate_ohlcv(100, seed=1))
+    _write_csv(csv_path / 'EURUSD_16385_2024-01-01_2024-02-01.csv', generate_ohlcv(100, seed=2))
+
+    catalog = DataCatalog(str(tmp_path / 'catalog'))
+    catalog.sync_csv_dir(str(csv_path))
+
+    added = []
+    monkeypatch.setattr(catalog, 'add', lambda *args, **kwargs: added.append(args))
+    catalog.sync_csv_dir(str(csv_path))
+
+    assert added == []
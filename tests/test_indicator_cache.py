@@ -0,0 +1,42 @@
+import numpy as np
+from app.backbone.utils import indicator_cache as indicator_cache_module
+from app.backbone.utils.indicator_cache import IndicatorCache, array_fingerprint
+
+
+def test_data_edited_in_place_is_not_served_from_cache():
+    cache = IndicatorCache(cache_path=None)
+    bars = np.arange(10, dtype=np.float64)
+    window = bars[:5]
+
+    first = cache.call(np.cumsum, window)
+
+    # Igual que el buffer de velas: mismo array, mismas posiciones, velas nuevas
+    bars[:5] = bars[5:] * 2
+    second = cache.call(np.cumsum, window)
+
+    np.testing.assert_array_equal(second, np.cumsum(bars[:5]))
+    assert not np.array_equal(first, second)
+    assert cache.misses == 2
+
+
+def test_writable_arrays_are_hashed_on_every_call():
+    bars = np.arange(10, dtype=np.float64)
+    before = array_fingerprint(bars[2:7])
+
+    bars[3] = -1.0
+
+    assert array_fingerprint(bars[2:7]) != before
+
+
+def test_read_only_owners_are_hashed_once(monkeypatch):
+    bars = np.arange(10, dtype=np.float64)
+    bars.flags.writeable = False
+
+    hashed = []
+    hash_array = indicator_cache_module._hash_array
+    monkeypatch.setattr(indicator_cache_module, '_hash_array', lambda array: hashed.append(1) or hash_array(array))
+
+    fingerprints = {array_fingerprint(bars[2:7]) for _ in range(3)}
+
+    assert len(fingerprints) == 1
+    assert len(hashed) == 1
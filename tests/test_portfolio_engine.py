@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+from backtesting import Strategy
+from app.backbone.strategies.channel_strategy import Channel
+from app.backbone.strategies.triple_sma import TripleSMA
+from app.backbone.utils.portfolio_engine import PortfolioBot, run_portfolio
+from app.backbone.utils.vectorized_engine import run_strategy_vectorized
+from app.backbone.utils.wfo_utils import get_scaled_symbol_metadata
+from benchmarks.synthetic_data import generate_ohlcv
+
+LEVERAGES = {'EURUSD': 30}
+INITIAL_CASH = 100_000
+
+
+class EnterOnce(Strategy):
+    ''' Compra en la vela entry_bar y sale en la exit_bar, sin depender de los precios '''
+    risk = 1
+    entry_bar = 10
+    exit_bar = 14
+    sl_fraction = 0.5
+
+    @classmethod
+    def signals(cls, data, params):
+        n = len(data['Close'])
+        bars = np.arange(n)
+
+        return {
+            'indicators': [],
+            'long_entry': bars == params.entry_bar,
+            'short_entry': np.zeros(n, dtype=bool),
+            'long_exit': bars == params.exit_bar,
+            'short_exit': np.zeros(n, dtype=bool),
+            'sl_distance': data['Close'] * params.sl_fraction,
+        }
+
+
+class NeverTrades(EnterOnce):
+    entry_bar = -1
+
+
+def run(h4_prices):
+    h1_prices = generate_ohlcv(4 * len(h4_prices), seed=5, start='2024-01-01')
+
+    bots = [
+        PortfolioBot('h1', NeverTrades, 'EURUSD', h1_prices, risk=1, commission=0),
+        PortfolioBot('h4', EnterOnce, 'EURUSD', h4_prices, risk=1, commission=0),
+    ]
+
+    return run_portfolio(bots, INITIAL_CASH, leverages=LEVERAGES)
+
+
+def test_open_h4_bar_is_not_marked_at_its_close_on_an_h1_grid():
+    h4_prices = generate_ohlcv(40, seed=4, start='2024-01-01', freq='4h')
+    _, equity_curve, trades = run(h4_prices)
+
+    assert len(trades) == 1
+    assert trades['EntryBar'].iloc[0] == 11 * 4
+
+    # Cambia el Close de una vela H4 con el trade abierto: la equity de las horas
+    # anteriores al cierre de esa vela no puede enterarse
+    changed = h4_prices.copy()
+    changed.iloc[12, changed.columns.get_loc('Close')] *= 1.01
+    changed.iloc[12, changed.columns.get_loc('High')] = changed.iloc[12][['Open', 'High', 'Close']].max()
+    _, changed_curve, _ = run(changed)
+
+    equity = equity_curve['Equity'].to_numpy()
+    changed_equity = changed_curve['Equity'].to_numpy()
+
+    last_hour = 12 * 4 + 3
+    np.testing.assert_array_equal(equity[:last_hour], changed_equity[:last_hour])
+    assert equity[last_hour] != changed_equity[last_hour]
+
+
+def test_h4_position_is_marked_at_the_open_until_the_bar_closes():
+    h4_prices = generate_ohlcv(40, seed=4, start='2024-01-01', freq='4h')
+    _, equity_curve, trades = run(h4_prices)
+
+    size = trades['Size'].iloc[0]
+    entry_price = trades['EntryPrice'].iloc[0]
+    equity = equity_curve['Equity'].to_numpy()
+
+    minimum_fraction = get_scaled_symbol_metadata('EURUSD')[4]
+    open_ = h4_prices['Open'].to_numpy() * minimum_fraction
+    close = h4_prices['Close'].to_numpy() * minimum_fraction
+
+    # Sale en el Open de la vela 15: el trade esta abierto de la vela 11 a la 14
+    for bar in range(11, 15):
+        for hour in range(4):
+            price = close[bar] if hour == 3 else open_[bar]
+            assert np.isclose(equity[bar * 4 + hour], INITIAL_CASH + size * (price - entry_price))
+
+
+@pytest.mark.parametrize('strategy', [TripleSMA, Channel], ids=lambda strategy: strategy.__name__)
+def test_single_bot_matches_the_vectorized_engine(strategy):
+    prices = generate_ohlcv(4000, seed=21, mode='regime')
+    commission = 2e-4
+
+    _, _, expected = run_strategy_vectorized(strategy, 'EURUSD', prices, INITIAL_CASH, commission, 1 / LEVERAGES['EURUSD'], risk=1)
+    stats, equity_curve, trades = run_portfolio(
+        [PortfolioBot('bot', strategy, 'EURUSD', prices, risk=1, commission=commission)],
+        INITIAL_CASH,
+        leverages=LEVERAGES,
+    )
+
+    expected_trades = expected._trades
+    for column in ['Size', 'EntryBar', 'ExitBar']:
+        np.testing.assert_array_equal(trades[column].to_numpy(), expected_trades[column].to_numpy())
+
+    np.testing.assert_allclose(equity_curve['Equity'].to_numpy(), expected._equity_curve['Equity'].to_numpy(), rtol=1e-12)
+    for key in ['# Trades', 'Return [%]', 'Max. Drawdown [%]', 'Win Rate [%]']:
+        assert np.isclose(stats[key], expected[key], rtol=1e-9), key
+
+
+def test_order_without_free_margin_is_cancelled():
+    prices = generate_ohlcv(40, seed=4, start='2024-01-01', freq='4h')
+
+    # Con el stop al 1% y 1% de riesgo cada trade compra equity / precio unidades: con
+    # apalancamiento 1.5 pide 2/3 de la equity de margen, entra uno solo de los dos
+    bots = [
+        PortfolioBot('first', EnterOnce, 'EURUSD', prices, risk=1, commission=0, params={'sl_fraction': 0.01}),
+        PortfolioBot('second', EnterOnce, 'EURUSD', prices, risk=1, commission=0, params={'sl_fraction': 0.01}),
+    ]
+    _, equity_curve, trades = run_portfolio(bots, INITIAL_CASH, leverages={'EURUSD': 1.5})
+
+    assert trades['Bot'].tolist() == ['first']
+    assert (equity_curve['UsedMargin'] <= equity_curve['Equity'] + 1e-9).all()
+
+    # Cada uno por separado si entra
+    for bot in bots:
+        _, _, alone = run_portfolio([bot], INITIAL_CASH, leverages={'EURUSD': 1.5})
+        assert len(alone) == 1
@@ -0,0 +1,19 @@
+from types import SimpleNamespace
+from app.backbone.utils import profiling
+
+
+def test_report_without_resource_module(monkeypatch):
+    # Como en Windows: no hay modulo resource
+    monkeypatch.setattr(profiling, 'resource', None)
+
+    monkeypatch.setattr(profiling, 'psutil', None)
+    assert profiling.Profiler('test').report()['peak_rss_mb'] is None
+
+    memory = SimpleNamespace(rss=100 * 1024 * 1024, peak_wset=300 * 1024 * 1024)
+    fake_psutil = SimpleNamespace(Process=lambda: SimpleNamespace(memory_info=lambda: memory))
+    monkeypatch.setattr(profiling, 'psutil', fake_psutil)
+    assert profiling.Profiler('test').report()['peak_rss_mb'] == 300
+
+
+def test_report_with_resource_module():
+    assert profiling.Profiler('test').report()['peak_rss_mb'] > 0
@@ -0,0 +1,39 @@
+from functools import partial
+import pandas as pd
+from app.backbone.strategies.random_trader import RandomTrader
+from backtesting_pipeline.random_test import cols_to_calculate_mean, run_iteration, run_iterations
+from backbone.utils.montecarlo_utils import spawn_rngs
+from benchmarks.synthetic_data import generate_ohlcv
+
+PRICES = generate_ohlcv(1500, seed=8)
+
+iteration = partial(
+    run_iteration,
+    params={'prob_trade': 0.3, 'prob_long': 0.5, 'prob_short': 0.5},
+    strategy=RandomTrader,
+    ticker='EURUSD',
+    interval=16385,
+    commission=7e-5,
+    prices=PRICES,
+    initial_cash=100_000,
+    margin=1 / 30,
+    risk=1,
+)
+
+
+def test_parallel_iterations_match_serial():
+    serial = run_iterations(iteration, spawn_rngs(11, 8), max_workers=1)
+    parallel = run_iterations(iteration, spawn_rngs(11, 8), max_workers=4)
+
+    pd.testing.assert_frame_equal(serial[0], parallel[0])
+    pd.testing.assert_frame_equal(serial[1], parallel[1])
+    pd.testing.assert_series_equal(serial[2]._equity_curve['Equity'], parallel[2]._equity_curve['Equity'])
+
+    performance = serial[0]
+    assert performance[['strategy', 'ticker', 'interval']].values.tolist() == [['RandomTrader', 'EURUSD', 16385]]
+    assert set(cols_to_calculate_mean) <= set(performance.columns)
+
+
+def test_only_the_first_iteration_returns_stats():
+    _, _, stats = iteration(spawn_rngs(11, 1)[0], False)
+    assert stats is None
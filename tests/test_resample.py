@@ -0,0 +1,91 @@
+import os
+import pandas as pd
+import pytest
+from app.backbone.utils.resample import compare_with_broker, resample_bars
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'resample')
+
+# Velas SINTETICAS (ver fixtures/resample/generate_fixtures.py): H1 en horario de un server
+# tipo MT5 (domingo desde las 22, sin 25/12 ni 1/1) y H4/D1/W1/MN1 de referencia armadas con
+# pandas.resample siguiendo la alineacion de MT5. No son velas del broker: la comparacion
+# contra el broker real es la de check_resample al bajar la data.
+TIMEFRAMES = {
+    'H4': 16388,
+    'D1': 16408,
+    'W1': 32769,
+    'MN1': 49153,
+}
+
+
+def read_fixture(name):
+    return pd.read_csv(
+        os.path.join(FIXTURES_PATH, f'EURUSD_{name}.csv'),
+        index_col='Date',
+        parse_dates=['Date'],
+    )
+
+
+@pytest.mark.parametrize('name', TIMEFRAMES)
+def test_resampled_bars_match_reference(name):
+    reference_bars = read_fixture(name)
+    resampled = resample_bars(read_fixture('H1'), TIMEFRAMES[name])
+    resampled = resampled.loc[reference_bars.index[0]:reference_bars.index[-1]]
+
+    comparison = compare_with_broker(resampled, reference_bars)
+
+    assert comparison['common_bars'] == len(reference_bars)
+    assert comparison['only_resampled'] == 0
+    assert comparison['only_broker'] == 0
+    assert comparison['mismatched_bars'] == 0
+    assert (resampled['Volume'] == reference_bars['Volume']).all()
+
+
+def test_weekly_bars_open_on_sunday():
+    weekly = resample_bars(read_fixture('H1'), TIMEFRAMES['W1'])
+
+    # Las velas del domingo a la noche ya son de la semana siguiente
+    assert (weekly.index.dayofweek == 6).all()
+    assert weekly.index[0] == pd.Timestamp('2023-11-26', tz='UTC')
+
+
+def test_compare_with_broker_reports_differences():
+    broker_bars = read_fixture('D1')
+    resampled = resample_bars(read_fixture('H1'), TIMEFRAMES['D1'])
+    resampled = resampled.loc[broker_bars.index[0]:broker_bars.index[-1]].copy()
+
+    resampled.iloc[3, resampled.columns.get_loc('High')] += 0.0001
+    comparison = compare_with_broker(resampled.iloc[:-1], broker_bars)
+
+    assert comparison['mismatched_bars'] == 1
+    assert list(comparison['mismatched_index']) == [broker_bars.index[3]]
+    assert comparison['only_broker'] == 1
+
+
+def test_check_resample_compares_with_fetched_bars(tmp_path, monkeypatch):
+    from app.backbone.utils import bulk_downloader
+    from app.backbone.utils import get_data as get_data_module
+
+    fixtures = {16385: read_fixture('H1'), **{tf: read_fixture(name) for name, tf in TIMEFRAMES.items()}}
+
+    # Las velas de referencia hacen de broker
+    def fetch(ticker, timeframe, date_from, date_to):
+        return fixtures[timeframe].loc[date_from:date_to]
+
+    monkeypatch.setattr(get_data_module, '_get_data_from_metatrader', fetch)
+    monkeypatch.setattr(bulk_downloader, '_get_data_from_metatrader', fetch)
+    monkeypatch.setattr(get_data_module, 'METATRADER_BACKEND', 'mt5')
+
+    comparisons = bulk_downloader.check_resample(
+        'EURUSD',
+        16385,
+        [16385, *TIMEFRAMES.values()],
+        pd.Timestamp('2023-12-01', tz='UTC'),
+        pd.Timestamp('2024-02-01', tz='UTC'),
+        cache_path=tmp_path,
+    )
+
+    assert sorted(comparisons) == sorted(TIMEFRAMES.values())
+    for comparison in comparisons.values():
+        assert comparison['mismatched_bars'] == 0
+        assert comparison['only_resampled'] == 0
+        assert comparison['only_broker'] == 0
@@ -0,0 +1,138 @@
+import os
+import pytest
+from app.backbone.strategies.triple_sma import TripleSMA
+from app.backbone.utils import result_cache as result_cache_module
+from app.backbone.utils.backtest_result import BacktestResult
+from app.backbone.utils.result_cache import ResultCache, engine_fingerprint, module_dependencies, strategy_fingerprint
+from app.backbone.utils.wfo_utils import get_scaled_symbol_metadata, run_strategy, scale_prices
+from benchmarks.synthetic_data import generate_ohlcv
+
+PRICES = generate_ohlcv(1500, seed=2)
+RUN = dict(initial_cash=100_000, commission=2e-4, margin=1 / 30, risk=1)
+
+
+def test_cached_stats_can_be_plotted(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    run = lambda: run_strategy(TripleSMA, 'EURUSD', PRICES, cache=False, **RUN)
+
+    cache.cached('run_strategy', run, TripleSMA, PRICES, ticker='EURUSD', **RUN)
+    _, _, stats = cache.cached('run_strategy', run, TripleSMA, PRICES, ticker='EURUSD', **RUN)
+    assert cache.hits == 1
+
+    # Los stats guardados ya no tienen la instancia de la estrategia
+    with pytest.raises(Exception):
+        BacktestResult(stats).plot(filename=str(tmp_path / 'plot.html'))
+
+    (
+        pip_value,
+        minimum_lot,
+        maximum_lot,
+        contract_volume,
+        minimum_fraction,
+        trade_tick_value_loss,
+        volume_step,
+    ) = get_scaled_symbol_metadata('EURUSD')
+
+    result = BacktestResult(
+        stats,
+        strategy=TripleSMA,
+        prices=scale_prices(PRICES, minimum_fraction),
+        params={
+            'pip_value': pip_value,
+            'minimum_lot': minimum_lot,
+            'maximum_lot': maximum_lot,
+            'contract_volume': contract_volume,
+            'trade_tick_value_loss': trade_tick_value_loss,
+            'volume_step': volume_step,
+            'risk': 1,
+        },
+    )
+    result.plot(filename=str(tmp_path / 'plot.html'))
+
+    assert (tmp_path / 'plot.html').exists()
+
+
+def _dependency_names(module_name):
+    return {os.path.basename(path) for path in module_dependencies(module_name)}
+
+
+def test_fingerprints_include_imported_modules():
+    engine = _dependency_names('app.backbone.utils.wfo_utils')
+    assert {'wfo_utils.py', 'general_purpose.py', 'spread_store.py'} <= engine
+
+    strategy = _dependency_names(TripleSMA.__module__)
+    assert {'triple_sma.py', 'base_strategy.py', 'general_purpose.py'} <= strategy
+
+
+def test_key_changes_when_a_dependency_changes(monkeypatch):
+    cache = ResultCache('unused')
+    key = cache.key('run_strategy', TripleSMA, PRICES, ticker='EURUSD', **RUN)
+
+    file_hash = result_cache_module._file_hash
+    monkeypatch.setattr(
+        result_cache_module,
+        '_file_hash',
+        lambda path: 'changed' if path.endswith('general_purpose.py') else file_hash(path),
+    )
+
+    assert 'changed' in engine_fingerprint()
+    assert 'changed' in strategy_fingerprint(TripleSMA)
+    assert cache.key('run_strategy', TripleSMA, PRICES, ticker='EURUSD', **RUN) != key
+
+
+def test_eviction_keeps_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), max_bytes=11_000)
+    value = 'x' * 3_000
+
+    keys = [f'{i:02d}' + 'a' * 38 for i in range(3)]
+    for age, key in enumerate(keys):
+        cache.put(key, value)
+        os.utime(cache._path(key), (1_000 + age, 1_000 + age))
+
+    # Usar el mas viejo lo vuelve el mas reciente
+    assert cache.get(keys[0]) == value
+
+    cache.put('99' + 'a' * 38, value)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == value
+    assert cache.get(keys[2]) == value
+
+    total = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(cache.cache_path)
+        for name in names
+    )
+    assert total <= cache.max_bytes
+
+
+def test_put_reads_the_directory_only_to_evict(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path / 'cache'), max_bytes=100_000, evict_to=0.5)
+
+    scans = []
+    files = cache._files
+    monkeypatch.setattr(cache, '_files', lambda: scans.append(1) or files())
+
+    for i in range(60):
+        cache.put(f'{i:02d}' + 'a' * 38, 'x' * 3_000)
+
+    # Una lectura al empezar y una por cada desalojo (cada ~16 resultados nuevos)
+    assert len(scans) <= 5
+
+    total = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(cache.cache_path)
+        for name in names
+    )
+    assert total <= cache.max_bytes
+    assert cache._total == total
+
+
+def test_key_changes_when_prices_are_edited_in_place():
+    cache = ResultCache('unused')
+    prices = PRICES.copy()
+    key = cache.key('run_strategy', TripleSMA, prices, ticker='EURUSD', **RUN)
+
+    prices['Close'].to_numpy()[100] *= 1.01
+
+    assert cache.key('run_strategy', TripleSMA, prices, ticker='EURUSD', **RUN) != key
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+from app.backbone.utils.metatrader import RATES_DTYPE
+from app.backbone.utils.rolling_bar_buffer import RollingBarBuffer
+from benchmarks.synthetic_data import generate_ohlcv
+
+H1 = 16385
+HISTORY = generate_ohlcv(5000, seed=6, start='2024-01-01')
+
+
+class FakeMetaTrader:
+    ''' Broker con las primeras `closed` velas de HISTORY cerradas; la siguiente esta en formacion '''
+
+    def __init__(self, closed, available=None):
+        self.closed = closed
+        self.available = available  # cuantas velas de historia guarda el broker
+
+    def copy_rates_from_pos(self, ticker, timeframe, start_pos, count):
+        end = self.closed + 1 - start_pos
+        start = max(end - count, 0 if self.available is None else end - self.available)
+        bars = HISTORY.iloc[start:end]
+
+        rates = np.zeros(len(bars), dtype=RATES_DTYPE)
+        rates['time'] = bars.index.asi8 // 1_000_000_000
+        rates['open'] = bars['Open']
+        rates['high'] = bars['High']
+        rates['low'] = bars['Low']
+        rates['close'] = bars['Close']
+        rates['tick_volume'] = bars['Volume']
+
+        return rates
+
+
+def expected_window(closed, capacity):
+    return HISTORY.iloc[closed - capacity:closed]
+
+
+def assert_window(buffer, closed):
+    frame = buffer.frame()
+    expected = expected_window(closed, buffer.capacity)
+
+    assert len(frame) == buffer.capacity
+    assert frame.index.equals(expected.index)
+    np.testing.assert_allclose(frame['Close'].to_numpy(), expected['Close'].to_numpy())
+
+
+def test_incremental_updates_match_a_full_fetch_after_wrapping(tmp_path):
+    buffer = RollingBarBuffer('EURUSD', H1, 300, buffer_path=tmp_path)
+    for closed in range(1000, 1900, 7):
+        buffer.update(FakeMetaTrader(closed))
+        assert_window(buffer, closed)
+
+
+def test_bots_with_different_capacity_do_not_share_the_buffer(tmp_path):
+    broker = FakeMetaTrader(3000)
+
+    small = RollingBarBuffer('EURUSD', H1, 500, buffer_path=tmp_path)
+    small.update(broker)
+
+    large = RollingBarBuffer('EURUSD', H1, 2000, buffer_path=tmp_path)
+    large.update(broker)
+
+    assert small.path != large.path
+    assert_window(large, 3000)
+
+    # Al volver a cargarse cada uno encuentra su propia ventana
+    assert len(RollingBarBuffer('EURUSD', H1, 2000, buffer_path=tmp_path)) == 2000
+    assert len(RollingBarBuffer('EURUSD', H1, 500, buffer_path=tmp_path)) == 500
+
+
+def test_short_buffer_is_backfilled(tmp_path):
+    # El broker solo tenia 500 velas la primera vez
+    buffer = RollingBarBuffer('EURUSD', H1, 2000, buffer_path=tmp_path)
+    buffer.update(FakeMetaTrader(3000, available=500))
+    assert len(buffer) == 500
+
+    buffer = RollingBarBuffer('EURUSD', H1, 2000, buffer_path=tmp_path)
+    buffer.update(FakeMetaTrader(3010))
+
+    assert_window(buffer, 3010)
+
+
+def test_frame_is_not_changed_by_later_updates(tmp_path):
+    buffer = RollingBarBuffer('EURUSD', H1, 300, buffer_path=tmp_path)
+    buffer.update(FakeMetaTrader(1000))
+    frame = buffer.frame()
+    before = frame.copy()
+
+    # Suficientes velas como para que el buffer se mueva al principio del array
+    for closed in range(1001, 1700):
+        buffer.update(FakeMetaTrader(closed))
+
+    pd.testing.assert_frame_equal(frame, before)
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+from app.backbone.utils.resample import resample_bars
+from app.backbone.utils.spread_store import (
+    has_bar_spreads,
+    load_bar_spreads,
+    relative_spreads,
+    resample_bar_spreads,
+    store_bar_spreads,
+)
+from benchmarks.synthetic_data import generate_ohlcv
+
+H1 = 16385
+H4 = 16388
+
+
+def test_derived_timeframe_gets_resampled_spreads(tmp_path):
+    prices = generate_ohlcv(24 * 10, seed=3, start='2024-01-01')
+    prices['spread'] = np.arange(len(prices)) % 8 + 10
+    store_bar_spreads('EURUSD', H1, prices, point=1e-5, store_path=tmp_path)
+
+    resample_bar_spreads('EURUSD', H4, H1, store_path=tmp_path)
+
+    assert has_bar_spreads('EURUSD', H4, store_path=tmp_path)
+    spreads, point = load_bar_spreads('EURUSD', H4, store_path=tmp_path)
+    derived = resample_bars(prices, H4)
+
+    assert point == 1e-5
+    assert spreads.index.equals(derived.index)
+    # Promedio de las 4 velas H1 de cada vela H4: (10 + 11 + 12 + 13) / 4 = 11.5 -> 12
+    assert spreads.iloc[0] == 12
+    assert spreads.iloc[1] == 16
+
+    relative = relative_spreads(derived, spreads, point)
+    assert len(relative) == len(derived)
+    assert np.isfinite(relative).all()
+
+
+def test_storing_a_short_range_keeps_older_spreads(tmp_path):
+    prices = generate_ohlcv(24 * 10, seed=3, start='2024-01-01')
+    prices['spread'] = 10
+    store_bar_spreads('EURUSD', H1, prices, point=1e-5, store_path=tmp_path)
+
+    recent = prices.iloc[-24:].copy()
+    recent['spread'] = 20
+    store_bar_spreads('EURUSD', H1, recent, point=1e-5, store_path=tmp_path)
+
+    spreads, _ = load_bar_spreads('EURUSD', H1, store_path=tmp_path)
+
+    assert spreads.index.equals(prices.index)
+    assert (spreads.iloc[:-24] == 10).all()
+    assert (spreads.iloc[-24:] == 20).all()
+
+
+def test_bars_outside_the_stored_range_pay_the_fixed_commission(tmp_path, capsys):
+    prices = generate_ohlcv(24 * 10, seed=3, start='2024-01-01')
+    prices['spread'] = 10
+    store_bar_spreads('EURUSD', H1, prices.iloc[24:-24], point=1e-5, store_path=tmp_path)
+    spreads, point = load_bar_spreads('EURUSD', H1, store_path=tmp_path)
+
+    relative = relative_spreads(prices, spreads, point, commission=7e-5)
+
+    np.testing.assert_array_equal(relative[:24], 7e-5)
+    np.testing.assert_array_equal(relative[-24:], 7e-5)
+    np.testing.assert_allclose(relative[24:-24], 10 * 1e-5 / prices['Close'].iloc[24:-24])
+    assert '48 de 240 velas fuera del rango' in capsys.readouterr().out
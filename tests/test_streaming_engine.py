@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import pytest
+import backtesting
+from backtesting._stats import compute_stats
+from app.backbone.strategies.channel_strategy import Channel
+from app.backbone.strategies.triple_sma import TripleSMA
+from app.backbone.utils.metrics import stability_ratio, windowed_stability_ratio
+from app.backbone.utils.streaming_engine import BACKTESTING_VERSION, _streaming_stats, run_strategy_chunked
+from app.backbone.utils.vectorized_engine import run_strategy_vectorized
+from benchmarks.synthetic_data import generate_ohlcv
+
+INITIAL_CASH = 100_000
+COMMISSION = 2e-4
+MARGIN = 1 / 30
+
+PRICES = generate_ohlcv(4000, seed=21, mode='regime')
+
+
+def assert_same_stats(stats, expected):
+    for key in expected.index:
+        if key.startswith('_'):
+            continue
+        a, b = stats[key], expected[key]
+        if isinstance(b, (float, np.floating)):
+            assert np.isclose(a, b, rtol=1e-9, equal_nan=True), key
+        else:
+            assert a == b or (pd.isna(a) and pd.isna(b)), key
+
+
+@pytest.mark.parametrize('strategy', [TripleSMA, Channel], ids=lambda strategy: strategy.__name__)
+@pytest.mark.parametrize('window', [1, 97, 1000, 10_000])
+def test_streaming_stats_match_compute_stats(strategy, window):
+    _, _, stats = run_strategy_vectorized(strategy, 'EURUSD', PRICES, INITIAL_CASH, COMMISSION, MARGIN, risk=1)
+    equity = stats._equity_curve['Equity'].to_numpy()
+    trades = stats._trades
+
+    # get_performance ya paso los trades por trades_with_equity: Duration vuelve a Timedelta
+    raw_trades = trades.copy()
+    raw_trades['Duration'] = pd.to_timedelta(raw_trades['Duration'], unit='D')
+
+    expected = compute_stats(raw_trades, equity, PRICES, None)
+    streamed = _streaming_stats(raw_trades, equity, PRICES.index, PRICES['Close'].to_numpy(), window)
+
+    assert_same_stats(streamed, expected)
+
+
+@pytest.mark.parametrize('equity', [
+    np.full(300, 1000.0),                                  # sin drawdown
+    np.r_[np.linspace(1000, 1100, 299), 1050.0],           # drawdown solo en la ultima vela
+    np.r_[np.linspace(1000, 1100, 150), np.linspace(1090, 1000, 150)],  # termina en drawdown
+    np.r_[np.linspace(1000, 1100, 100), np.linspace(1100, 0, 100), np.zeros(100)],  # quiebra
+])
+@pytest.mark.parametrize('window', [1, 64, 1000])
+def test_streaming_stats_drawdown_edge_cases(equity, window):
+    prices = PRICES.iloc[:len(equity)]
+    trades = pd.DataFrame(columns=['Size', 'EntryBar', 'ExitBar', 'EntryPrice', 'ExitPrice', 'PnL', 'ReturnPct', 'Duration'])
+
+    expected = compute_stats(trades, equity, prices, None)
+    streamed = _streaming_stats(trades, equity, prices.index, prices['Close'].to_numpy(), window)
+
+    assert_same_stats(streamed, expected)
+
+
+def test_windowed_stability_ratio():
+    values = np.cumsum(np.random.default_rng(0).standard_normal(10_001)) + 1000
+    for window in [1, 7, 10_001]:
+        assert np.isclose(windowed_stability_ratio(values, window), stability_ratio(values))
+
+
+@pytest.mark.parametrize('strategy', [TripleSMA, Channel], ids=lambda strategy: strategy.__name__)
+@pytest.mark.parametrize('chunk_bars', [997, 3000, len(PRICES)])
+def test_chunked_run_matches_vectorized(tmp_path, strategy, chunk_bars):
+    _, _, expected_stats = expected = run_strategy_vectorized(strategy, 'EURUSD', PRICES, INITIAL_CASH, COMMISSION, MARGIN, risk=1)
+    chunked = run_strategy_chunked(
+        strategy, 'EURUSD', PRICES, INITIAL_CASH, COMMISSION, MARGIN, risk=1,
+        chunk_bars=chunk_bars, output_path=str(tmp_path),
+    )
+
+    pd.testing.assert_frame_equal(chunked[0], expected[0])
+    pd.testing.assert_frame_equal(chunked[1], expected[1])
+    np.testing.assert_array_equal(np.load(tmp_path / 'equity.npy'), expected_stats._equity_curve['Equity'].to_numpy())
+
+
+def test_chunked_run_with_trades_across_chunks_and_open_at_the_end(tmp_path):
+    prices = PRICES.iloc[:3000]
+    expected = run_strategy_vectorized(Channel, 'EURUSD', prices, INITIAL_CASH, COMMISSION, MARGIN, risk=1)
+    trades = expected[2]._trades
+
+    # Que el caso no deje de probar lo que dice
+    assert ((trades['EntryBar'] // 997) != (trades['ExitBar'] // 997)).any()
+    assert trades['ExitBar'].max() == len(prices) - 1
+
+    chunked = run_strategy_chunked(
+        Channel, 'EURUSD', prices, INITIAL_CASH, COMMISSION, MARGIN, risk=1,
+        chunk_bars=997, output_path=str(tmp_path),
+    )
+
+    pd.testing.assert_frame_equal(chunked[0], expected[0])
+    pd.testing.assert_frame_equal(chunked[1], expected[1])
+
+
+@pytest.mark.parametrize('chunk_bars', [300, 997])
+def test_chunked_run_after_ruin(tmp_path, chunk_bars):
+    # Con 1000 de cash y 100% de riesgo la cuenta queda en cero en la vela 746
+    run = dict(initial_cash=1000, commission=COMMISSION, margin=1 / 500, risk=100)
+    expected = run_strategy_vectorized(Channel, 'EURUSD', PRICES, **run)
+    assert (expected[2]._equity_curve['Equity'] <= 0).any()
+
+    chunked = run_strategy_chunked(Channel, 'EURUSD', PRICES, **run, chunk_bars=chunk_bars, output_path=str(tmp_path))
+
+    pd.testing.assert_frame_equal(chunked[0], expected[0])
+    pd.testing.assert_frame_equal(chunked[1], expected[1])
+
+
+def test_streaming_stats_follow_the_pinned_backtesting():
+    # _streaming_stats copia compute_stats: al cambiar de version hay que volver a compararlos
+    assert backtesting.__version__ == BACKTESTING_VERSION
@@ -0,0 +1,35 @@
+import multiprocessing
+from app.backbone.utils.symbol_metadata import clear_metadata, get_cached_metadata, store_metadata
+
+METADATA = (1e-05, 0.01, 100.0, 100000.0, 1.0, 1.0, 0.01)
+
+
+def _store_tickers(args):
+    cache_path, tickers = args
+    for ticker in tickers:
+        store_metadata(ticker, METADATA, cache_path=cache_path)
+
+
+def test_concurrent_processes_do_not_lose_entries(tmp_path):
+    cache_path = str(tmp_path / '_symbol_metadata.json')
+    tickers = [f'TICKER{i}' for i in range(40)]
+    chunks = [(cache_path, tickers[i::4]) for i in range(4)]
+
+    with multiprocessing.get_context('spawn').Pool(4) as pool:
+        pool.map(_store_tickers, chunks)
+
+    for ticker in tickers:
+        assert get_cached_metadata(ticker, cache_path=cache_path) == METADATA
+
+    assert [path.name for path in tmp_path.iterdir() if path.name.endswith('.tmp')] == []
+
+
+def test_clear_one_ticker_keeps_the_rest(tmp_path):
+    cache_path = str(tmp_path / '_symbol_metadata.json')
+    store_metadata('EURUSD', METADATA, cache_path=cache_path)
+    store_metadata('GBPUSD', METADATA, cache_path=cache_path)
+
+    clear_metadata('EURUSD', cache_path=cache_path)
+
+    assert get_cached_metadata('EURUSD', cache_path=cache_path) is None
+    assert get_cached_metadata('GBPUSD', cache_path=cache_path) == METADATA
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from app.backbone.strategies.b_percent_strategy import BPercent
+from app.backbone.strategies.bbands_cross_strategy import BbandsCross
+from app.backbone.strategies.channel_strategy import Channel
+from app.backbone.strategies.macd_strategy import Macd
+from app.backbone.strategies.triple_sma import TripleSMA
+from app.backbone.utils import wfo_utils
+from app.backbone.utils.vectorized_engine import check_parity, supports_vectorized
+from app.backbone.utils.wfo_utils import _optimize_window, optimization_function, walk_forward
+from benchmarks.synthetic_data import generate_ohlcv
+
+STRATEGIES = [TripleSMA, Channel, BbandsCross, BPercent, Macd]
+
+INITIAL_CASH = 100_000
+COMMISSION = 2e-4
+MARGIN = 1 / 30
+
+
+@pytest.fixture(scope='module', params=['gbm', 'regime'])
+def prices(request):
+    return generate_ohlcv(3000, seed=11, mode=request.param)
+
+
+@pytest.mark.parametrize('strategy', STRATEGIES, ids=lambda strategy: strategy.__name__)
+def test_parity_with_fixed_commission(strategy, prices):
+    assert supports_vectorized(strategy)
+    assert check_parity(strategy, 'EURUSD', prices, INITIAL_CASH, COMMISSION, MARGIN, risk=1) == {}
+
+
+@pytest.mark.parametrize('strategy', STRATEGIES, ids=lambda strategy: strategy.__name__)
+def test_parity_with_bar_spreads(strategy, prices):
+    spreads = np.random.default_rng(0).uniform(1e-4, 3e-4, len(prices))
+
+    assert check_parity(
+        strategy,
+        'EURUSD',
+        prices,
+        INITIAL_CASH,
+        COMMISSION,
+        MARGIN,
+        risk=1,
+        spreads=spreads,
+    ) == {}
+
+
+GRIDS = {
+    TripleSMA: {'atr_multiplier': [1.5, 2.0, 2.5, 3.0]},
+    BbandsCross: {'bband_std': [1.5, 2.0, 2.5], 'atr_multiplier': [1.5, 2.0, 2.5]},
+    BPercent: {'b_open_threshold': [0.9, 0.95], 'b_close_threshold': [0.4, 0.5, 0.6]},
+}
+
+
+def _wfo_params(strategy):
+    return {
+        **GRIDS[strategy],
+        'pip_value': [1e-05],
+        'minimum_lot': [0.01],
+        'maximum_lot': [100.0],
+        'contract_volume': [100000.0],
+        'trade_tick_value_loss': [1.0],
+        'volume_step': [0.01],
+        'risk': [1],
+        'maximize': optimization_function,
+    }
+
+
+@pytest.mark.parametrize('strategy', list(GRIDS), ids=lambda strategy: strategy.__name__)
+def test_vectorized_grid_picks_the_same_params(strategy, prices, monkeypatch):
+    params = _wfo_params(strategy)
+    train_data = prices.iloc[:1500]
+
+    chosen = _optimize_window(strategy, train_data, params, INITIAL_CASH, COMMISSION, MARGIN)
+
+    monkeypatch.setattr(wfo_utils, 'VECTORIZED_OPTIMIZE', False)
+    expected = _optimize_window(strategy, train_data, params, INITIAL_CASH, COMMISSION, MARGIN)
+
+    assert chosen == expected
+
+
+def test_walk_forward_matches_with_the_vectorized_grid(prices, monkeypatch):
+    kwargs = dict(
+        warmup_bars=200,
+        lookback_bars=800,
+        validation_bars=400,
+        params=_wfo_params(BbandsCross),
+        cash=INITIAL_CASH,
+        commission=COMMISSION,
+        margin=MARGIN,
+    )
+
+    stats, history = walk_forward(BbandsCross, prices, **kwargs)
+
+    monkeypatch.setattr(wfo_utils, 'VECTORIZED_OPTIMIZE', False)
+    expected_stats, expected_history = walk_forward(BbandsCross, prices, **kwargs)
+
+    assert history == expected_history
+    assert stats['Equity Final [$]'] == expected_stats['Equity Final [$]']
+    assert stats['# Trades'] == expected_stats['# Trades']
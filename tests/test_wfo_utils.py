@@ -0,0 +1,60 @@
+import warnings
+import numpy as np
+import pytest
+import backtesting.backtesting
+from app.backbone.strategies.triple_sma import TripleSMA
+from app.backbone.utils import wfo_utils
+from app.backbone.utils.wfo_utils import _optimize_window, _optimize_window_in_worker, optimization_function, walk_forward
+from benchmarks.synthetic_data import generate_ohlcv
+
+PRICES = generate_ohlcv(3000, seed=12, mode='regime')
+
+PARAMS = {
+    'atr_multiplier': [1.5, 2.0, 2.5, 3.0],
+    'pip_value': [1e-05],
+    'minimum_lot': [0.01],
+    'maximum_lot': [100.0],
+    'contract_volume': [100000.0],
+    'trade_tick_value_loss': [1.0],
+    'volume_step': [0.01],
+    'risk': [1],
+    'maximize': optimization_function,
+}
+
+RUN = dict(cash=100_000, commission=2e-4, margin=1 / 30)
+
+
+@pytest.mark.parametrize('vectorized', [True, False], ids=['vectorized', 'backtesting'])
+def test_parallel_windows_match_serial(vectorized, monkeypatch):
+    monkeypatch.setattr(wfo_utils, 'VECTORIZED_OPTIMIZE', vectorized)
+    kwargs = dict(warmup_bars=200, lookback_bars=800, validation_bars=300, params=PARAMS, **RUN)
+
+    serial_stats, serial_history = walk_forward(TripleSMA, PRICES, max_workers=1, **kwargs)
+    parallel_stats, parallel_history = walk_forward(TripleSMA, PRICES, max_workers=4, **kwargs)
+
+    assert len(serial_history) > 4
+    assert parallel_history == serial_history
+    for key in ['Equity Final [$]', '# Trades', 'Return [%]', 'Max. Drawdown [%]']:
+        assert parallel_stats[key] == serial_stats[key], key
+    np.testing.assert_array_equal(
+        parallel_stats._equity_curve['Equity'].to_numpy(),
+        serial_stats._equity_curve['Equity'].to_numpy(),
+    )
+
+
+def test_worker_runs_the_grid_without_a_nested_pool(monkeypatch):
+    monkeypatch.setattr(wfo_utils, 'VECTORIZED_OPTIMIZE', False)
+    train_data = PRICES.iloc[:1000]
+    expected = _optimize_window(TripleSMA, train_data, PARAMS, **RUN)
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError('optimize abrio un pool dentro del worker')
+
+    monkeypatch.setattr(backtesting.backtesting, 'ProcessPoolExecutor', no_pool)
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        chosen = _optimize_window_in_worker(TripleSMA, train_data, PARAMS, **RUN)
+
+    assert chosen == expected
+    assert not [w for w in caught if 'multiprocessing support' in str(w.message)]